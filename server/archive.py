@@ -0,0 +1,95 @@
+"""Archive tier for ended auctions.
+
+Settled auctions that ended more than ARCHIVE_AFTER_DAYS ago move, with
+their bids, from `auctions`/`bids` to `auctions_archive`/`bids_archive`,
+keeping their ids; the hot tables use AUTOINCREMENT, so an archived id is
+never handed out again. Auctions past their end time that the contract
+hasn't settled stay hot, where the listener and the reconciler still update
+them. The hot tables then hold roughly the active set plus recent history,
+which is what the listener scans and most listings read. Reads that can
+return ended auctions use `all_auctions()`/`all_bids()`, which stand in for
+Auction/Bid over both tiers.
+"""
+import logging
+import time
+
+from sqlalchemy import delete, insert, select, tuple_, union_all
+from sqlalchemy.orm import aliased
+
+from config import ARCHIVE_AFTER_DAYS, ARCHIVE_BATCH_SIZE
+from db_models import ArchivedAuction, ArchivedBid, Auction, Bid
+
+logger = logging.getLogger(__name__)
+
+
+def all_auctions():
+    """An entity with Auction's attributes over hot and archived auctions"""
+    rows = union_all(select(Auction.__table__), select(ArchivedAuction.__table__))
+    return aliased(Auction, rows.subquery("all_auctions"), adapt_on_names=True)
+
+
+def all_bids():
+    """An entity with Bid's attributes over hot and archived bids"""
+    rows = union_all(select(Bid.__table__), select(ArchivedBid.__table__))
+    return aliased(Bid, rows.subquery("all_bids"), adapt_on_names=True)
+
+
+def includes_archive(status):
+    """Whether a listing filtered on `status` can contain archived auctions"""
+    return status in (None, "ended")
+
+
+def find_auction(db, chain_id, auction_id, columns):
+    """(row, archived) for an auction in either tier; `columns(entity)` picks what to select"""
+    for entity, archived in ((Auction, False), (ArchivedAuction, True)):
+        row = (
+            db.query(*columns(entity))
+            .filter(entity.chain_id == chain_id, entity.auction_id == auction_id)
+            .first()
+        )
+        if row is not None:
+            return row, archived
+    return None, False
+
+
+def archive_ended_auctions(db, now=None):
+    """Move settled auctions that ended over ARCHIVE_AFTER_DAYS ago to the archive; returns how many"""
+    if ARCHIVE_AFTER_DAYS <= 0:
+        return 0
+    cutoff = int(now or time.time()) - int(ARCHIVE_AFTER_DAYS * 86400)
+    auction_columns = [column.name for column in Auction.__table__.columns]
+    bid_columns = [column.name for column in Bid.__table__.columns]
+
+    archived = 0
+    while True:
+        ids = [
+            auction_id
+            for (auction_id,) in db.query(Auction.id)
+            .filter(Auction.status == "ended", Auction.ended.is_(True), Auction.end_time < cutoff)
+            .order_by(Auction.id)
+            .limit(ARCHIVE_BATCH_SIZE)
+        ]
+        if not ids:
+            break
+        keys = select(Auction.chain_id, Auction.auction_address).where(Auction.id.in_(ids))
+        auction_bids = tuple_(Bid.chain_id, Bid.auction_address).in_(keys)
+
+        # Copy then delete in one transaction, so every row is in exactly one tier
+        db.execute(
+            insert(ArchivedAuction.__table__).from_select(
+                auction_columns, select(Auction.__table__).where(Auction.id.in_(ids))
+            )
+        )
+        db.execute(
+            insert(ArchivedBid.__table__).from_select(
+                bid_columns, select(Bid.__table__).where(auction_bids)
+            )
+        )
+        db.execute(delete(Bid.__table__).where(auction_bids))
+        db.execute(delete(Auction.__table__).where(Auction.id.in_(ids)))
+        db.commit()
+        archived += len(ids)
+
+    if archived:
+        logger.info(f"Archived {archived} auctions that ended before {cutoff}")
+    return archived
@@ -0,0 +1,126 @@
+"""Deterministic synthetic marketplace shared by the fake chain and the DB seeder.
+
+Every value is derived from the auction index and a seed, so the fake
+JSON-RPC node and a seeded database describe the same auctions without
+having to materialise the whole dataset up front.
+"""
+import hashlib
+import random
+import time
+
+from web3 import Web3
+
+FACTORY_ADDRESS = Web3.to_checksum_address("0x04b7ab1a9f98225f2d93c336a24c52e0fc718a49")
+ZERO_ADDRESS = "0x0000000000000000000000000000000000000000"
+BASE_TIMESTAMP = 1_700_000_000
+BLOCK_TIME = 12
+GENESIS_BLOCK = 1_000
+
+
+def derive_address(*parts):
+    digest = hashlib.sha256(":".join(str(p) for p in parts).encode()).hexdigest()
+    return Web3.to_checksum_address("0x" + digest[:40])
+
+
+PAYMENT_TOKENS = [derive_address("payment-token", i) for i in range(4)]
+PAYMENT_TOKEN_SYMBOLS = ["WETH", "USDC", "DAI", "TKUSDT"]
+ASSET_TOKENS = [derive_address("asset-token", i) for i in range(8)]
+NFT_COLLECTIONS = [derive_address("nft-collection", i) for i in range(32)]
+BIDDERS = [derive_address("bidder", i) for i in range(2_000)]
+SELLERS = [derive_address("seller", i) for i in range(500)]
+
+
+class Dataset:
+    """Synthetic auctions, bids and token metadata for a given size and seed"""
+
+    def __init__(self, auctions, bids_per_auction=3, seed=42, now=None):
+        self.auction_count = auctions
+        self.bids_per_auction = bids_per_auction
+        self.seed = seed
+        # End times are relative to "now" because the listener derives status
+        # from the wall clock; rounding to the day keeps runs on a day identical
+        self.now = now or int(time.time()) // 86400 * 86400
+
+    def rng(self, *parts):
+        return random.Random(f"{self.seed}:" + ":".join(str(p) for p in parts))
+
+    def auction_address(self, auction_id):
+        return derive_address("auction", self.seed, auction_id)
+
+    def auction(self, auction_id):
+        """On-chain view of auction `auction_id` (1-based, like the factory)"""
+        rng = self.rng("auction", auction_id)
+        is_nft = rng.random() < 0.7
+        auction_type = 1 if rng.random() < 0.25 else 0
+        created_block = GENESIS_BLOCK + auction_id
+        # Roughly a third of the auctions are still running at `now`
+        end_time = self.now + rng.randint(-20 * 86400, 10 * 86400)
+        bids = self.bids(auction_id)
+        ended = end_time <= self.now and rng.random() < 0.5
+        if auction_type == 1 and bids:
+            ended = True
+
+        return {
+            "auction_id": auction_id,
+            "auction_address": self.auction_address(auction_id),
+            "auction_type": auction_type,
+            "seller": rng.choice(SELLERS),
+            "highest_bidder": bids[-1]["bidder"] if bids else ZERO_ADDRESS,
+            "highest_bid": bids[-1]["amount"] if bids else 0,
+            "end_time": end_time,
+            "ended": ended,
+            "asset_address": rng.choice(NFT_COLLECTIONS if is_nft else ASSET_TOKENS),
+            "asset_id": rng.randint(1, 10_000) if is_nft else 0,
+            "amount": 0 if is_nft else rng.randint(1, 1_000) * 10**18,
+            "payment_token": rng.choice(PAYMENT_TOKENS),
+            "reserve_price": rng.randint(1, 10) * 10**16 if auction_type == 1 else 0,
+            "starting_price": rng.randint(10, 100) * 10**16,
+            "created_block": created_block,
+        }
+
+    def bids(self, auction_id):
+        rng = self.rng("bids", auction_id)
+        count = rng.randint(0, self.bids_per_auction * 2)
+        amount = rng.randint(1, 50) * 10**16
+        block = GENESIS_BLOCK + auction_id
+        result = []
+        for i in range(count):
+            block += rng.randint(1, 50)
+            amount += rng.randint(1, 20) * 10**15
+            result.append(
+                {
+                    "bidder": rng.choice(BIDDERS),
+                    "amount": amount,
+                    "block_number": block,
+                    "log_index": i,
+                }
+            )
+        return result
+
+    def status(self, auction):
+        return "active" if not auction["ended"] and auction["end_time"] > self.now else "ended"
+
+    def token(self, address):
+        if address in PAYMENT_TOKENS:
+            symbol = PAYMENT_TOKEN_SYMBOLS[PAYMENT_TOKENS.index(address)]
+        else:
+            symbol = f"AST{ASSET_TOKENS.index(address)}"
+        return {"symbol": symbol, "name": f"{symbol} Token", "decimals": 18}
+
+    def nft(self, asset_address, asset_id):
+        collection = NFT_COLLECTIONS.index(asset_address)
+        return {
+            "name": f"Collection {collection} #{asset_id}",
+            "description": f"Synthetic token {asset_id} from collection {collection}",
+            "image": f"ipfs://bafy{collection:04d}{asset_id:08d}/image.png",
+        }
+
+    def block_timestamp(self, number):
+        return BASE_TIMESTAMP + (number - GENESIS_BLOCK) * BLOCK_TIME
+
+    def block_hash(self, number, epoch=0):
+        return Web3.to_hex(Web3.keccak(text=f"{self.seed}:block:{number}:{epoch}"))
+
+    def tx_hash(self, number, address, log_index, epoch=0):
+        block_hash = self.block_hash(number, epoch)
+        return Web3.to_hex(Web3.keccak(text=f"{block_hash}:{address}:{log_index}"))
@@ -0,0 +1,629 @@
+"""Minimal JSON-RPC node simulating the auction factory for benchmarks.
+
+Answers the calls the listener makes (eth_blockNumber, eth_getLogs,
+eth_call, eth_getBlockByNumber, eth_chainId) from a synthetic `Dataset`,
+including Multicall3's aggregate3 at its usual address, and serves NFT metadata JSON over plain GET, so a full sync never leaves
+the machine. New blocks with bids/auctions and reorgs are produced by
+`FakeChain.mine()` or the `bench_mine` RPC method. `FakeChain.submit_bid()`
+(or `bench_submitBid`) puts a placeBid transaction in a mempool that pending
+transaction filters report and the next mined block includes. `serve_ws` adds a
+WebSocket endpoint with eth_subscribe support (newHeads and logs) for the
+push-driven listener.
+
+    python -m bench.fake_chain --auctions 10000 --port 8545 --ws-port 8546
+"""
+import argparse
+import asyncio
+import itertools
+import json
+import threading
+from collections import defaultdict
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from eth_abi import decode, encode
+from web3 import Web3
+
+from bench.dataset import (
+    ASSET_TOKENS,
+    BIDDERS,
+    FACTORY_ADDRESS,
+    GENESIS_BLOCK,
+    NFT_COLLECTIONS,
+    PAYMENT_TOKENS,
+    Dataset,
+)
+
+CHAIN_ID = 31337
+
+
+def selector(signature):
+    return "0x" + Web3.keccak(text=signature).hex().removeprefix("0x")[:8]
+
+
+def topic(signature):
+    return "0x" + Web3.keccak(text=signature).hex().removeprefix("0x")
+
+
+SEL_AUCTION_COUNT = selector("auctionCount()")
+SEL_AUCTIONS = selector("auctions(uint256)")
+SEL_DETAILS = selector("getAuctionDetails()")
+SEL_CURRENT_PRICE = selector("getCurrentPrice()")
+SEL_RESERVE_PRICE = selector("reservePrice()")
+SEL_DURATION = selector("duration()")
+SEL_SYMBOL = selector("symbol()")
+SEL_NAME = selector("name()")
+SEL_DECIMALS = selector("decimals()")
+SEL_TOKEN_URI = selector("tokenURI(uint256)")
+SEL_AGGREGATE3 = selector("aggregate3((address,bool,bytes)[])")
+SEL_PLACE_BID = selector("placeBid(uint256)")
+
+MULTICALL3_ADDRESS = "0xcA11bde05977b3631167028862bE2a173976CA11"
+
+AUCTION_CREATED_TOPIC = topic("AuctionCreated(uint256,address,uint8)")
+BID_PLACED_TOPIC = topic("BidPlaced(address,uint256)")
+
+
+class RPCError(Exception):
+    def __init__(self, code, message, data=None):
+        super().__init__(message)
+        self.code = code
+        self.message = message
+        self.data = data
+
+
+def revert():
+    return RPCError(3, "execution reverted", "0x")
+
+
+def _hex(value):
+    return hex(value)
+
+
+def _block_arg(value, head):
+    if value is None or value in ("latest", "pending", "safe", "finalized"):
+        return head
+    if value == "earliest":
+        return 0
+    return int(value, 16)
+
+
+class FakeChain:
+    def __init__(self, dataset, reorg_interval=0, reorg_depth=2, metadata_base_url="", chain_id=CHAIN_ID):
+        self.dataset = dataset
+        self.chain_id = chain_id
+        self.reorg_interval = reorg_interval
+        self.reorg_depth = reorg_depth
+        self.metadata_base_url = metadata_base_url
+        self.lock = threading.RLock()
+
+        self.auction_count = dataset.auction_count
+        self.address_index = {
+            dataset.auction_address(i).lower(): i for i in range(1, self.auction_count + 1)
+        }
+        # Auctions created and bids placed after genesis, keyed by auction id
+        self.created_blocks = {}
+        self.extra_bids = defaultdict(list)
+        self.fork_epochs = {}
+        self.mined_blocks = 0
+        self.reorgs = 0
+        # Called with each new block number, e.g. to push subscription notifications
+        self.block_listeners = []
+        # placeBid transactions by hash; pending ones have no block number yet
+        self.transactions = {}
+        self.mempool = []
+        self.pending_filters = {}  # filter id -> hashes not yet returned
+        self.filter_ids = itertools.count(1)
+
+        # Seed bids land at most 50 blocks apart, 2 * bids_per_auction per auction
+        self.head = GENESIS_BLOCK + self.auction_count + 100 * dataset.bids_per_auction + 1
+        self.rng = dataset.rng("chain")
+
+    # Chain state
+
+    def block_hash(self, number):
+        return self.dataset.block_hash(number, self.fork_epochs.get(number, 0))
+
+    def tx_hash(self, number, address, log_index):
+        return self.dataset.tx_hash(number, address, log_index, self.fork_epochs.get(number, 0))
+
+    def auction(self, auction_id):
+        details = self.dataset.auction(auction_id)
+        if auction_id in self.created_blocks:
+            details["created_block"] = self.created_blocks[auction_id]
+            details["highest_bidder"] = "0x0000000000000000000000000000000000000000"
+            details["highest_bid"] = 0
+        extra = self.extra_bids.get(auction_id)
+        if extra:
+            details["highest_bidder"] = extra[-1]["bidder"]
+            details["highest_bid"] = extra[-1]["amount"]
+        return details
+
+    def bids(self, auction_id):
+        base = [] if auction_id in self.created_blocks else self.dataset.bids(auction_id)
+        return base + self.extra_bids.get(auction_id, [])
+
+    def submit_bid(self, auction_id, amount=None, bidder=None):
+        """Add a placeBid transaction to the mempool; returns its hash"""
+        with self.lock:
+            previous = self.bids(auction_id)
+            amount = amount or (previous[-1]["amount"] if previous else 10**16) + 10**15
+            tx_hash = "0x" + Web3.keccak(text=f"pending-{self.chain_id}-{len(self.transactions)}").hex().removeprefix("0x")
+            self.transactions[tx_hash] = {
+                "hash": tx_hash,
+                "from": bidder or self.rng.choice(BIDDERS),
+                "to": self.dataset.auction_address(auction_id),
+                "input": "0x" + (bytes.fromhex(SEL_PLACE_BID[2:]) + encode(["uint256"], [amount])).hex(),
+                "auction_id": auction_id,
+                "amount": amount,
+                "block_number": None,
+            }
+            self.mempool.append(tx_hash)
+            for hashes in self.pending_filters.values():
+                hashes.append(tx_hash)
+            return tx_hash
+
+    def _include_mempool(self):
+        """Mine pending bids into the head block; bids no longer above the highest one revert"""
+        log_index = 0
+        for tx_hash in self.mempool:
+            tx = self.transactions[tx_hash]
+            previous = self.bids(tx["auction_id"])
+            if previous and tx["amount"] <= previous[-1]["amount"]:
+                del self.transactions[tx_hash]
+                continue
+            tx["block_number"] = self.head
+            self.extra_bids[tx["auction_id"]].append(
+                {
+                    "bidder": tx["from"],
+                    "amount": tx["amount"],
+                    "block_number": self.head,
+                    "log_index": log_index,
+                    "tx_hash": tx_hash,
+                }
+            )
+            log_index += 1
+        self.mempool = []
+        return log_index
+
+    def get_transaction(self, tx_hash):
+        tx = self.transactions.get(tx_hash)
+        if tx is None:
+            return None
+        mined = tx["block_number"] is not None
+        return {
+            "hash": tx["hash"],
+            "from": tx["from"],
+            "to": tx["to"],
+            "input": tx["input"],
+            "value": "0x0",
+            "nonce": "0x0",
+            "gas": _hex(200_000),
+            "gasPrice": _hex(10**9),
+            "type": "0x0",
+            "chainId": _hex(self.chain_id),
+            "v": "0x0",
+            "r": "0x0",
+            "s": "0x0",
+            "blockNumber": _hex(tx["block_number"]) if mined else None,
+            "blockHash": self.block_hash(tx["block_number"]) if mined else None,
+            "transactionIndex": "0x0" if mined else None,
+        }
+
+    def mine(self, blocks=1, bids_per_block=0, auctions_per_block=0):
+        """Produce new blocks containing bids on random auctions and new auctions"""
+        with self.lock:
+            for _ in range(blocks):
+                self.head += 1
+                self.mined_blocks += 1
+                first_log_index = self._include_mempool()
+                for _ in range(auctions_per_block):
+                    self.auction_count += 1
+                    self.created_blocks[self.auction_count] = self.head
+                    self.address_index[
+                        self.dataset.auction_address(self.auction_count).lower()
+                    ] = self.auction_count
+                for log_index in range(bids_per_block):
+                    auction_id = self.rng.randint(1, self.auction_count)
+                    previous = self.bids(auction_id)
+                    amount = (previous[-1]["amount"] if previous else 10**16) + 10**15
+                    self.extra_bids[auction_id].append(
+                        {
+                            "bidder": self.rng.choice(BIDDERS),
+                            "amount": amount,
+                            "block_number": self.head,
+                            "log_index": first_log_index + log_index,
+                        }
+                    )
+                if self.reorg_interval and self.mined_blocks % self.reorg_interval == 0:
+                    self.reorg()
+                for listener in self.block_listeners:
+                    listener(self.head)
+            return self.head
+
+    def reorg(self):
+        """Replace the last `reorg_depth` blocks with siblings carrying new hashes"""
+        for number in range(self.head - self.reorg_depth + 1, self.head + 1):
+            self.fork_epochs[number] = self.fork_epochs.get(number, 0) + 1
+        self.reorgs += 1
+
+    # Logs
+
+    def _log(self, address, topics, data, block, log_index, tx_hash=None):
+        return {
+            "address": address,
+            "topics": topics,
+            "data": "0x" + data.hex(),
+            "blockNumber": _hex(block),
+            "blockHash": self.block_hash(block),
+            "transactionHash": tx_hash or self.tx_hash(block, address, log_index),
+            "transactionIndex": _hex(log_index),
+            "logIndex": _hex(log_index),
+            "removed": False,
+        }
+
+    def _created_log(self, auction_id):
+        details = self.auction(auction_id)
+        data = encode(
+            ["uint256", "address", "uint8"],
+            [auction_id, details["auction_address"], details["auction_type"]],
+        )
+        return self._log(
+            FACTORY_ADDRESS, [AUCTION_CREATED_TOPIC], data, details["created_block"], 0
+        )
+
+    def _bid_logs(self, auction_id, from_block, to_block):
+        address = self.dataset.auction_address(auction_id)
+        return [
+            self._log(
+                address,
+                [BID_PLACED_TOPIC],
+                encode(["address", "uint256"], [bid["bidder"], bid["amount"]]),
+                bid["block_number"],
+                bid["log_index"],
+                bid.get("tx_hash"),
+            )
+            for bid in self.bids(auction_id)
+            if from_block <= bid["block_number"] <= to_block
+        ]
+
+    def get_logs(self, flt):
+        from_block = _block_arg(flt.get("fromBlock"), self.head)
+        to_block = _block_arg(flt.get("toBlock"), self.head)
+        addresses = flt.get("address")
+        if isinstance(addresses, str):
+            addresses = [addresses]
+        topics = flt.get("topics") or []
+        wanted = topics[0] if topics else None
+        if isinstance(wanted, str):
+            wanted = [wanted]
+
+        def topic_ok(t):
+            return wanted is None or t in wanted
+
+        logs = []
+        if addresses is None:
+            addresses = [FACTORY_ADDRESS] + [
+                self.dataset.auction_address(i) for i in range(1, self.auction_count + 1)
+            ]
+        for address in addresses:
+            if address.lower() == FACTORY_ADDRESS.lower():
+                if not topic_ok(AUCTION_CREATED_TOPIC):
+                    continue
+                # Seeded auction i is created in block GENESIS_BLOCK + i
+                first = max(from_block - GENESIS_BLOCK, 1)
+                last = min(to_block - GENESIS_BLOCK, self.dataset.auction_count)
+                auction_ids = list(range(first, last + 1))
+                auction_ids += [
+                    i for i, block in self.created_blocks.items() if from_block <= block <= to_block
+                ]
+                logs.extend(self._created_log(i) for i in auction_ids)
+            else:
+                auction_id = self.address_index.get(address.lower())
+                if auction_id is None or not topic_ok(BID_PLACED_TOPIC):
+                    continue
+                logs.extend(self._bid_logs(auction_id, from_block, to_block))
+        logs.sort(key=lambda log: (int(log["blockNumber"], 16), int(log["logIndex"], 16)))
+        return logs
+
+    # Calls
+
+    def call(self, tx):
+        to = Web3.to_checksum_address(tx["to"])
+        data = tx.get("data") or tx.get("input") or "0x"
+        sel, args = data[:10], bytes.fromhex(data[10:])
+
+        if to == FACTORY_ADDRESS:
+            if sel == SEL_AUCTION_COUNT:
+                return encode(["uint256"], [self.auction_count])
+            if sel == SEL_AUCTIONS:
+                (auction_id,) = decode(["uint256"], args)
+                if 1 <= auction_id <= self.auction_count:
+                    return encode(["address"], [self.dataset.auction_address(auction_id)])
+                return encode(["address"], ["0x" + "00" * 20])
+            raise revert()
+
+        if to == MULTICALL3_ADDRESS and sel == SEL_AGGREGATE3:
+            (calls,) = decode(["(address,bool,bytes)[]"], args)
+            results = []
+            for target, allow_failure, call_data in calls:
+                try:
+                    results.append((True, self.call({"to": target, "data": "0x" + call_data.hex()})))
+                except RPCError:
+                    if not allow_failure:
+                        raise
+                    results.append((False, b""))
+            return encode(["(bool,bytes)[]"], [results])
+
+        auction_id = self.address_index.get(to.lower())
+        if auction_id is not None:
+            return self._auction_call(auction_id, sel)
+        if to in PAYMENT_TOKENS or to in ASSET_TOKENS:
+            token = self.dataset.token(to)
+            if sel == SEL_SYMBOL:
+                return encode(["string"], [token["symbol"]])
+            if sel == SEL_NAME:
+                return encode(["string"], [token["name"]])
+            if sel == SEL_DECIMALS:
+                return encode(["uint8"], [token["decimals"]])
+        if to in NFT_COLLECTIONS and sel == SEL_TOKEN_URI:
+            (token_id,) = decode(["uint256"], args)
+            return encode(["string"], [f"{self.metadata_base_url}/metadata/{to}/{token_id}"])
+        raise revert()
+
+    def _auction_call(self, auction_id, sel):
+        d = self.auction(auction_id)
+        if sel == SEL_DETAILS:
+            return encode(
+                ["address", "address", "uint256", "uint256", "bool", "address", "uint256", "uint256", "address"],
+                [
+                    d["seller"], d["highest_bidder"], d["highest_bid"], d["end_time"], d["ended"],
+                    d["asset_address"], d["asset_id"], d["amount"], d["payment_token"],
+                ],
+            )
+        if d["auction_type"] == 1:
+            if sel == SEL_CURRENT_PRICE:
+                return encode(["uint256"], [max(d["reserve_price"], d["starting_price"] // 2)])
+            if sel == SEL_RESERVE_PRICE:
+                return encode(["uint256"], [d["reserve_price"]])
+            if sel == SEL_DURATION:
+                return encode(["uint256"], [7 * 86400])
+        raise revert()
+
+    def get_block(self, number):
+        if number > self.head:
+            return None
+        return {
+            "number": _hex(number),
+            "hash": self.block_hash(number),
+            "parentHash": self.block_hash(number - 1) if number else "0x" + "00" * 32,
+            "timestamp": _hex(self.dataset.block_timestamp(number)),
+            "miner": "0x" + "00" * 20,
+            "difficulty": "0x0",
+            "totalDifficulty": "0x0",
+            "extraData": "0x",
+            "size": "0x0",
+            "gasLimit": _hex(30_000_000),
+            "gasUsed": "0x0",
+            "baseFeePerGas": _hex(10**9),
+            "nonce": "0x0000000000000000",
+            "sha3Uncles": "0x" + "00" * 32,
+            "logsBloom": "0x" + "00" * 256,
+            "stateRoot": "0x" + "00" * 32,
+            "receiptsRoot": "0x" + "00" * 32,
+            "transactionsRoot": "0x" + "00" * 32,
+            "transactions": [],
+            "uncles": [],
+        }
+
+    # JSON-RPC dispatch
+
+    def handle(self, method, params):
+        with self.lock:
+            if method == "eth_chainId":
+                return _hex(self.chain_id)
+            if method == "net_version":
+                return str(self.chain_id)
+            if method == "eth_blockNumber":
+                return _hex(self.head)
+            if method == "eth_getBlockByNumber":
+                return self.get_block(_block_arg(params[0], self.head))
+            if method == "eth_getLogs":
+                return self.get_logs(params[0])
+            if method == "eth_call":
+                return "0x" + self.call(params[0]).hex()
+            if method == "eth_getTransactionByHash":
+                return self.get_transaction(params[0])
+            if method == "eth_newPendingTransactionFilter":
+                filter_id = _hex(next(self.filter_ids))
+                self.pending_filters[filter_id] = []
+                return filter_id
+            if method == "eth_getFilterChanges":
+                if params[0] not in self.pending_filters:
+                    raise RPCError(-32000, "filter not found")
+                changes, self.pending_filters[params[0]] = self.pending_filters[params[0]], []
+                return changes
+            if method == "eth_uninstallFilter":
+                return self.pending_filters.pop(params[0], None) is not None
+            if method == "bench_mine":
+                return _hex(self.mine(*params))
+            if method == "bench_submitBid":
+                return self.submit_bid(*params)
+        raise RPCError(-32601, f"Method {method} not supported")
+
+    def handle_payload(self, payload):
+        if isinstance(payload, list):
+            return [self.handle_payload(item) for item in payload]
+        response = {"jsonrpc": "2.0", "id": payload.get("id")}
+        try:
+            response["result"] = self.handle(payload["method"], payload.get("params") or [])
+        except RPCError as e:
+            response["error"] = {"code": e.code, "message": e.message}
+            if e.data is not None:
+                response["error"]["data"] = e.data
+        return response
+
+
+def make_handler(chain):
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+        # Headers and body go out in separate writes; without this every
+        # response waits on a delayed ACK
+        disable_nagle_algorithm = True
+
+        def _send(self, status, body):
+            payload = json.dumps(body).encode()
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(payload)))
+            self.end_headers()
+            self.wfile.write(payload)
+
+        def do_POST(self):
+            length = int(self.headers.get("Content-Length", 0))
+            payload = json.loads(self.rfile.read(length))
+            self._send(200, chain.handle_payload(payload))
+
+        def do_GET(self):
+            parts = self.path.strip("/").split("/")
+            if len(parts) == 3 and parts[0] == "metadata":
+                address = Web3.to_checksum_address(parts[1])
+                if address in NFT_COLLECTIONS:
+                    self._send(200, chain.dataset.nft(address, int(parts[2])))
+                    return
+            self._send(404, {"error": "not found"})
+
+        def log_message(self, format, *args):
+            pass
+
+    return Handler
+
+
+def serve(chain, host="127.0.0.1", port=0):
+    """Start the fake node in a background thread and return (server, url)"""
+    server = ThreadingHTTPServer((host, port), make_handler(chain))
+    server.daemon_threads = True
+    url = f"http://{host}:{server.server_address[1]}"
+    chain.metadata_base_url = url
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, url
+
+
+class FakeWebSocketNode:
+    """JSON-RPC over WebSocket with eth_subscribe("newHeads") and eth_subscribe("logs", filter)"""
+
+    def __init__(self, chain):
+        self.chain = chain
+        self.loop = None
+        self.server = None
+        self.subscriptions = {}  # id -> (connection, kind, log filter)
+        self.ids = itertools.count(1)
+        chain.block_listeners.append(self._on_block)
+
+    async def _handle(self, connection):
+        try:
+            async for message in connection:
+                payload = json.loads(message)
+                method = payload.get("method")
+                params = payload.get("params") or []
+                response = {"jsonrpc": "2.0", "id": payload.get("id")}
+                if method == "eth_subscribe":
+                    subscription = hex(next(self.ids))
+                    log_filter = params[1] if len(params) > 1 else {}
+                    self.subscriptions[subscription] = (connection, params[0], log_filter)
+                    response["result"] = subscription
+                elif method == "eth_unsubscribe":
+                    response["result"] = self.subscriptions.pop(params[0], None) is not None
+                else:
+                    response = self.chain.handle_payload(payload)
+                await connection.send(json.dumps(response))
+        except Exception:
+            pass
+        finally:
+            for subscription, (owner, _, _) in list(self.subscriptions.items()):
+                if owner is connection:
+                    del self.subscriptions[subscription]
+
+    def _on_block(self, number):
+        if self.loop is not None:
+            self.loop.call_soon_threadsafe(lambda: self.loop.create_task(self._announce(number)))
+
+    async def _announce(self, number):
+        for subscription, (connection, kind, log_filter) in list(self.subscriptions.items()):
+            if kind == "newHeads":
+                header = self.chain.get_block(number)
+                results = [{k: v for k, v in header.items() if k not in ("transactions", "uncles")}]
+            elif kind == "logs":
+                results = self.chain.get_logs({**log_filter, "fromBlock": hex(number), "toBlock": hex(number)})
+            else:
+                continue
+            for result in results:
+                notification = {
+                    "jsonrpc": "2.0",
+                    "method": "eth_subscription",
+                    "params": {"subscription": subscription, "result": result},
+                }
+                try:
+                    await connection.send(json.dumps(notification))
+                except Exception:
+                    break
+
+    def disconnect_all(self):
+        """Drop every client connection, as a node restart would"""
+        async def close():
+            for connection in {c for c, _, _ in self.subscriptions.values()}:
+                await connection.close()
+
+        asyncio.run_coroutine_threadsafe(close(), self.loop).result()
+
+
+def serve_ws(chain, host="127.0.0.1", port=0):
+    """Start a WebSocket endpoint for `chain` in a background thread; returns (node, url)"""
+    import websockets
+
+    node = FakeWebSocketNode(chain)
+    started = threading.Event()
+
+    async def run():
+        node.loop = asyncio.get_running_loop()
+        node.server = await websockets.serve(node._handle, host, port)
+        started.set()
+        await asyncio.Future()
+
+    threading.Thread(target=asyncio.run, args=(run(),), daemon=True).start()
+    started.wait()
+    port = list(node.server.sockets)[0].getsockname()[1]
+    return node, f"ws://{host}:{port}"
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--auctions", type=int, default=10_000)
+    parser.add_argument("--bids-per-auction", type=int, default=3)
+    parser.add_argument("--reorg-interval", type=int, default=0, help="Reorg every N mined blocks")
+    parser.add_argument("--reorg-depth", type=int, default=2)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--chain-id", type=int, default=CHAIN_ID, help="Use another seed per chain too")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8545)
+    parser.add_argument("--ws-port", type=int, help="Also serve JSON-RPC with subscriptions over WebSocket")
+    args = parser.parse_args()
+
+    chain = FakeChain(
+        Dataset(args.auctions, args.bids_per_auction, args.seed),
+        reorg_interval=args.reorg_interval,
+        reorg_depth=args.reorg_depth,
+        chain_id=args.chain_id,
+    )
+    server, url = serve(chain, args.host, args.port)
+    print(f"Fake chain with {args.auctions} auctions listening on {url} (head {chain.head})")
+    if args.ws_port is not None:
+        _, ws_url = serve_ws(chain, args.host, args.ws_port)
+        print(f"WebSocket endpoint on {ws_url}")
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
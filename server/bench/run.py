@@ -0,0 +1,411 @@
+"""Benchmark scenarios for the caching server.
+
+    python -m bench.run api --auctions 10000 --requests 2000
+    python -m bench.run cold-sync --auctions 2000
+    python -m bench.run listener-cycle --auctions 10000 --cycles 5
+    python -m bench.run serialize --auctions 10000 --page-size 100
+    python -m bench.run ingest-latency --transport ws --cycles 20
+    python -m bench.run all --output bench-results.json
+
+Run from the server directory. Every scenario prints (or writes) a JSON
+document with its parameters, the environment and the measurements, so
+results from two commits can be diffed directly. `all` runs each scenario
+in its own interpreter because the server modules read their config once
+at import time.
+"""
+import argparse
+import json
+import os
+import platform
+import random
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+SCENARIOS = ("api", "cold-sync", "listener-cycle", "serialize", "ingest-latency")
+
+
+def percentile(values, pct):
+    if not values:
+        return None
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, round(pct / 100 * len(ordered)) - 1))
+    return ordered[index]
+
+
+def latency_summary(latencies, wall_seconds):
+    return {
+        "requests": len(latencies),
+        "throughput_rps": round(len(latencies) / wall_seconds, 1) if wall_seconds else None,
+        "p50_ms": round(percentile(latencies, 50) * 1000, 3),
+        "p99_ms": round(percentile(latencies, 99) * 1000, 3),
+        "max_ms": round(max(latencies) * 1000, 3),
+    }
+
+
+def environment():
+    try:
+        commit = subprocess.run(
+            ["git", "rev-parse", "HEAD"], capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = None
+    return {
+        "commit": commit,
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+        "timestamp": int(time.time()),
+    }
+
+
+def configure(database_url, rpc_url="http://127.0.0.1:9"):
+    """Point the server modules at the benchmark DB/node; call before importing them"""
+    os.environ["DATABASE_URL"] = database_url
+    os.environ["RPC_URL"] = rpc_url
+    os.environ["CHAIN_ID"] = "31337"  # The fake chain's default
+    os.environ["SYNC_INTERVAL"] = "0"
+    # Keep the listener's chain data journal with the benchmark DB
+    os.environ["LOG_ARCHIVE_DIR"] = os.path.join(os.path.dirname(database_url.split("///", 1)[-1]), "log_archive")
+
+
+def rpc_request_counts():
+    from prometheus_client import REGISTRY
+
+    counts = {}
+    for metric in REGISTRY.collect():
+        if metric.name == "auction_rpc_request_duration_seconds":
+            for sample in metric.samples:
+                if sample.name.endswith("_count"):
+                    counts[sample.labels["method"]] = int(sample.value)
+    return counts
+
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def run_api(args, workdir):
+    from bench.dataset import Dataset
+
+    database_url = f"sqlite:///{workdir}/api.db"
+    configure(database_url)
+    from bench.seed_db import seed
+
+    dataset = Dataset(args.auctions, args.bids_per_auction, args.seed)
+    started = time.perf_counter()
+    seed(database_url, dataset, log=lambda msg: None)
+    seed_seconds = time.perf_counter() - started
+
+    import requests
+    import uvicorn
+    from server import app
+
+    port = free_port()
+    server = uvicorn.Server(uvicorn.Config(app, host="127.0.0.1", port=port, log_level="warning"))
+    thread = threading.Thread(target=server.run, daemon=True)
+    thread.start()
+    while not server.started:
+        time.sleep(0.05)
+
+    base = f"http://127.0.0.1:{port}"
+    rng = random.Random(args.seed)
+    ids = [rng.randint(1, args.auctions) for _ in range(args.requests)]
+    endpoints = {
+        "/auctions?status=active&page_size=100": lambda i: "/auctions?status=active&page_size=100",
+        "/auctions?page_size=10": lambda i: f"/auctions?page={ids[i] % 50}&page_size=10",
+        "/auctions/{id}": lambda i: f"/auctions/{ids[i]}",
+        "/auctions/{id}/bids": lambda i: f"/auctions/{ids[i]}/bids",
+    }
+
+    local = threading.local()
+
+    def fetch(path):
+        session = getattr(local, "session", None)
+        if session is None:
+            session = local.session = requests.Session()
+        start = time.perf_counter()
+        response = session.get(base + path)
+        elapsed = time.perf_counter() - start
+        response.raise_for_status()
+        return elapsed, len(response.content)
+
+    results = {}
+    for name, make_path in endpoints.items():
+        for i in range(min(args.warmup, args.requests)):
+            fetch(make_path(i))
+        wall_start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=args.concurrency) as pool:
+            samples = list(pool.map(fetch, [make_path(i) for i in range(args.requests)]))
+        wall = time.perf_counter() - wall_start
+        summary = latency_summary([s[0] for s in samples], wall)
+        summary["mean_bytes"] = round(sum(s[1] for s in samples) / len(samples))
+        results[name] = summary
+
+    server.should_exit = True
+    thread.join(timeout=10)
+    return {"seed_seconds": round(seed_seconds, 2), "endpoints": results}
+
+
+def start_fake_chain(args, auctions=None):
+    from bench.dataset import Dataset
+    from bench.fake_chain import FakeChain, serve
+
+    chain = FakeChain(
+        Dataset(auctions or args.auctions, args.bids_per_auction, args.seed),
+        reorg_interval=args.reorg_interval,
+        reorg_depth=args.reorg_depth,
+    )
+    _, url = serve(chain)
+    return chain, url
+
+
+def run_cold_sync(args, workdir):
+    chain, url = start_fake_chain(args)
+    configure(f"sqlite:///{workdir}/cold.db", url)
+    from blockchain_listener import BlockchainListener
+    from derived import prepare_database
+
+    prepare_database()
+    listener = BlockchainListener()
+    started = time.perf_counter()
+    listener.sync_auctions_from_contract()
+    elapsed = time.perf_counter() - started
+
+    from db_models import Auction
+
+    synced = listener.db.query(Auction).count()
+    listener.db.close()
+    return {
+        "auctions_synced": synced,
+        "sync_seconds": round(elapsed, 3),
+        "auctions_per_second": round(synced / elapsed, 1) if elapsed else None,
+        "rpc_requests": rpc_request_counts(),
+    }
+
+
+def run_listener_cycle(args, workdir):
+    chain, url = start_fake_chain(args)
+    database_url = f"sqlite:///{workdir}/listener.db"
+    configure(database_url, url)
+    from bench.seed_db import seed
+
+    seed(database_url, chain.dataset, log=lambda msg: None)
+
+    from blockchain_listener import BlockchainListener
+    from derived import prepare_database
+
+    prepare_database()
+
+    listener = BlockchainListener()
+    listener.last_block_processed = chain.head
+    cycles = []
+    for _ in range(args.cycles):
+        chain.mine(args.blocks_per_cycle, args.bids_per_block, args.auctions_per_block)
+        started = time.perf_counter()
+        listener.listen_for_events()
+        cycles.append(time.perf_counter() - started)
+    listener.db.close()
+
+    return {
+        "cycles": len(cycles),
+        "p50_ms": round(percentile(cycles, 50) * 1000, 1),
+        "max_ms": round(max(cycles) * 1000, 1),
+        "cycle_ms": [round(c * 1000, 1) for c in cycles],
+        "reorgs": chain.reorgs,
+        "rpc_requests": rpc_request_counts(),
+    }
+
+
+def run_serialize(args, workdir):
+    """Build and encode one /auctions page: ORM + response_model validation vs rows + orjson"""
+    from bench.dataset import Dataset
+
+    database_url = f"sqlite:///{workdir}/serialize.db"
+    configure(database_url)
+    from bench.seed_db import seed
+
+    seed(database_url, Dataset(args.auctions, args.bids_per_auction, args.seed), log=lambda msg: None)
+
+    import orjson
+    from pydantic import TypeAdapter
+    from typing import List
+    from db_models import Auction, SessionLocal
+    from payloads import AUCTION_COLUMNS, auction_list_dict, load_auction_details
+    from server import AuctionResponse
+
+    adapter = TypeAdapter(List[AuctionResponse])
+
+    def validated(db):
+        # What FastAPI does for a response_model: validate, dump to JSON types, json.dumps
+        auctions = db.query(Auction).order_by(Auction.end_time).limit(args.page_size).all()
+        payload = load_auction_details(db, auctions, auction_list_dict)
+        content = adapter.dump_python(adapter.validate_python(payload), mode="json")
+        return json.dumps(content, ensure_ascii=False, separators=(",", ":")).encode()
+
+    def fast(db):
+        auctions = db.query(*AUCTION_COLUMNS).order_by(Auction.end_time).limit(args.page_size).all()
+        return orjson.dumps(load_auction_details(db, auctions, auction_list_dict))
+
+    results = {}
+    db = SessionLocal()
+    for name, render in (("orm_validated", validated), ("rows_orjson", fast)):
+        for _ in range(args.warmup):
+            body = render(db)
+        timings = []
+        for _ in range(args.requests):
+            start = time.perf_counter()
+            render(db)
+            timings.append(time.perf_counter() - start)
+        results[name] = {
+            "p50_ms": round(percentile(timings, 50) * 1000, 3),
+            "p99_ms": round(percentile(timings, 99) * 1000, 3),
+            "bytes": len(body),
+        }
+    results["identical"] = validated(db) == fast(db)
+    db.close()
+
+    results["speedup"] = round(results["orm_validated"]["p50_ms"] / results["rows_orjson"]["p50_ms"], 2)
+    return {"page_size": args.page_size, "renders": results}
+
+
+def run_ingest_latency(args, workdir):
+    """Time from a block being mined to its bids being stored, pushed over WebSocket or polled.
+
+    With --transport ws the node drops the connection halfway through, so the
+    fallback to polling and the backfill after reconnecting are measured too.
+    """
+    import asyncio
+
+    from bench.fake_chain import serve_ws
+
+    chain, url = start_fake_chain(args)
+    node, ws_url = serve_ws(chain)
+    database_url = f"sqlite:///{workdir}/ingest.db"
+    configure(database_url, url)
+    os.environ["SYNC_INTERVAL"] = str(args.poll_interval)
+    os.environ["WS_RETRY_SECONDS"] = "2"
+    if args.transport == "ws":
+        os.environ["WS_RPC_URL"] = ws_url
+    from bench.seed_db import seed
+
+    seed(database_url, chain.dataset, log=lambda msg: None)
+
+    from blockchain_listener import BlockchainListener
+    from db_models import Bid, SessionLocal
+    from derived import prepare_database
+
+    prepare_database()
+    listener = BlockchainListener()
+    listener.last_block_processed = chain.head
+    threading.Thread(
+        target=asyncio.run, args=(listener.start_listening(args.poll_interval),), daemon=True
+    ).start()
+
+    db = SessionLocal()
+    latencies, missed = [], 0
+    for i in range(args.cycles):
+        if args.transport == "ws" and i == args.cycles // 2:
+            node.disconnect_all()
+        time.sleep(args.block_time)
+        block = chain.mine(1, args.bids_per_block)
+        started = time.perf_counter()
+        while time.perf_counter() - started < args.poll_interval * 4:
+            db.rollback()
+            stored = db.query(Bid.id).filter(Bid.block_number == block).count()
+            if stored >= args.bids_per_block:
+                latencies.append(time.perf_counter() - started)
+                break
+            time.sleep(0.005)
+        else:
+            missed += 1
+    db.close()
+
+    return {
+        "transport": args.transport,
+        "blocks": args.cycles,
+        "missed": missed,
+        "p50_ms": round(percentile(latencies, 50) * 1000, 1) if latencies else None,
+        "max_ms": round(max(latencies) * 1000, 1) if latencies else None,
+        "rpc_requests": rpc_request_counts(),
+    }
+
+
+RUNNERS = {
+    "api": run_api,
+    "cold-sync": run_cold_sync,
+    "listener-cycle": run_listener_cycle,
+    "serialize": run_serialize,
+    "ingest-latency": run_ingest_latency,
+}
+
+
+def run_all(args, argv):
+    results = []
+    for scenario in SCENARIOS:
+        child = subprocess.run(
+            [sys.executable, "-m", "bench.run", scenario] + argv,
+            capture_output=True,
+            text=True,
+        )
+        if child.returncode != 0:
+            sys.stderr.write(child.stderr)
+            raise SystemExit(f"Scenario {scenario} failed")
+        results.append(json.loads(child.stdout))
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run server benchmark scenarios")
+    parser.add_argument("scenario", choices=SCENARIOS + ("all",))
+    parser.add_argument("--auctions", type=int, default=10_000)
+    parser.add_argument("--bids-per-auction", type=int, default=3)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--requests", type=int, default=1_000, help="Requests per API endpoint")
+    parser.add_argument("--warmup", type=int, default=50)
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--page-size", type=int, default=100, help="Auctions per page for serialize")
+    parser.add_argument("--cycles", type=int, default=5)
+    parser.add_argument("--blocks-per-cycle", type=int, default=3)
+    parser.add_argument("--bids-per-block", type=int, default=10)
+    parser.add_argument("--auctions-per-block", type=int, default=1)
+    parser.add_argument("--reorg-interval", type=int, default=0)
+    parser.add_argument("--reorg-depth", type=int, default=2)
+    parser.add_argument("--transport", choices=["ws", "poll"], default="ws", help="For ingest-latency")
+    parser.add_argument("--block-time", type=float, default=0.5, help="Seconds between mined blocks")
+    parser.add_argument("--poll-interval", type=float, default=5, help="Longest wait between polls")
+    parser.add_argument("--output", help="Write JSON results to this file instead of stdout")
+    args = parser.parse_args()
+
+    if args.scenario == "all":
+        argv = [a for a in sys.argv[2:]]
+        if "--output" in argv:
+            index = argv.index("--output")
+            del argv[index : index + 2]
+        document = {"environment": environment(), "scenarios": run_all(args, argv)}
+    else:
+        params = {k: v for k, v in vars(args).items() if k not in ("scenario", "output")}
+        with tempfile.TemporaryDirectory() as workdir:
+            document = {
+                "scenario": args.scenario,
+                "params": params,
+                "environment": environment(),
+                "results": RUNNERS[args.scenario](args, workdir),
+            }
+
+    payload = json.dumps(document, indent=2)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(payload + "\n")
+    else:
+        print(payload)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,143 @@
+"""Seed an auctions database with a synthetic dataset.
+
+    python -m bench.seed_db --auctions 100000 --database-url sqlite:///./bench.db
+
+Rows mirror what the listener would have written after syncing the same
+`Dataset` from the fake chain, so API and listener scenarios can share it.
+"""
+import argparse
+import time
+
+from sqlalchemy import create_engine, event
+
+from bench.dataset import ASSET_TOKENS, PAYMENT_TOKENS, Dataset
+from db_models import Auction, Base, Bid, NFTMetadata, TokenMetadata
+from formatting import format_ether
+
+CHUNK_SIZE = 10_000
+
+
+def auction_row(dataset, details):
+    return {
+        "auction_id": str(details["auction_id"]),
+        "auction_address": details["auction_address"],
+        "auction_type": details["auction_type"],
+        "seller": details["seller"],
+        "highest_bidder": details["highest_bidder"],
+        "highest_bid": str(details["highest_bid"]),
+        "end_time": details["end_time"],
+        "ended": details["ended"],
+        "asset_address": details["asset_address"],
+        "asset_id": details["asset_id"],
+        "amount": str(details["amount"]),
+        "amount_ether": format_ether(details["amount"]),
+        "payment_token": details["payment_token"],
+        "created_at": details["created_block"],
+        "updated_block": max(
+            [details["created_block"]] + [b["block_number"] for b in dataset.bids(details["auction_id"])]
+        ),
+        "status": dataset.status(details),
+        "token_symbol": dataset.token(details["payment_token"])["symbol"],
+        "reserve_price": str(details["reserve_price"]) if details["auction_type"] == 1 else None,
+        "current_price": None,
+    }
+
+
+def bid_rows(dataset, details):
+    return [
+        {
+            "auction_address": details["auction_address"],
+            "bidder": bid["bidder"],
+            "amount": str(bid["amount"]),
+            "block_number": bid["block_number"],
+            "timestamp": dataset.block_timestamp(bid["block_number"]),
+            "tx_hash": dataset.tx_hash(bid["block_number"], details["auction_address"], bid["log_index"]),
+            "log_index": bid["log_index"],
+        }
+        for bid in dataset.bids(details["auction_id"])
+    ]
+
+
+def _fast_sqlite(engine):
+    if engine.dialect.name != "sqlite":
+        return
+
+    @event.listens_for(engine, "connect")
+    def _pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        cursor.execute("PRAGMA journal_mode=OFF")
+        cursor.execute("PRAGMA synchronous=OFF")
+        cursor.close()
+
+
+def seed(database_url, dataset, log=print):
+    """Create the schema at `database_url` and bulk insert `dataset` into it"""
+    engine = create_engine(database_url)
+    _fast_sqlite(engine)
+    Base.metadata.create_all(bind=engine)
+    now = int(time.time())
+
+    with engine.begin() as conn:
+        conn.execute(
+            TokenMetadata.__table__.insert(),
+            [
+                {
+                    "token_address": address,
+                    "image_url": f"https://via.placeholder.com/128x128?text={token['symbol']}",
+                    "last_updated": now,
+                    **token,
+                }
+                for address in PAYMENT_TOKENS + ASSET_TOKENS
+                for token in [dataset.token(address)]
+            ],
+        )
+
+    seen_nfts = set()
+    for start in range(1, dataset.auction_count + 1, CHUNK_SIZE):
+        end = min(start + CHUNK_SIZE, dataset.auction_count + 1)
+        auctions, bids, nfts = [], [], []
+        for auction_id in range(start, end):
+            details = dataset.auction(auction_id)
+            auctions.append(auction_row(dataset, details))
+            bids.extend(bid_rows(dataset, details))
+            key = (details["asset_address"], details["asset_id"])
+            if details["amount"] == 0 and key not in seen_nfts:
+                seen_nfts.add(key)
+                metadata = dataset.nft(*key)
+                nfts.append(
+                    {
+                        "asset_address": key[0],
+                        "asset_id": key[1],
+                        "image_url": metadata["image"].replace("ipfs://", "https://ipfs.io/ipfs/"),
+                        "name": metadata["name"],
+                        "description": metadata["description"],
+                        "last_updated": now,
+                    }
+                )
+
+        with engine.begin() as conn:
+            conn.execute(Auction.__table__.insert(), auctions)
+            if bids:
+                conn.execute(Bid.__table__.insert(), bids)
+            if nfts:
+                conn.execute(NFTMetadata.__table__.insert(), nfts)
+        log(f"Seeded auctions {start} to {end - 1}")
+
+    engine.dispose()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Seed an auctions database with synthetic data")
+    parser.add_argument("--auctions", type=int, default=10_000)
+    parser.add_argument("--bids-per-auction", type=int, default=3)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--database-url", default="sqlite:///./bench.db")
+    args = parser.parse_args()
+
+    started = time.perf_counter()
+    seed(args.database_url, Dataset(args.auctions, args.bids_per_auction, args.seed))
+    print(f"Seeded {args.auctions} auctions in {time.perf_counter() - started:.1f}s")
+
+
+if __name__ == "__main__":
+    main()
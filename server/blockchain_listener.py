@@ -1,74 +1,215 @@
+import functools
 import json
 import time
 import logging
 import requests
 from web3 import Web3
 from web3.exceptions import ContractLogicError
-from sqlalchemy import func
+from sqlalchemy import func, tuple_
 import asyncio
+import threading
+from collections import namedtuple
 
 from config import (
-    RPC_URL,
-    FACTORY_CONTRACT_ADDRESS,
     FACTORY_ABI_PATH,
     AUCTION_ABI_PATH,
     DUTCH_AUCTION_ABI_PATH,
+    READ_MODEL_ENABLED,
+    CURSOR_REWIND_BLOCKS,
+    MAX_LOG_RANGE,
+    LOG_ADDRESS_LIMIT,
+    POLL_INTERVAL_MIN,
+    ARCHIVE_INTERVAL,
+    REPUTATION_VERIFY_INTERVAL,
+    RECONCILE_CALLS_PER_MINUTE,
+    MEDIA_FETCH_TIMEOUT,
+)
+from db_models import ArchivedAuction, Auction, Bid, NFTMetadata, TokenMetadata, SessionLocal
+from archive import archive_ended_auctions
+from derived import rebuild_bid_tables
+from log_archive import LogJournal
+from formatting import format_ether
+from read_model import active_auctions
+from search import index_nft, index_token
+from media import MediaFetchError, gateway_url, is_immutable, media_cache, register_media
+from multicall import MulticallUnavailable, aggregate
+from rollups import record_collection_bid, refresh_floor
+from ingest_cursor import load_cursor, save_cursor
+from mempool import pending_bids
+from sources import cursor_name, journal_directory, primary_source
+from portfolio import record_bidder, record_seller, refresh_participants
+from reputation import record_bid_placed, record_listing, record_outcome, verify_reputation
+from stats import record_auction_created, record_bid, record_status_change
+from metrics import (
+    COALESCE_CALLS,
+    COALESCED_CALLS,
+    EVENTS_INGESTED,
+    HEAD_BLOCK,
+    INGEST_LAG_BLOCKS,
+    LAST_PROCESSED_BLOCK,
+    LISTENER_CYCLE_SECONDS,
+    METADATA_QUEUE_DEPTH,
+    POLL_INTERVAL_SECONDS,
+    rpc_metrics_middleware,
 )
-from db_models import Auction, Bid, NFTMetadata, TokenMetadata, init_db, SessionLocal
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
-# Initialize web3
-w3 = Web3(Web3.HTTPProvider(RPC_URL))
-
-# Load contract ABIs
-with open(FACTORY_ABI_PATH) as f:
-    factory_abi = json.load(f)
-
-with open(AUCTION_ABI_PATH) as f:
-    auction_abi = json.load(f)
-
-with open(DUTCH_AUCTION_ABI_PATH) as f:
-    dutch_auction_abi = json.load(f)
-
-# Initialize contract with checksum address
-factory_contract = w3.eth.contract(
-    address=Web3.to_checksum_address(FACTORY_CONTRACT_ADDRESS), abi=factory_abi
-)
-
-# Create a combined ABI for auction contracts that includes both English and Dutch auction functions
-combined_auction_abi = auction_abi.copy()
-for entry in dutch_auction_abi:
-    if not any(
-        e.get("name") == entry.get("name")
-        for e in combined_auction_abi
-        if "name" in e and "name" in entry
-    ):
-        combined_auction_abi.append(entry)
-
-# Event signatures
-AUCTION_CREATED_EVENT = Web3.keccak(
-    text="AuctionCreated(uint256,address,uint8,address)"
-).hex()
-BID_PLACED_EVENT = "BidPlaced(address,uint256)"
+ContractABIs = namedtuple("ContractABIs", ["factory", "auction", "combined_auction"])
+
+ERC20_METADATA_ABI = [
+    {"constant": True, "inputs": [], "name": "symbol", "outputs": [{"name": "", "type": "string"}], "payable": False, "stateful": False, "type": "function"},
+    {"constant": True, "inputs": [], "name": "name", "outputs": [{"name": "", "type": "string"}], "payable": False, "stateful": False, "type": "function"},
+    {"constant": True, "inputs": [], "name": "decimals", "outputs": [{"name": "", "type": "uint8"}], "payable": False, "stateful": False, "type": "function"},
+]
+ERC721_METADATA_ABI = [
+    {
+        "inputs": [{"internalType": "uint256", "name": "tokenId", "type": "uint256"}],
+        "name": "tokenURI",
+        "outputs": [{"internalType": "string", "name": "", "type": "string"}],
+        "stateMutability": "view",
+        "type": "function",
+    }
+]
+METADATA_TTL = 86400  # Seconds before stored metadata is fetched again
+
+# Listeners for different chains share the stats, rollup, reputation and metadata
+# rows they get-or-create, so only one of them writes at a time. The lock covers
+# a batch of writes and its commit; RPC and HTTP calls are made before taking it
+write_lock = threading.RLock()
+
+
+def _serialized(method):
+    @functools.wraps(method)
+    def wrapper(*args, **kwargs):
+        with write_lock:
+            return method(*args, **kwargs)
+
+    return wrapper
+
+
+@functools.lru_cache(maxsize=None)
+def load_abis():
+    """Load contract ABIs on first use rather than at import time"""
+    with open(FACTORY_ABI_PATH) as f:
+        factory_abi = json.load(f)
+
+    with open(AUCTION_ABI_PATH) as f:
+        auction_abi = json.load(f)
+
+    with open(DUTCH_AUCTION_ABI_PATH) as f:
+        dutch_auction_abi = json.load(f)
+
+    # Create a combined ABI for auction contracts that includes both English and Dutch auction functions
+    combined_auction_abi = auction_abi.copy()
+    for entry in dutch_auction_abi:
+        if not any(
+            e.get("name") == entry.get("name")
+            for e in combined_auction_abi
+            if "name" in e and "name" in entry
+        ):
+            combined_auction_abi.append(entry)
+
+    return ContractABIs(factory_abi, auction_abi, combined_auction_abi)
+
+
+# Event topics
+AUCTION_CREATED_TOPIC = Web3.to_hex(Web3.keccak(text="AuctionCreated(uint256,address,uint8)"))
+BID_PLACED_TOPIC = Web3.to_hex(Web3.keccak(text="BidPlaced(address,uint256)"))
+AUCTION_TOPICS = [[AUCTION_CREATED_TOPIC, BID_PLACED_TOPIC]]
+
+
+# Column mappings shared with replay.py, so replayed rows match ingested ones
+def details_fields(details):
+    """Auction columns taken from fetch_auction_details when an auction is first stored"""
+    return {
+        "highest_bidder": details["highest_bidder"],
+        "highest_bid": details["highest_bid"],
+        "end_time": details["end_time"],
+        "ended": details["ended"],
+        "asset_address": details["asset_address"],
+        "asset_id": details["asset_id"],
+        "amount": details["amount"],
+        "amount_ether": details["amount_ether"],
+        "payment_token": details["payment_token"],
+        "status": details["status"],
+        "token_symbol": details["token_symbol"],
+    }
+
+
+def dutch_fields(details):
+    fields = {}
+    if "reservePrice" in details:
+        fields["reserve_price"] = details["reservePrice"]
+    if "currentPrice" in details:
+        fields["current_price"] = details["currentPrice"]
+    return fields
+
+
+def status_fields(details):
+    """Auction columns refreshed when an auction is re-checked; `details` is None if that failed"""
+    if not details:
+        return {"status": "ended"}
+    return {
+        "ended": details["ended"],
+        "status": details["status"],
+        "highest_bidder": details["highest_bidder"],
+        "highest_bid": details["highest_bid"],
+        "end_time": details["end_time"],
+    }
 
 
 class BlockchainListener:
-    def __init__(self):
+    def __init__(self, source=None):
+        # Nothing here touches the network; the RPC is first used by start_listening
+        self.source = source or primary_source()
+        self.chain_id = self.source.chain_id
+        self.chain = str(self.chain_id)  # Metric label
+        self.cursor_name = cursor_name(self.source)
+        self.abis = load_abis()
+        self.w3 = Web3(Web3.HTTPProvider(self.source.rpc_url))
+        self.w3.middleware_onion.add(rpc_metrics_middleware, "metrics")
+        self.factory_address = Web3.to_checksum_address(self.source.factory)
+        self.factory_contract = self.w3.eth.contract(
+            address=self.factory_address, abi=self.abis.factory
+        )
+        # Decodes BidPlaced logs from any auction contract
+        self.auction_events = self.w3.eth.contract(abi=self.abis.auction)
         self.db = SessionLocal()
-        self.last_block_processed = self.get_last_processed_block()
+        self.last_block_processed = None
+        self.auction_addresses = None
+        self.last_archived = 0
+        # Nightly, not at startup: prepare_database already backfills an empty table
+        self.last_reputation_check = time.time()
+        self.reconciler = None
+        self.journal = LogJournal(journal_directory(self.source))
+        if READ_MODEL_ENABLED:
+            active_auctions.track(self.db)
 
     def get_last_processed_block(self):
         """Get the last block we processed from the database or start from current block"""
-        last_auction = self.db.query(func.max(Auction.created_at)).scalar()
+        cursor = load_cursor(self.db, self.cursor_name)
+        if cursor:
+            if cursor.block_hash and self.get_block_hash(cursor.block_number) != cursor.block_hash:
+                logger.warning(
+                    f"Block {cursor.block_number} changed since it was processed, "
+                    f"rewinding {CURSOR_REWIND_BLOCKS} blocks"
+                )
+                rewind_block = max(cursor.block_number - CURSOR_REWIND_BLOCKS, 0)
+                self.drop_bids_after(rewind_block)
+                return rewind_block
+            return cursor.block_number
+        last_auction = (
+            self.db.query(func.max(Auction.created_at)).filter(Auction.chain_id == self.chain_id).scalar()
+        )
         if last_auction:
             return last_auction
         # Повторная попытка для block_number
         for attempt in range(5):
             try:
-                return w3.eth.block_number - 1000
+                return self.w3.eth.block_number - 1000
             except Exception as e:
                 logger.error(f"Error getting block number, attempt {attempt + 1}: {e}")
                 if attempt == 0:
@@ -76,11 +217,63 @@ class BlockchainListener:
                 else:
                     raise
 
+    def drop_bids_after(self, block_number):
+        """Delete bids from blocks after `block_number`, which a reorg may have replaced.
+
+        Their transactions can come back with new hashes or not at all, so the
+        rescan from `block_number` stores them again. Their auctions are
+        re-read from the contract and the tables counting bids rebuilt.
+        """
+        orphaned = self.db.query(Bid).filter(Bid.chain_id == self.chain_id, Bid.block_number > block_number)
+        addresses = [address for (address,) in orphaned.with_entities(Bid.auction_address).distinct()]
+        if not addresses:
+            return
+        checked = [(address, self.fetch_auction_details(address)) for address in addresses]
+
+        with write_lock:
+            self.journal.rewind(block_number)
+            orphaned.delete(synchronize_session=False)
+            for address, details in checked:
+                self.journal.details(address, block_number, details)
+                auction = self.db.query(Auction).filter_by(chain_id=self.chain_id, auction_address=address).first()
+                if auction:
+                    for field, value in status_fields(details).items():
+                        setattr(auction, field, value)
+                    auction.updated_block = block_number
+            rebuild_bid_tables(self.db)
+        self.journal.flush()
+        logger.info(f"Dropped bids after block {block_number} on {len(addresses)} auctions")
+
+    def known_auction_addresses(self):
+        """Addresses of stored auctions, loaded once and kept current as auctions are added"""
+        if self.auction_addresses is None:
+            self.auction_addresses = {
+                a for (a,) in self.db.query(Auction.auction_address).filter(Auction.chain_id == self.chain_id)
+            }
+        return self.auction_addresses
+
+    def check_chain_id(self):
+        """Warn when the RPC node serves a different chain than the source is configured for"""
+        try:
+            node_chain_id = self.w3.eth.chain_id
+        except Exception as e:
+            logger.error(f"Error getting chain id: {e}")
+            return
+        if node_chain_id != self.chain_id:
+            logger.warning(
+                f"RPC {self.source.rpc_url} serves chain {node_chain_id}, but its rows are tagged "
+                f"chain {self.chain_id}; set CHAIN_ID or the source's chain_id"
+            )
+
+    def get_block_hash(self, block_number):
+        block = self.w3.eth.get_block(block_number)
+        return Web3.to_hex(block["hash"]) if block else None
+
     def fetch_auction_details(self, auction_address):
         """Fetch detailed information about an auction from the blockchain"""
         try:
-            auction_contract = w3.eth.contract(
-                address=auction_address, abi=combined_auction_abi
+            auction_contract = self.w3.eth.contract(
+                address=auction_address, abi=self.abis.combined_auction
             )
 
             # Повторная попытка для getAuctionDetails
@@ -105,7 +298,7 @@ class BlockchainListener:
                     auction_type = 0
 
             try:
-                token_contract = w3.eth.contract(
+                token_contract = self.w3.eth.contract(
                     address=details[8],
                     abi=[
                         {
@@ -159,6 +352,7 @@ class BlockchainListener:
                 "asset_address": details[5],
                 "asset_id": details[6],
                 "amount": str(details[7]),
+                "amount_ether": format_ether(details[7]),
                 "payment_token": details[8],
                 "auction_type": auction_type,
                 "status": status,
@@ -177,22 +371,11 @@ class BlockchainListener:
     def fetch_nft_metadata(self, asset_address, asset_id):
         """Fetch enhanced metadata for an NFT including image, title and description"""
         try:
-            existing = self.db.query(NFTMetadata).filter_by(asset_address=asset_address, asset_id=asset_id).first()
-            if existing and (int(time.time()) - existing.last_updated) < 86400:
+            existing = self.db.query(NFTMetadata).filter_by(chain_id=self.chain_id, asset_address=asset_address, asset_id=asset_id).first()
+            if existing and (int(time.time()) - existing.last_updated) < METADATA_TTL:
                 return existing
 
-            nft_contract = w3.eth.contract(
-                address=asset_address,
-                abi=[
-                    {
-                        "inputs": [{"internalType": "uint256", "name": "tokenId", "type": "uint256"}],
-                        "name": "tokenURI",
-                        "outputs": [{"internalType": "string", "name": "", "type": "string"}],
-                        "stateMutability": "view",
-                        "type": "function",
-                    }
-                ],
-            )
+            nft_contract = self.w3.eth.contract(address=asset_address, abi=ERC721_METADATA_ABI)
 
             # Повторная попытка для tokenURI
             for attempt in range(5):
@@ -206,44 +389,46 @@ class BlockchainListener:
                     else:
                         raise
 
-            if token_uri.startswith("ipfs://"):
-                token_uri = f"https://ipfs.io/ipfs/{token_uri[7:]}"
-
-            response = requests.get(token_uri)
-            if response.status_code == 200:
-                metadata = response.json()
-                image_url = metadata.get("image", "")
-                name = metadata.get("name", f"NFT #{asset_id}")
-                description = metadata.get("description", "No description available")
-
-                if image_url.startswith("ipfs://"):
-                    image_url = f"https://ipfs.io/ipfs/{image_url[7:]}"
+            document = self.nft_document(asset_address, asset_id, token_uri)
+            if document is not None:
+                image_url, name, description = document
 
-                if existing:
-                    existing.image_url = image_url
-                    existing.name = name
-                    existing.description = description
-                    existing.last_updated = int(time.time())
-                    self.db.commit()
-                    logger.info(f"Updated NFT metadata for {asset_address}/{asset_id}: {name}")
-                    return existing
-                else:
-                    nft_metadata = NFTMetadata(
-                        asset_address=asset_address,
-                        asset_id=asset_id,
-                        image_url=image_url,
-                        name=name,
-                        description=description,
-                        last_updated=int(time.time()),
+                with write_lock:
+                    # Read again under the lock in case the row was stored meanwhile
+                    existing = (
+                        self.db.query(NFTMetadata).filter_by(chain_id=self.chain_id, asset_address=asset_address, asset_id=asset_id).first()
                     )
-                    self.db.add(nft_metadata)
-                    self.db.commit()
-                    logger.info(f"Added NFT metadata for {asset_address}/{asset_id}: {name}")
-                    return nft_metadata
+                    if existing:
+                        existing.image_url = image_url
+                        existing.name = name
+                        existing.description = description
+                        existing.last_updated = int(time.time())
+                        index_nft(self.db, existing)
+                        register_media(self.db, image_url)
+                        self.db.commit()
+                        logger.info(f"Updated NFT metadata for {asset_address}/{asset_id}: {name}")
+                        return existing
+                    else:
+                        nft_metadata = NFTMetadata(
+                            chain_id=self.chain_id,
+                            asset_address=asset_address,
+                            asset_id=asset_id,
+                            image_url=image_url,
+                            name=name,
+                            description=description,
+                            last_updated=int(time.time()),
+                        )
+                        self.db.add(nft_metadata)
+                        index_nft(self.db, nft_metadata)
+                        register_media(self.db, image_url)
+                        self.db.commit()
+                        logger.info(f"Added NFT metadata for {asset_address}/{asset_id}: {name}")
+                        return nft_metadata
         except Exception as e:
             logger.error(f"Error fetching NFT metadata for {asset_address}/{asset_id}: {e}")
 
         return NFTMetadata(
+            chain_id=self.chain_id,
             asset_address=asset_address,
             asset_id=asset_id,
             image_url=f"https://via.placeholder.com/300x200?text=NFT+{asset_id}",
@@ -252,21 +437,31 @@ class BlockchainListener:
             last_updated=int(time.time()),
         )
 
+    def nft_document(self, asset_address, asset_id, token_uri):
+        """(image_url, name, description) from an NFT's metadata document, or None when unavailable"""
+        # IPFS documents never change, so they come from the media cache when present
+        try:
+            body, _ = media_cache.fetch(token_uri, cache=is_immutable(token_uri))
+        except MediaFetchError as e:
+            logger.warning(f"No metadata for {asset_address}/{asset_id}: {e}")
+            return None
+        metadata = json.loads(body)
+        image_url = metadata.get("image", "")
+        name = metadata.get("name", f"NFT #{asset_id}")
+        description = metadata.get("description", "No description available")
+
+        if image_url.startswith("ipfs://"):
+            image_url = gateway_url(image_url)
+        return image_url, name, description
+
     def fetch_token_metadata(self, token_address):
         """Fetch metadata for an ERC20 token including symbol, name and logo"""
         try:
-            existing = self.db.query(TokenMetadata).filter_by(token_address=token_address).first()
-            if existing and (int(time.time()) - existing.last_updated) < 86400:
+            existing = self.db.query(TokenMetadata).filter_by(chain_id=self.chain_id, token_address=token_address).first()
+            if existing and (int(time.time()) - existing.last_updated) < METADATA_TTL:
                 return existing
 
-            token_contract = w3.eth.contract(
-                address=token_address,
-                abi=[
-                    {"constant": True, "inputs": [], "name": "symbol", "outputs": [{"name": "", "type": "string"}], "payable": False, "stateful": False, "type": "function"},
-                    {"constant": True, "inputs": [], "name": "name", "outputs": [{"name": "", "type": "string"}], "payable": False, "stateful": False, "type": "function"},
-                    {"constant": True, "inputs": [], "name": "decimals", "outputs": [{"name": "", "type": "uint8"}], "payable": False, "stateful": False, "type": "function"},
-                ],
-            )
+            token_contract = self.w3.eth.contract(address=token_address, abi=ERC20_METADATA_ABI)
 
             symbol = "Unknown"
             name = "Unknown Token"
@@ -301,43 +496,44 @@ class BlockchainListener:
             except Exception as e:
                 logger.warning(f"Couldn't get all token details for {token_address}: {e}")
 
-            image_url = f"https://raw.githubusercontent.com/trustwallet/assets/master/blockchains/ethereum/assets/{token_address}/logo.png"
-            fallback_image = f"https://via.placeholder.com/128x128?text={symbol}"
+            image_url = self.token_image_url(token_address, symbol)
 
-            try:
-                img_response = requests.head(image_url)
-                if img_response.status_code != 200:
-                    image_url = fallback_image
-            except:
-                image_url = fallback_image
-
-            if existing:
-                existing.symbol = symbol
-                existing.name = name
-                existing.image_url = image_url
-                existing.decimals = decimals
-                existing.last_updated = int(time.time())
-                self.db.commit()
-                logger.info(f"Updated token metadata for {token_address}: {symbol}")
-                return existing
-            else:
-                token_metadata = TokenMetadata(
-                    token_address=token_address,
-                    symbol=symbol,
-                    name=name,
-                    image_url=image_url,
-                    decimals=decimals,
-                    last_updated=int(time.time()),
-                )
-                self.db.add(token_metadata)
-                self.db.commit()
-                logger.info(f"Added token metadata for {token_address}: {symbol}")
-                return token_metadata
+            with write_lock:
+                # Read again under the lock in case the row was stored meanwhile
+                existing = self.db.query(TokenMetadata).filter_by(chain_id=self.chain_id, token_address=token_address).first()
+                if existing:
+                    existing.symbol = symbol
+                    existing.name = name
+                    existing.image_url = image_url
+                    existing.decimals = decimals
+                    existing.last_updated = int(time.time())
+                    index_token(self.db, existing)
+                    register_media(self.db, image_url)
+                    self.db.commit()
+                    logger.info(f"Updated token metadata for {token_address}: {symbol}")
+                    return existing
+                else:
+                    token_metadata = TokenMetadata(
+                        chain_id=self.chain_id,
+                        token_address=token_address,
+                        symbol=symbol,
+                        name=name,
+                        image_url=image_url,
+                        decimals=decimals,
+                        last_updated=int(time.time()),
+                    )
+                    self.db.add(token_metadata)
+                    index_token(self.db, token_metadata)
+                    register_media(self.db, image_url)
+                    self.db.commit()
+                    logger.info(f"Added token metadata for {token_address}: {symbol}")
+                    return token_metadata
 
         except Exception as e:
             logger.error(f"Error fetching token metadata for {token_address}: {e}")
 
             return TokenMetadata(
+                chain_id=self.chain_id,
                 token_address=token_address,
                 symbol="Unknown",
                 name="Unknown Token",
@@ -346,19 +542,185 @@ class BlockchainListener:
                 last_updated=int(time.time()),
             )
 
+    def token_image_url(self, token_address, symbol):
+        """The token's Trust Wallet logo if there is one, else a placeholder"""
+        fallback_image = f"https://via.placeholder.com/128x128?text={symbol}"
+        if not self.source.trustwallet_chain:
+            return fallback_image
+        image_url = (
+            "https://raw.githubusercontent.com/trustwallet/assets/master/blockchains/"
+            f"{self.source.trustwallet_chain}/assets/{token_address}/logo.png"
+        )
+
+        try:
+            img_response = requests.head(image_url, timeout=MEDIA_FETCH_TIMEOUT)
+            if img_response.status_code != 200:
+                image_url = fallback_image
+        except:
+            image_url = fallback_image
+        return image_url
+
+    def metadata_lookups(self, details):
+        """Build the metadata lookups needed for a newly stored auction"""
+        if details["amount"] == "0":
+            lookups = [(self.fetch_nft_metadata, (details["asset_address"], details["asset_id"]))]
+        else:
+            lookups = [(self.fetch_token_metadata, (details["asset_address"],))]
+        lookups.append((self.fetch_token_metadata, (details["payment_token"],)))
+        return lookups
+
+    def resolve_metadata(self, lookups):
+        """Resolve queued metadata lookups, keeping the queue depth gauge current"""
+        # Auctions in a batch mostly share a few payment tokens; look each one up once
+        unique = list(dict.fromkeys(lookups))
+        self.record_coalesced(lookups, unique)
+        lookups = unique
+        METADATA_QUEUE_DEPTH.inc(len(lookups))
+        for fetch, args in lookups:
+            try:
+                fetch(*args)
+            finally:
+                METADATA_QUEUE_DEPTH.dec()
+
+    def record_coalesced(self, lookups, unique):
+        COALESCE_CALLS.labels("listener_metadata").inc(len(lookups))
+        COALESCED_CALLS.labels("listener_metadata").inc(len(lookups) - len(unique))
+
+    def prefetch_metadata(self, lookups):
+        """Resolve a sync batch's metadata lookups with multicalls and write the rows in one commit"""
+        unique = list(dict.fromkeys(lookups))
+        tokens = [args[0] for fetch, args in unique if fetch == self.fetch_token_metadata]
+        nfts = [args for fetch, args in unique if fetch == self.fetch_nft_metadata]
+
+        # Only what is missing or older than METADATA_TTL goes to the chain
+        now = int(time.time())
+        token_rows = {}
+        if tokens:
+            token_rows = {
+                row.token_address: row
+                for row in self.db.query(TokenMetadata).filter(
+                    TokenMetadata.chain_id == self.chain_id, TokenMetadata.token_address.in_(tokens)
+                )
+            }
+        nft_rows = {}
+        if nfts:
+            nft_rows = {
+                (row.asset_address, row.asset_id): row
+                for row in self.db.query(NFTMetadata).filter(
+                    NFTMetadata.chain_id == self.chain_id,
+                    tuple_(NFTMetadata.asset_address, NFTMetadata.asset_id).in_(nfts),
+                )
+            }
+        stale_tokens = [t for t in tokens if t not in token_rows or now - token_rows[t].last_updated >= METADATA_TTL]
+        stale_nfts = [n for n in nfts if n not in nft_rows or now - nft_rows[n].last_updated >= METADATA_TTL]
+        if not stale_tokens and not stale_nfts:
+            self.record_coalesced(lookups, unique)
+            return
+
+        calls = []
+        for token_address in stale_tokens:
+            functions = self.w3.eth.contract(address=token_address, abi=ERC20_METADATA_ABI).functions
+            calls += [functions.symbol(), functions.name(), functions.decimals()]
+        for asset_address, asset_id in stale_nfts:
+            functions = self.w3.eth.contract(address=asset_address, abi=ERC721_METADATA_ABI).functions
+            calls.append(functions.tokenURI(asset_id))
+        try:
+            results = aggregate(self.w3, calls)
+        except MulticallUnavailable as e:
+            logger.warning(f"Multicall unavailable, fetching metadata call by call: {e}")
+            self.resolve_metadata(lookups)
+            return
+        except Exception as e:
+            logger.error(f"Error prefetching metadata: {e}")
+            return
+
+        self.record_coalesced(lookups, unique)
+        METADATA_QUEUE_DEPTH.inc(len(stale_tokens) + len(stale_nfts))
+        try:
+            token_values = {}
+            for i, token_address in enumerate(stale_tokens):
+                symbol, name, decimals = results[3 * i : 3 * i + 3]
+                symbol = symbol if symbol is not None else "Unknown"
+                token_values[token_address] = {
+                    "symbol": symbol,
+                    "name": name if name is not None else "Unknown Token",
+                    "decimals": decimals if decimals is not None else 18,
+                    "image_url": self.token_image_url(token_address, symbol),
+                    "last_updated": now,
+                }
+
+            documents = {}
+            token_uris = results[3 * len(stale_tokens) :]
+            for (asset_address, asset_id), token_uri in zip(stale_nfts, token_uris):
+                if token_uri is None:
+                    logger.warning(f"No tokenURI for {asset_address}/{asset_id}")
+                    continue
+                try:
+                    document = self.nft_document(asset_address, asset_id, token_uri)
+                except Exception as e:
+                    logger.error(f"Error fetching NFT metadata for {asset_address}/{asset_id}: {e}")
+                    continue
+                if document is not None:
+                    documents[(asset_address, asset_id)] = document
+
+            with write_lock:
+                # Read again under the lock in case some of the rows were stored meanwhile
+                if token_values:
+                    token_rows = {
+                        row.token_address: row
+                        for row in self.db.query(TokenMetadata).filter(
+                            TokenMetadata.chain_id == self.chain_id, TokenMetadata.token_address.in_(token_values)
+                        )
+                    }
+                if documents:
+                    nft_rows = {
+                        (row.asset_address, row.asset_id): row
+                        for row in self.db.query(NFTMetadata).filter(
+                            NFTMetadata.chain_id == self.chain_id,
+                            tuple_(NFTMetadata.asset_address, NFTMetadata.asset_id).in_(documents),
+                        )
+                    }
+                for token_address, values in token_values.items():
+                    token = token_rows.get(token_address)
+                    if token is None:
+                        token = TokenMetadata(chain_id=self.chain_id, token_address=token_address)
+                        self.db.add(token)
+                    for key, value in values.items():
+                        setattr(token, key, value)
+                    index_token(self.db, token)
+                    register_media(self.db, token.image_url)
+                for (asset_address, asset_id), document in documents.items():
+                    nft = nft_rows.get((asset_address, asset_id))
+                    if nft is None:
+                        nft = NFTMetadata(chain_id=self.chain_id, asset_address=asset_address, asset_id=asset_id)
+                        self.db.add(nft)
+                    nft.image_url, nft.name, nft.description = document
+                    nft.last_updated = now
+                    index_nft(self.db, nft)
+                    register_media(self.db, nft.image_url)
+                self.db.commit()
+            logger.info(f"Prefetched metadata for {len(stale_tokens)} tokens and {len(stale_nfts)} NFTs")
+        except Exception as e:
+            logger.error(f"Error storing prefetched metadata: {e}")
+            self.db.rollback()
+        finally:
+            METADATA_QUEUE_DEPTH.dec(len(stale_tokens) + len(stale_nfts))
+
     def process_auction_created_event(self, event):
         """Process an AuctionCreated event"""
         try:
-            auction_id = event["args"]["auctionId"]
+            auction_id = str(event["args"]["auctionId"])
             auction_address = event["args"]["auctionAddress"]
             auction_type = event["args"]["auctionType"]
             seller = event["args"]["seller"] if len(event["args"]) > 3 else None
 
-            existing = self.db.query(Auction).filter_by(auction_id=str(auction_id)).first()
-            if existing:
+            key = {"chain_id": self.chain_id, "auction_id": auction_id}
+            existing = self.db.query(Auction).filter_by(**key).first()
+            if existing or self.db.query(ArchivedAuction.id).filter_by(**key).first():
                 return
 
             details = self.fetch_auction_details(auction_address)
+            self.journal.details(auction_address, event["blockNumber"], details)
             if not details:
                 return
 
@@ -366,37 +728,28 @@ class BlockchainListener:
                 seller = details["seller"]
 
             auction = Auction(
-                auction_id=str(auction_id),
+                auction_id=auction_id,
                 auction_address=auction_address,
+                chain_id=self.chain_id,
                 auction_type=auction_type,
                 seller=seller,
-                highest_bidder=details["highest_bidder"],
-                highest_bid=details["highest_bid"],
-                end_time=details["end_time"],
-                ended=details["ended"],
-                asset_address=details["asset_address"],
-                asset_id=details["asset_id"],
-                amount=details["amount"],
-                payment_token=details["payment_token"],
                 created_at=event["blockNumber"],
-                status=details["status"],
-                token_symbol=details["token_symbol"],
+                updated_block=event["blockNumber"],
+                **details_fields(details),
+                **dutch_fields(details),
             )
 
-            if "reservePrice" in details:
-                auction.reserve_price = details["reservePrice"]
-            if "currentPrice" in details:
-                auction.current_price = details["currentPrice"]
-
-            self.db.add(auction)
-            self.db.commit()
-
-            if details["amount"] == "0":
-                self.fetch_nft_metadata(details["asset_address"], details["asset_id"])
-            else:
-                self.fetch_token_metadata(details["asset_address"])
+            with write_lock:
+                self.db.add(auction)
+                record_auction_created(self.db, auction)
+                record_seller(self.db, auction)
+                record_listing(self.db, auction)
+                refresh_floor(self.db, auction)
+                self.db.commit()
+            self.known_auction_addresses().add(auction_address)
+            EVENTS_INGESTED.labels("AuctionCreated").inc()
 
-            self.fetch_token_metadata(details["payment_token"])
+            self.resolve_metadata(self.metadata_lookups(details))
 
             logger.info(f"Added new auction {auction_id} at address {auction_address}")
 
@@ -409,16 +762,25 @@ class BlockchainListener:
         try:
             bidder = event["args"]["bidder"]
             amount = str(event["args"]["amount"])
+            tx_hash = Web3.to_hex(event["transactionHash"])
+            log_index = event["logIndex"]
 
-            auction = self.db.query(Auction).filter_by(auction_address=auction_address).first()
+            auction = (
+                self.db.query(Auction).filter_by(auction_address=auction_address, chain_id=self.chain_id).first()
+            )
             if not auction:
                 logger.warning(f"Received bid for unknown auction: {auction_address}")
                 return
 
+            # Blocks are re-scanned after a restart; skip logs we already stored
+            if self.db.query(Bid.id).filter_by(chain_id=self.chain_id, tx_hash=tx_hash, log_index=log_index).first():
+                return
+
             # Повторная попытка для get_block
             for attempt in range(5):
                 try:
-                    timestamp = w3.eth.get_block(event["blockNumber"])["timestamp"]
+                    timestamp = self.w3.eth.get_block(event["blockNumber"])["timestamp"]
+                    self.journal.block(event["blockNumber"], timestamp)
                     break
                 except Exception as e:
                     logger.error(f"Error getting block timestamp, attempt {attempt + 1}: {e}")
@@ -429,57 +791,123 @@ class BlockchainListener:
 
             bid = Bid(
                 auction_address=auction_address,
+                chain_id=self.chain_id,
                 bidder=bidder,
                 amount=amount,
                 block_number=event["blockNumber"],
                 timestamp=timestamp,
+                tx_hash=tx_hash,
+                log_index=log_index,
             )
 
-            self.db.add(bid)
-            auction.highest_bidder = bidder
-            auction.highest_bid = amount
-
-            self.db.commit()
+            with write_lock:
+                self.db.add(bid)
+                previous_bidder, previous_bid = auction.highest_bidder, auction.highest_bid
+                auction.highest_bidder = bidder
+                auction.highest_bid = amount
+                auction.updated_block = event["blockNumber"]
+                record_bid(self.db, auction, amount)
+                record_collection_bid(self.db, auction, amount, timestamp)
+                refresh_floor(self.db, auction)
+                participation = record_bidder(self.db, auction, bid)
+                record_bid_placed(
+                    self.db, auction, bid, previous_bidder, previous_bid, first=participation.bid_count == 1
+                )
+                self.db.commit()
+            pending_bids.confirm(self.chain_id, auction_address, tx_hash, amount)
+            EVENTS_INGESTED.labels("BidPlaced").inc()
             logger.info(f"Added new bid from {bidder} for auction {auction_address}")
 
         except Exception as e:
             logger.error(f"Error processing bid placed event: {e}")
             self.db.rollback()
 
-    def update_auction_statuses(self):
+    def update_auction_statuses(self, block_number=None):
         """Update the status of all auctions based on current time"""
         try:
             current_time = int(time.time())
             expired_auctions = self.db.query(Auction).filter(
+                Auction.chain_id == self.chain_id,
                 ~Auction.ended,
                 Auction.status == "active",
                 Auction.end_time < current_time,
             ).all()
-
-            for auction in expired_auctions:
-                details = self.fetch_auction_details(auction.auction_address)
-                if details:
-                    auction.ended = details["ended"]
-                    auction.status = details["status"]
-                    auction.highest_bidder = details["highest_bidder"]
-                    auction.highest_bid = details["highest_bid"]
-                else:
-                    auction.status = "ended"
-
-            self.db.commit()
+            checked = [(auction, self.fetch_auction_details(auction.auction_address)) for auction in expired_auctions]
+
+            with write_lock:
+                for auction, details in checked:
+                    previous_status = auction.status
+                    self.journal.details(auction.auction_address, block_number, details)
+                    # Settled auctions count as closed, unsettled ones as expired
+                    record_outcome(self.db, auction, sign=-1)
+                    for field, value in status_fields(details).items():
+                        setattr(auction, field, value)
+                    record_status_change(self.db, previous_status, auction.status)
+                    record_outcome(self.db, auction)
+                    refresh_participants(self.db, auction)
+                    refresh_floor(self.db, auction)
+                    if block_number is not None:
+                        auction.updated_block = block_number
+                self.db.commit()
+            self.journal.flush()
             logger.info(f"Updated statuses for {len(expired_auctions)} expired auctions")
 
         except Exception as e:
             logger.error(f"Error updating auction statuses: {e}")
             self.db.rollback()
 
+    @_serialized
+    def archive_if_due(self):
+        """Move long-ended auctions to the archive at most once per ARCHIVE_INTERVAL"""
+        # Archiving covers every chain; only the primary source's worker runs it
+        if not self.source.primary or time.time() - self.last_archived < ARCHIVE_INTERVAL:
+            return
+        self.last_archived = time.time()
+        try:
+            if archive_ended_auctions(self.db):
+                self.auction_addresses = None
+        except Exception as e:
+            logger.error(f"Error archiving ended auctions: {e}")
+            self.db.rollback()
+
+    @_serialized
+    def verify_reputation_if_due(self):
+        """Recompute reputation in full once per REPUTATION_VERIFY_INTERVAL to catch incremental drift"""
+        if (
+            not self.source.primary
+            or not REPUTATION_VERIFY_INTERVAL
+            or time.time() - self.last_reputation_check < REPUTATION_VERIFY_INTERVAL
+        ):
+            return
+        self.last_reputation_check = time.time()
+        try:
+            verify_reputation(self.db)
+        except Exception as e:
+            logger.error(f"Error verifying reputation: {e}")
+            self.db.rollback()
+
+    def reconcile(self):
+        """Re-check the next bucket of stored auctions against their contracts (see reconciler.py)"""
+        if not RECONCILE_CALLS_PER_MINUTE:
+            return
+        if self.reconciler is None:
+            from reconciler import DriftReconciler
+
+            self.reconciler = DriftReconciler(self)
+        try:
+            self.reconciler.run()
+        except Exception as e:
+            logger.error(f"Error reconciling auctions: {e}")
+            self.db.rollback()
+
     def sync_auctions_from_contract(self):
         """Sync all auctions from the factory contract's mapping"""
         try:
             # Повторная попытка для auctionCount
             for attempt in range(5):
                 try:
-                    auction_count = factory_contract.functions.auctionCount().call()
+                    auction_count = self.factory_contract.functions.auctionCount().call()
+                    sync_block = self.w3.eth.block_number
                     break
                 except Exception as e:
                     logger.error(f"Error calling auctionCount, attempt {attempt + 1}: {e}")
@@ -490,23 +918,27 @@ class BlockchainListener:
 
             logger.info(f"Total auctions in contract: {auction_count}")
 
-            db_auctions = self.db.query(Auction.auction_id).all()
+            db_auctions = self.db.query(Auction.auction_id).filter(Auction.chain_id == self.chain_id).all()
+            db_auctions += (
+                self.db.query(ArchivedAuction.auction_id).filter(ArchivedAuction.chain_id == self.chain_id).all()
+            )
             db_auction_ids = {a[0] for a in db_auctions}
 
             batch_size = 50
             for i in range(1, auction_count + 1, batch_size):
                 batch_end = min(i + batch_size, auction_count + 1)
                 logger.info(f"Syncing auctions {i} to {batch_end - 1}")
-
+                synced = []
                 for auction_id in range(i, batch_end):
-                    if str(auction_id) in db_auction_ids:
+                    key = str(auction_id)
+                    if key in db_auction_ids:
                         continue
 
                     try:
                         # Повторная попытка для auctions
                         for attempt in range(5):
                             try:
-                                auction_address = factory_contract.functions.auctions(auction_id).call()
+                                auction_address = self.factory_contract.functions.auctions(auction_id).call()
                                 break
                             except Exception as e:
                                 logger.error(f"Error calling auctions({auction_id}), attempt {attempt + 1}: {e}")
@@ -516,41 +948,43 @@ class BlockchainListener:
                                     raise
 
                         details = self.fetch_auction_details(auction_address)
-                        if not details:
-                            continue
+                        if details:
+                            synced.append((key, auction_address, details))
 
+                    except Exception as e:
+                        logger.error(f"Error syncing auction {auction_id}: {e}")
+                        continue
+
+                # The batch's contracts are read before the lock is taken, so other
+                # chains' listeners can write in the meantime
+                metadata_queue = []
+                with write_lock:
+                    for key, auction_address, details in synced:
+                        self.journal.synced(key, auction_address, sync_block, details)
                         auction = Auction(
-                            auction_id=str(auction_id),
+                            auction_id=key,
                             auction_address=auction_address,
+                            chain_id=self.chain_id,
                             auction_type=details["auction_type"],
                             seller=details["seller"],
-                            highest_bidder=details["highest_bidder"],
-                            highest_bid=details["highest_bid"],
-                            end_time=details["end_time"],
-                            ended=details["ended"],
-                            asset_address=details["asset_address"],
-                            asset_id=details["asset_id"],
-                            amount=details["amount"],
-                            payment_token=details["payment_token"],
                             created_at=0,
-                            status=details["status"],
-                            token_symbol=details["token_symbol"],
+                            updated_block=sync_block,
+                            **details_fields(details),
                         )
 
                         self.db.add(auction)
-                        logger.info(f"Added auction {auction_id} from contract sync")
-
-                        if details["amount"] == "0":
-                            self.fetch_nft_metadata(details["asset_address"], details["asset_id"])
-                        else:
-                            self.fetch_token_metadata(details["asset_address"])
-                        self.fetch_token_metadata(details["payment_token"])
-
-                    except Exception as e:
-                        logger.error(f"Error syncing auction {auction_id}: {e}")
-                        continue
-
-                self.db.commit()
+                        record_auction_created(self.db, auction)
+                        record_seller(self.db, auction)
+                        record_listing(self.db, auction)
+                        refresh_floor(self.db, auction)
+                        EVENTS_INGESTED.labels("AuctionSynced").inc()
+                        logger.info(f"Added auction {key} from contract sync")
+
+                        metadata_queue.extend(self.metadata_lookups(details))
+                    self.db.commit()
+                self.journal.flush()
+                self.auction_addresses = None
+                self.prefetch_metadata(metadata_queue)
 
             logger.info("Auction sync completed")
 
@@ -558,13 +992,77 @@ class BlockchainListener:
             logger.error(f"Error syncing auctions: {e}")
             self.db.rollback()
 
+    def log_filters(self, addresses=None):
+        """Filters for AuctionCreated/BidPlaced logs from the factory and known auctions, within LOG_ADDRESS_LIMIT each"""
+        if addresses is None:
+            addresses = [self.factory_address] + sorted(self.known_auction_addresses())
+        return [
+            {"address": addresses[i : i + LOG_ADDRESS_LIMIT], "topics": AUCTION_TOPICS}
+            for i in range(0, len(addresses), LOG_ADDRESS_LIMIT)
+        ]
+
+    def range_logs(self, from_block, to_block, addresses=None):
+        """Auction logs in a block range, in chain order"""
+        logs = []
+        for log_filter in self.log_filters(addresses):
+            logs += self.get_logs_with_retry({**log_filter, "fromBlock": from_block, "toBlock": to_block})
+        logs.sort(key=lambda log: (log["blockNumber"], log["logIndex"]))
+        return logs
+
+    def get_logs_with_retry(self, log_filter):
+        # Повторная попытка для get_logs
+        for attempt in range(5):
+            try:
+                return self.w3.eth.get_logs(log_filter)
+            except Exception as e:
+                logger.error(f"Error getting logs, attempt {attempt + 1}: {e}")
+                if attempt == 0:
+                    time.sleep(0.5)
+                else:
+                    raise
+
+    def process_logs(self, logs):
+        """Apply AuctionCreated logs from the factory and BidPlaced logs from known auctions.
+
+        Returns how many logs were auction events; already stored ones are skipped.
+        """
+        processed = 0
+        for event_log in logs:
+            # Logs of blocks that were reorged out; the replacement blocks carry the new ones
+            if event_log.get("removed") or not event_log["topics"]:
+                continue
+            topic = Web3.to_hex(event_log["topics"][0])
+            address = event_log["address"]
+            try:
+                # Only logs that are applied go to the journal; replay needs nothing else
+                if topic == AUCTION_CREATED_TOPIC and address == self.factory_address:
+                    event = self.factory_contract.events.AuctionCreated().process_log(event_log)
+                    self.journal.log(event_log)
+                    self.process_auction_created_event(event)
+                elif topic == BID_PLACED_TOPIC and address in self.known_auction_addresses():
+                    event = self.auction_events.events.BidPlaced().process_log(event_log)
+                    self.journal.log(event_log)
+                    self.process_bid_placed_event(event, address)
+                else:
+                    continue
+            except Exception as e:
+                logger.error(f"Error decoding log {Web3.to_hex(event_log['transactionHash'])}: {e}")
+                continue
+            processed += 1
+        return processed
+
     def listen_for_events(self):
-        """Listen for events from the last processed block"""
+        """Process every block from the last processed one to the head; returns the events found"""
         try:
+            if self.last_block_processed is None:
+                self.last_block_processed = self.get_last_processed_block()
+                LAST_PROCESSED_BLOCK.labels(self.chain).set(self.last_block_processed)
+
             # Повторная попытка для block_number
             for attempt in range(5):
                 try:
-                    current_block = w3.eth.block_number
+                    head = self.w3.eth.get_block("latest")
+                    current_block = head["number"]
                     break
                 except Exception as e:
                     logger.error(f"Error getting block number, attempt {attempt + 1}: {e}")
@@ -573,92 +1071,99 @@ class BlockchainListener:
                     else:
                         raise
 
+            HEAD_BLOCK.labels(self.chain).set(current_block)
+            INGEST_LAG_BLOCKS.labels(self.chain).set(max(current_block - self.last_block_processed, 0))
+
             if current_block <= self.last_block_processed:
                 logger.info("No new blocks to process")
-                return
+                return 0
 
             logger.info(f"Processing blocks {self.last_block_processed + 1} to {current_block}")
 
-            auction_created_filter = {
-                "fromBlock": self.last_block_processed + 1,
-                "toBlock": current_block,
-                "address": Web3.to_checksum_address(FACTORY_CONTRACT_ADDRESS),
-                "topics": ["0x" + AUCTION_CREATED_EVENT],
-            }
-
-            # Повторная попытка для get_logs
-            for attempt in range(5):
-                try:
-                    auction_events = w3.eth.get_logs(auction_created_filter)
-                    break
-                except Exception as e:
-                    logger.error(f"Error getting auction events, attempt {attempt + 1}: {e}")
-                    if attempt == 0:
-                        time.sleep(0.5)
-                    else:
-                        raise
-
-            for event_log in auction_events:
-                event = factory_contract.events.AuctionCreated().process_log(event_log)
-                self.process_auction_created_event(event)
-
-            auctions = self.db.query(Auction.auction_address).all()
-
-            for auction_address in [a[0] for a in auctions]:
-                auction_contract = w3.eth.contract(address=auction_address, abi=auction_abi)
-                bid_event_signature = w3.keccak(text=BID_PLACED_EVENT).hex()
-
-                bid_filter = {
-                    "toBlock": current_block,
-                    "address": auction_address,
-                    "topics": ["0x" + bid_event_signature],
-                }
-
-                try:
-                    # Повторная попытка для get_logs
-                    for attempt in range(5):
-                        try:
-                            bid_events = w3.eth.get_logs(bid_filter)
-                            break
-                        except Exception as e:
-                            logger.error(f"Error getting bid events for {auction_address}, attempt {attempt + 1}: {e}")
-                            if attempt == 0:
-                                time.sleep(0.5)
-                            else:
-                                raise
-
-                    for event_log in bid_events:
-                        event = auction_contract.events.BidPlaced().process_log(event_log)
-                        self.process_bid_placed_event(event, auction_address)
-                except Exception as e:
-                    logger.error(f"Error getting bid events for {auction_address}: {e}")
+            # One request per range and LOG_ADDRESS_LIMIT addresses for both events,
+            # instead of one request per auction
+            events = 0
+            while self.last_block_processed < current_block:
+                from_block = self.last_block_processed + 1
+                to_block = min(from_block + MAX_LOG_RANGE - 1, current_block)
+                known = set(self.known_auction_addresses())
+                events += self.process_logs(self.range_logs(from_block, to_block))
+                # Auctions created in this range weren't in its filters; fetch their bids too
+                created = sorted(self.known_auction_addresses() - known)
+                if created:
+                    events += self.process_logs(self.range_logs(from_block, to_block, created))
+
+                block_hash = (
+                    Web3.to_hex(head["hash"]) if to_block == current_block else self.get_block_hash(to_block)
+                )
+                self.last_block_processed = to_block
+                LAST_PROCESSED_BLOCK.labels(self.chain).set(to_block)
+                with write_lock:
+                    save_cursor(self.db, to_block, block_hash, self.cursor_name)
+                    self.db.commit()
+                self.journal.checkpoint(to_block, block_hash)
+                self.journal.flush()
 
-            self.last_block_processed = current_block
-            self.update_auction_statuses()
+            self.update_auction_statuses(current_block)
+            self.archive_if_due()
+            self.verify_reputation_if_due()
+            self.reconcile()
 
-            logger.info(f"Processed {len(auction_events)} new auctions and updated statuses")
+            logger.info(f"Processed {events} new auction events and updated statuses")
+            return events
 
         except Exception as e:
             logger.error(f"Error in event listener: {e}", exc_info=True)
             raise e
 
+    def run_cycle(self):
+        """One ingest pass; returns the number of events found, or None if it failed"""
+        try:
+            if READ_MODEL_ENABLED and not active_auctions.ready:
+                active_auctions.load()
+            with LISTENER_CYCLE_SECONDS.labels(self.chain).time():
+                return self.listen_for_events()
+        except Exception as e:
+            logger.error(f"Error in listener loop: {e}")
+            return None
+
+    async def poll(self, max_interval, until=None):
+        """Poll for new blocks, backing off while the chain is quiet and speeding up while events arrive"""
+        interval = min(POLL_INTERVAL_MIN, max_interval)
+        while until is None or time.monotonic() < until:
+            if self.run_cycle():
+                interval = interval / 2
+            else:
+                interval = interval * 2
+            interval = min(max(interval, POLL_INTERVAL_MIN), max_interval)
+            POLL_INTERVAL_SECONDS.labels(self.chain).set(interval)
+            await asyncio.sleep(interval)
+
     async def start_listening(self, interval=30):
-        """Start listening for events with a polling interval"""
-        logger.info("Starting blockchain listener...")
+        """Ingest pushed events when the source has a WebSocket URL, otherwise poll at most `interval` seconds apart"""
+        logger.info(f"Starting blockchain listener for chain {self.chain_id}...")
+        self.check_chain_id()
         self.sync_auctions_from_contract()
 
         try:
-            while True:
-                try:
-                    self.listen_for_events()
-                except Exception as e:
-                    logger.error(f"Error in listener loop: {e}")
-                await asyncio.sleep(interval)
+            if self.source.ws_rpc_url:
+                from ws_ingest import PushIngest
+
+                await PushIngest(self, self.source.ws_rpc_url, interval).run()
+            else:
+                await self.poll(interval)
         except KeyboardInterrupt:
             logger.info("Received shutdown signal, closing...")
             self.db.close()
             logger.info("Blockchain listener stopped")
 
 
-# Initialize database
-init_db()
\ No newline at end of file
+def listen_in_thread(source, interval):
+    """Run a source's listener on its own thread and event loop, so a slow chain doesn't hold up the others"""
+
+    def run():
+        asyncio.run(BlockchainListener(source).start_listening(interval))
+
+    thread = threading.Thread(target=run, name=f"listener-{source.chain_id}", daemon=True)
+    thread.start()
+    return thread
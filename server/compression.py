@@ -0,0 +1,143 @@
+"""Negotiated response compression.
+
+JSON, NDJSON and text bodies of at least COMPRESSION_MIN_BYTES are encoded
+with brotli when the client accepts it and the optional `brotli` package is
+installed, otherwise with gzip when accepted. Streaming responses (exports)
+are compressed chunk by chunk. Media, which is already compressed, and
+responses that set their own Content-Encoding pass through untouched.
+"""
+import zlib
+
+from starlette.datastructures import Headers, MutableHeaders
+
+from config import BROTLI_QUALITY, COMPRESSION_MIN_BYTES, GZIP_LEVEL
+
+try:
+    import brotli
+except ImportError:  # Optional; gzip only without it
+    brotli = None
+
+COMPRESSIBLE_TYPES = ("application/json", "application/x-ndjson", "text/")
+
+
+def brotli_available():
+    return brotli is not None
+
+
+def preferred_encoding(accept_encoding):
+    """'br', 'gzip' or None for an Accept-Encoding header"""
+    accepted = {}
+    for part in accept_encoding.split(","):
+        name, _, params = part.strip().partition(";")
+        q = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                q = float(params[2:])
+            except ValueError:
+                q = 0.0
+        accepted[name.strip().lower()] = q
+    wildcard = accepted.get("*", 0)
+    for encoding in ("br", "gzip") if brotli_available() else ("gzip",):
+        if accepted.get(encoding, wildcard) > 0:
+            return encoding
+    return None
+
+
+class _GzipEncoder:
+    def __init__(self):
+        # wbits=31 writes the gzip container
+        self.compressor = zlib.compressobj(GZIP_LEVEL, zlib.DEFLATED, 31)
+
+    def compress(self, data):
+        return self.compressor.compress(data)
+
+    def finish(self):
+        return self.compressor.flush()
+
+
+class _BrotliEncoder:
+    def __init__(self):
+        self.compressor = brotli.Compressor(quality=BROTLI_QUALITY)
+
+    def compress(self, data):
+        return self.compressor.process(data)
+
+    def finish(self):
+        return self.compressor.finish()
+
+
+ENCODERS = {"gzip": _GzipEncoder, "br": _BrotliEncoder}
+
+
+class CompressionMiddleware:
+    def __init__(self, app, minimum_size=COMPRESSION_MIN_BYTES):
+        self.app = app
+        self.minimum_size = minimum_size
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] == "http":
+            encoding = preferred_encoding(Headers(scope=scope).get("accept-encoding", ""))
+            if encoding:
+                await _Responder(self.app, self.minimum_size, encoding)(scope, receive, send)
+                return
+        await self.app(scope, receive, send)
+
+
+class _Responder:
+    """Holds back the response start until the first body chunk shows whether to compress"""
+
+    def __init__(self, app, minimum_size, encoding):
+        self.app = app
+        self.minimum_size = minimum_size
+        self.encoding = encoding
+        self.send = None
+        self.start_message = None
+        self.encoder = None
+        self.started = False
+
+    async def __call__(self, scope, receive, send):
+        self.send = send
+        await self.app(scope, receive, self.send_compressed)
+
+    def _compressible(self, headers):
+        content_type = headers.get("content-type", "")
+        return "content-encoding" not in headers and content_type.startswith(COMPRESSIBLE_TYPES)
+
+    async def send_compressed(self, message):
+        if message["type"] == "http.response.start":
+            self.start_message = message
+            return
+        if message["type"] != "http.response.body":
+            await self.send(message)
+            return
+
+        body = message.get("body", b"")
+        more_body = message.get("more_body", False)
+        if not self.started:
+            self.started = True
+            headers = MutableHeaders(raw=self.start_message["headers"])
+            if self._compressible(headers) and (more_body or len(body) >= self.minimum_size):
+                self.encoder = ENCODERS[self.encoding]()
+                headers["Content-Encoding"] = self.encoding
+                headers.add_vary_header("Accept-Encoding")
+                if more_body:
+                    del headers["Content-Length"]
+                else:
+                    body = self.encoder.compress(body) + self.encoder.finish()
+                    headers["Content-Length"] = str(len(body))
+                    message["body"] = body
+                    await self.send(self.start_message)
+                    await self.send(message)
+                    return
+            elif self._compressible(headers):
+                # Vary even when small, so caches don't serve this body to a client that wanted it encoded
+                headers.add_vary_header("Accept-Encoding")
+            await self.send(self.start_message)
+
+        if self.encoder is not None:
+            chunk = self.encoder.compress(body)
+            if not more_body:
+                chunk += self.encoder.finish()
+            message["body"] = chunk
+        await self.send(message)
@@ -1,4 +1,6 @@
+import json
 import os
+import requests
 from dotenv import load_dotenv
 
 load_dotenv()
@@ -8,6 +10,27 @@ RPC_URL = os.getenv("RPC_URL", "http://localhost:8545")
 FACTORY_CONTRACT_ADDRESS = os.getenv(
     "FACTORY_CONTRACT_ADDRESS", "0x04b7ab1a9f98225f2d93c336a24c52e0fc718a49"
 )
+
+
+def _rpc_chain_id(rpc_url):
+    """eth_chainId of `rpc_url`, for when CHAIN_ID is unset"""
+    try:
+        response = requests.post(
+            rpc_url, json={"jsonrpc": "2.0", "id": 1, "method": "eth_chainId", "params": []}, timeout=10
+        )
+        response.raise_for_status()
+        return int(response.json()["result"], 16)
+    except Exception as e:
+        raise RuntimeError(f"CHAIN_ID is unset and {rpc_url} didn't answer eth_chainId: {e}") from e
+
+
+# Chain of RPC_URL/FACTORY_CONTRACT_ADDRESS; rows stored before multi-chain ingest are tagged with it.
+# Asked from RPC_URL when unset rather than assumed, so they are never tagged with the wrong chain
+CHAIN_ID = int(os.getenv("CHAIN_ID") or _rpc_chain_id(RPC_URL))
+# Further factories to ingest, each on its own worker, as JSON:
+# [{"chain_id": 137, "rpc_url": "https://...", "factory": "0x...", "ws_rpc_url": "wss://..."}]
+# plus an optional "trustwallet_chain" slug for token logos (see sources.py)
+EXTRA_INGEST_SOURCES = json.loads(os.getenv("EXTRA_INGEST_SOURCES", "[]"))
 FACTORY_ABI_PATH = os.getenv("FACTORY_ABI_PATH", "./abis/factory_abi.json")
 AUCTION_ABI_PATH = os.getenv("AUCTION_ABI_PATH", "./abis/auction_abi.json")
 DUTCH_AUCTION_ABI_PATH = os.getenv(
@@ -20,6 +43,64 @@ DATABASE_URL = os.getenv("DATABASE_URL", "sqlite:///./auctions.db")
 # Server config
 HOST = os.getenv("HOST", "0.0.0.0")
 PORT = int(os.getenv("PORT", "8000"))
+INIT_DB_ON_STARTUP = os.getenv("INIT_DB_ON_STARTUP", "true").lower() == "true"
+# Serve active auction listings from memory when the listener runs in the same process
+READ_MODEL_ENABLED = os.getenv("READ_MODEL_ENABLED", "true").lower() == "true"
+# Responses at least this large are gzip/brotli encoded when the client accepts it; 0 disables
+COMPRESSION_MIN_BYTES = int(os.getenv("COMPRESSION_MIN_BYTES", "1024"))
+GZIP_LEVEL = int(os.getenv("GZIP_LEVEL", "6"))
+BROTLI_QUALITY = int(os.getenv("BROTLI_QUALITY", "4"))  # Needs the optional brotli package
+
+# Archive config
+# Ended auctions move to the archive tables this long after they end; 0 keeps them hot
+ARCHIVE_AFTER_DAYS = float(os.getenv("ARCHIVE_AFTER_DAYS", "30"))
+ARCHIVE_INTERVAL = int(os.getenv("ARCHIVE_INTERVAL", "3600"))  # Seconds between listener archive runs
+ARCHIVE_BATCH_SIZE = int(os.getenv("ARCHIVE_BATCH_SIZE", "500"))  # Auctions moved per transaction
+
+# Raw chain data journal for offline replay; empty disables it
+LOG_ARCHIVE_DIR = os.getenv("LOG_ARCHIVE_DIR", "./log_archive")
+LOG_ARCHIVE_SEGMENT_BYTES = int(os.getenv("LOG_ARCHIVE_SEGMENT_BYTES", str(64 * 1024**2)))
+
+# Media cache config
+MEDIA_CACHE_DIR = os.getenv("MEDIA_CACHE_DIR", "./media_cache")
+MEDIA_CACHE_MAX_BYTES = int(os.getenv("MEDIA_CACHE_MAX_BYTES", str(1024**3)))
+MEDIA_MAX_OBJECT_BYTES = int(os.getenv("MEDIA_MAX_OBJECT_BYTES", str(20 * 1024**2)))
+MEDIA_FETCH_TIMEOUT = float(os.getenv("MEDIA_FETCH_TIMEOUT", "30"))  # Seconds
+IPFS_GATEWAY = os.getenv("IPFS_GATEWAY", "https://ipfs.io/ipfs/")
+# Limits non-IPFS media to these hosts besides IPFS_GATEWAY's, comma-separated; empty
+# or "*" allows any host. Either way only hosts with public addresses are fetched from
+MEDIA_ALLOWED_HOSTS = [host.strip().lower() for host in os.getenv("MEDIA_ALLOWED_HOSTS", "").split(",") if host.strip()]
+# Public base of the /media endpoint, e.g. https://api.example.com/media; when set,
+# image URLs in responses point there instead of at the original hosts
+MEDIA_PUBLIC_URL = os.getenv("MEDIA_PUBLIC_URL", "").rstrip("/")
 
 # Sync config
-SYNC_INTERVAL = int(os.getenv("SYNC_INTERVAL", "30"))  # Seconds
+SYNC_INTERVAL = int(os.getenv("SYNC_INTERVAL", "30"))  # Seconds; the longest wait between polls
+POLL_INTERVAL_MIN = float(os.getenv("POLL_INTERVAL_MIN", "1"))  # Shortest wait while events arrive
+MAX_LOG_RANGE = int(os.getenv("MAX_LOG_RANGE", "2000"))  # Blocks per eth_getLogs request
+LOG_ADDRESS_LIMIT = int(os.getenv("LOG_ADDRESS_LIMIT", "1000"))  # Addresses per log filter; providers cap the list
+# Push ingest via eth_subscribe; polling is used when unset or while the socket is down
+WS_RPC_URL = os.getenv("WS_RPC_URL", "")
+WS_IDLE_TIMEOUT = float(os.getenv("WS_IDLE_TIMEOUT", "60"))  # Seconds without a message before reconnecting
+WS_RETRY_SECONDS = float(os.getenv("WS_RETRY_SECONDS", "30"))  # Polling time between reconnect attempts
+# Multicall3 batches metadata calls during sync; empty makes one eth_call per value
+MULTICALL_ADDRESS = os.getenv("MULTICALL_ADDRESS", "0xcA11bde05977b3631167028862bE2a173976CA11")
+MULTICALL_BATCH_SIZE = int(os.getenv("MULTICALL_BATCH_SIZE", "200"))  # Calls per aggregate3
+# Watch pending transactions for placeBid calls and serve them as pending bids
+MEMPOOL_WATCH_ENABLED = os.getenv("MEMPOOL_WATCH_ENABLED", "false").lower() == "true"
+MEMPOOL_POLL_INTERVAL = float(os.getenv("MEMPOOL_POLL_INTERVAL", "1"))  # Seconds between filter polls
+PENDING_BID_TTL = float(os.getenv("PENDING_BID_TTL", "120"))  # Seconds a bid may stay pending before it's dropped
+# Blocks re-scanned when the saved cursor's block hash no longer matches the chain
+CURSOR_REWIND_BLOCKS = int(os.getenv("CURSOR_REWIND_BLOCKS", "64"))
+# Background re-checks of stored auctions against getAuctionDetails; 0 disables
+RECONCILE_CALLS_PER_MINUTE = int(os.getenv("RECONCILE_CALLS_PER_MINUTE", "300"))  # Per source
+RECONCILE_ACTIVE_SHARE = float(os.getenv("RECONCILE_ACTIVE_SHARE", "0.8"))  # Of the budget, for active auctions
+# Seconds between full reputation recomputes that check the listener's incremental scores; 0 disables
+REPUTATION_VERIFY_INTERVAL = int(os.getenv("REPUTATION_VERIFY_INTERVAL", "86400"))
+
+# Profiling / tracing config (all disabled by default)
+SLOW_QUERY_MS = float(os.getenv("SLOW_QUERY_MS", "0"))  # Log queries slower than this
+SLOW_REQUEST_MS = float(os.getenv("SLOW_REQUEST_MS", "0"))  # Log requests slower than this
+QUERY_COUNT_WARN = int(os.getenv("QUERY_COUNT_WARN", "0"))  # Flag requests issuing more queries
+PROFILING_ENABLED = os.getenv("PROFILING_ENABLED", "false").lower() == "true"
+PROFILE_SIGNAL_SECONDS = int(os.getenv("PROFILE_SIGNAL_SECONDS", "30"))
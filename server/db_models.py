@@ -5,35 +5,55 @@ from sqlalchemy import (
     Boolean,
     Float,
     create_engine,
-    ForeignKey,
+    ForeignKeyConstraint,
+    inspect,
+    text,
+    UniqueConstraint,
+    Index,
+    Table,
 )
 from sqlalchemy.ext.declarative import declarative_base
+from sqlalchemy.schema import CreateTable
 from sqlalchemy.orm import sessionmaker, relationship
 from datetime import datetime
-from config import DATABASE_URL
+from config import CHAIN_ID, DATABASE_URL
+from formatting import format_ether
+from metrics import instrument_engine
+from profiling import install_query_tracing
 
 Base = declarative_base()
 
 
 class Auction(Base):
     __tablename__ = "auctions"
+    __table_args__ = (
+        # Every factory numbers its auctions from 1, and a factory deployed at the
+        # same address on two chains deploys auctions at the same addresses too
+        UniqueConstraint("chain_id", "auction_id"),
+        UniqueConstraint("chain_id", "auction_address"),
+        # Ids follow a row into the archive, so they must never be handed out twice
+        {"sqlite_autoincrement": True},
+    )
 
     id = Column(Integer, primary_key=True)
-    auction_id = Column(String, unique=True, index=True)
-    auction_address = Column(String, unique=True)
+    auction_id = Column(String, index=True)  # The factory's auction number
+    auction_address = Column(String)
+    chain_id = Column(Integer, default=CHAIN_ID, index=True)  # See sources.py
     auction_type = Column(Integer)  # 0 for English, 1 for Dutch
     seller = Column(String)
     highest_bidder = Column(String)
     highest_bid = Column(String)
     end_time = Column(Integer)
     ended = Column(Boolean, default=False)
-    asset_address = Column(String)
+    asset_address = Column(String, index=True)
     asset_id = Column(Integer)
     amount = Column(String)
+    amount_ether = Column(String)  # `amount` formatted in ether units once at ingest
     payment_token = Column(String)
     created_at = Column(Integer)  # Block number
     status = Column(String)  # 'active' or 'ended'
     token_symbol = Column(String, default="ETH")
+    updated_block = Column(Integer, index=True)  # Block of the last change, for incremental exports
 
     # Dutch auction specific fields
     reserve_price = Column(String)  # Minimum price for Dutch auction
@@ -42,11 +62,12 @@ class Auction(Base):
     # Relationship with bids
     bids = relationship("Bid", back_populates="auction")
 
-    def to_dict(self):
+    def to_dict(self, bid_count=None):
         result = {
             "id": self.auction_id,
             "auctionId": self.auction_id,
             "auctionAddress": self.auction_address,
+            "chainId": self.chain_id,
             "auctionType": self.auction_type,
             "seller": self.seller,
             "highestBidder": self.highest_bidder,
@@ -59,7 +80,7 @@ class Auction(Base):
             "paymentToken": self.payment_token,
             "blockNumber": self.created_at,
             "status": self.status,
-            "bidCount": len(self.bids),
+            "bidCount": len(self.bids) if bid_count is None else bid_count,
             "currency": self.token_symbol,
         }
 
@@ -75,13 +96,22 @@ class Auction(Base):
 
 class Bid(Base):
     __tablename__ = "bids"
+    __table_args__ = (
+        ForeignKeyConstraint(["chain_id", "auction_address"], ["auctions.chain_id", "auctions.auction_address"]),
+        # Identifies the log a bid came from, so re-scanned blocks don't duplicate it
+        Index("ix_bids_chain_id_tx_hash_log_index", "chain_id", "tx_hash", "log_index", unique=True),
+        {"sqlite_autoincrement": True},
+    )
 
     id = Column(Integer, primary_key=True)
-    auction_address = Column(String, ForeignKey("auctions.auction_address"))
+    auction_address = Column(String, index=True)
+    chain_id = Column(Integer, default=CHAIN_ID, index=True)
     bidder = Column(String)
     amount = Column(String)
     block_number = Column(Integer)
     timestamp = Column(Integer)
+    tx_hash = Column(String)
+    log_index = Column(Integer)
 
     # Relationship with auction
     auction = relationship("Auction", back_populates="bids")
@@ -97,8 +127,11 @@ class Bid(Base):
 
 class NFTMetadata(Base):
     __tablename__ = "nft_metadata"
+    # Collections at the same address on two chains are different collections
+    __table_args__ = (Index("ix_nft_metadata_chain_id_asset", "chain_id", "asset_address", "asset_id"),)
 
     id = Column(Integer, primary_key=True)
+    chain_id = Column(Integer, default=CHAIN_ID)
     asset_address = Column(String)
     asset_id = Column(Integer)
     image_url = Column(String)
@@ -108,6 +141,7 @@ class NFTMetadata(Base):
 
     def to_dict(self):
         return {
+            "chainId": self.chain_id,
             "assetAddress": self.asset_address,
             "assetId": self.asset_id,
             "imageUrl": self.image_url,
@@ -119,9 +153,11 @@ class NFTMetadata(Base):
 # New model for ERC20 token metadata
 class TokenMetadata(Base):
     __tablename__ = "token_metadata"
+    __table_args__ = (UniqueConstraint("chain_id", "token_address"),)
 
     id = Column(Integer, primary_key=True)
-    token_address = Column(String, unique=True, index=True)
+    chain_id = Column(Integer, default=CHAIN_ID)
+    token_address = Column(String, index=True)
     symbol = Column(String)
     name = Column(String)
     image_url = Column(String)
@@ -130,6 +166,7 @@ class TokenMetadata(Base):
 
     def to_dict(self):
         return {
+            "chainId": self.chain_id,
             "tokenAddress": self.token_address,
             "symbol": self.symbol,
             "name": self.name,
@@ -138,13 +175,274 @@ class TokenMetadata(Base):
         }
 
 
+def _archive_table(table, name):
+    """A table with `table`'s columns, column indexes and unique constraints, for rows moved out of it"""
+    return Table(
+        name,
+        Base.metadata,
+        *[
+            Column(
+                column.name,
+                column.type,
+                primary_key=column.primary_key,
+                unique=column.unique,
+                index=column.index,
+            )
+            for column in table.columns
+        ],
+        *[
+            UniqueConstraint(*constraint.columns.keys())
+            for constraint in table.constraints
+            if isinstance(constraint, UniqueConstraint)
+        ],
+    )
+
+
+# Ended auctions and their bids, moved out of the hot tables by archive.py
+class ArchivedAuction(Base):
+    __table__ = _archive_table(Auction.__table__, "auctions_archive")
+
+
+class ArchivedBid(Base):
+    __table__ = _archive_table(Bid.__table__, "bids_archive")
+
+
+# Aggregate counters maintained by the listener in the same transaction as its writes
+class AuctionStat(Base):
+    __tablename__ = "auction_stats"
+    __table_args__ = (UniqueConstraint("dimension", "key"),)
+
+    id = Column(Integer, primary_key=True)
+    dimension = Column(String)  # 'auctions', 'status', 'type', 'payment_token' or 'bids'
+    key = Column(String)
+    count = Column(Integer, default=0)
+    volume = Column(String, default="0")  # Summed wei amounts; too large for an integer column
+
+
+# Bid activity per chain, collection, payment token and hour/day bucket, maintained by the listener
+class CollectionRollup(Base):
+    __tablename__ = "collection_rollups"
+    __table_args__ = (
+        UniqueConstraint("chain_id", "asset_address", "payment_token", "interval", "bucket_start"),
+    )
+
+    id = Column(Integer, primary_key=True)
+    chain_id = Column(Integer, default=CHAIN_ID)
+    asset_address = Column(String)
+    payment_token = Column(String)
+    interval = Column(String)  # 'hour' or 'day'
+    bucket_start = Column(Integer)  # Unix timestamp the bucket starts at
+    bid_count = Column(Integer, default=0)
+    volume = Column(String, default="0")  # Wei amounts as strings, like Bid.amount
+    low_bid = Column(String)  # Lowest bid in the bucket
+    high_bid = Column(String)
+
+
+# Lowest asking price among each collection's active auctions per payment token, maintained by the listener
+class CollectionFloor(Base):
+    __tablename__ = "collection_floors"
+    __table_args__ = (UniqueConstraint("chain_id", "asset_address", "payment_token"),)
+
+    id = Column(Integer, primary_key=True)
+    chain_id = Column(Integer, default=CHAIN_ID)
+    asset_address = Column(String)
+    payment_token = Column(String)
+    floor = Column(String)  # Wei, like Bid.amount; the row goes once no active auction has a price
+
+
+# Each wallet's part in each auction, as seller or bidder, maintained by the listener (see portfolio.py)
+class Participation(Base):
+    __tablename__ = "participations"
+    __table_args__ = (
+        UniqueConstraint("chain_id", "address", "auction_address", "role"),
+        # Profile pages list one wallet's rows by role and state, newest first
+        Index("ix_participations_address_role_state_id", "address", "role", "state", "id"),
+    )
+
+    id = Column(Integer, primary_key=True)
+    address = Column(String)
+    auction_address = Column(String, index=True)
+    chain_id = Column(Integer, default=CHAIN_ID)  # The auction's
+    role = Column(String)  # 'seller' or 'bidder'
+    state = Column(String)  # Sellers: the auction's status; bidders: 'leading', 'outbid', 'won' or 'lost'
+    bid_count = Column(Integer, default=0)
+    last_bid = Column(String)  # Wei, like Bid.amount
+    last_bid_block = Column(Integer)
+
+
+# Per-wallet counters and scores maintained by the listener (see reputation.py)
+class Reputation(Base):
+    __tablename__ = "reputations"
+
+    id = Column(Integer, primary_key=True)
+    address = Column(String, unique=True)
+    auctions_created = Column(Integer, default=0)
+    auctions_closed = Column(Integer, default=0)  # Created auctions the contract reports ended (settled)
+    auctions_expired = Column(Integer, default=0)  # Created auctions past their end time but not settled
+    auctions_sold = Column(Integer, default=0)  # Closed with a bid
+    bids_placed = Column(Integer, default=0)
+    auctions_bid = Column(Integer, default=0)  # Distinct auctions bid on
+    auctions_bid_closed = Column(Integer, default=0)  # Of those, closed ones
+    auctions_won = Column(Integer, default=0)
+    seller_score = Column(Integer)  # 0-100
+    bidder_score = Column(Integer)  # 0-100
+
+
+# How far each ingest process has got, so restarts and snapshot imports resume from there
+class IngestCursor(Base):
+    __tablename__ = "ingest_cursors"
+
+    id = Column(Integer, primary_key=True)
+    name = Column(String, unique=True)  # 'listener'
+    block_number = Column(Integer)  # Last block fully processed
+    block_hash = Column(String)  # Hash of that block, to detect a reorg across a restart
+    updated_at = Column(Integer)  # Unix timestamp
+
+
+# Where each /media key's content is fetched from on a cache miss
+class MediaSource(Base):
+    __tablename__ = "media_sources"
+
+    id = Column(Integer, primary_key=True)
+    key = Column(String, unique=True)  # SHA-256 of the content address, see media.py
+    url = Column(String)
+
+
 # Create database engine and session
 engine = create_engine(DATABASE_URL)
+instrument_engine(engine)
+install_query_tracing(engine)
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
 
+def _backfill_amount_ether(conn):
+    rows = conn.execute(text("SELECT id, amount FROM auctions WHERE amount IS NOT NULL")).all()
+    if rows:
+        conn.execute(
+            text("UPDATE auctions SET amount_ether = :amount_ether WHERE id = :id"),
+            [{"id": row.id, "amount_ether": format_ether(row.amount)} for row in rows],
+        )
+
+
+# Backfills run once, right after the column is added to an existing table;
+# either an SQL statement or a function taking the connection
+COLUMN_BACKFILLS = {
+    ("auctions", "updated_block"): "UPDATE auctions SET updated_block = created_at",
+    ("auctions", "amount_ether"): _backfill_amount_ether,
+    # Everything before multi-chain ingest came from the primary source
+    **{
+        (table, "chain_id"): f"UPDATE {table} SET chain_id = {CHAIN_ID}"
+        for table in ("auctions", "bids", "nft_metadata", "token_metadata")
+    },
+}
+
+
+def _unique_keys(table):
+    """The column sets `table`'s model declares unique"""
+    keys = {frozenset([column.name]) for column in table.columns if column.unique}
+    keys.update(
+        frozenset(constraint.columns.keys())
+        for constraint in table.constraints
+        if isinstance(constraint, UniqueConstraint)
+    )
+    keys.update(frozenset(index.columns.keys()) for index in table.indexes if index.unique)
+    return keys
+
+
+def _needs_rebuild(conn, table):
+    """Whether an existing table differs from its model in a way SQLite can only set at CREATE TABLE.
+
+    That is the AUTOINCREMENT option, the unique keys and the foreign keys.
+    """
+    if conn.dialect.name != "sqlite":
+        return False
+    inspector = inspect(conn)
+    sql = conn.execute(
+        text("SELECT sql FROM sqlite_master WHERE type = 'table' AND name = :name"), {"name": table.name}
+    ).scalar()
+    if table.dialect_options["sqlite"]["autoincrement"] and "AUTOINCREMENT" not in sql.upper():
+        return True
+    unique = {frozenset(constraint["column_names"]) for constraint in inspector.get_unique_constraints(table.name)}
+    unique.update(frozenset(index["column_names"]) for index in inspector.get_indexes(table.name) if index["unique"])
+    if unique != _unique_keys(table):
+        return True
+    foreign_keys = {tuple(key["constrained_columns"]) for key in inspector.get_foreign_keys(table.name)}
+    return foreign_keys != {tuple(key.column_keys) for key in table.foreign_key_constraints}
+
+
+def _rebuild_table(conn, table):
+    """Recreate `table` from the model and copy its rows over, keeping their ids"""
+    rebuilt = f"{table.name}__rebuild"
+    columns = ", ".join(column.name for column in table.columns)
+    # Index names are per database, so the old ones go before the copy is created
+    for index in inspect(conn).get_indexes(table.name):
+        conn.execute(text(f"DROP INDEX {index['name']}"))
+    ddl = str(CreateTable(table).compile(dialect=conn.dialect)).strip()
+    conn.execute(text(ddl.replace(f"TABLE {table.name} ", f"TABLE {rebuilt} ", 1)))
+    conn.execute(text(f"INSERT INTO {rebuilt} ({columns}) SELECT {columns} FROM {table.name}"))
+    conn.execute(text(f"DROP TABLE {table.name}"))
+    conn.execute(text(f"ALTER TABLE {rebuilt} RENAME TO {table.name}"))
+    for index in table.indexes:
+        index.create(conn)
+
+
+def _separate_archived_ids(conn, table, archive):
+    """Give hot rows whose id an archived row already took a fresh one.
+
+    Before the hot tables used AUTOINCREMENT, SQLite handed out the id of an
+    archived row again, and archiving that row would then fail.
+    """
+    top = conn.execute(text(f"SELECT max(id) FROM {archive}")).scalar() or 0
+    top = max(top, conn.execute(text(f"SELECT max(id) FROM {table}")).scalar() or 0)
+    taken = conn.execute(text(f"SELECT id FROM {table} WHERE id IN (SELECT id FROM {archive}) ORDER BY id")).scalars()
+    for new_id, old_id in enumerate(list(taken), start=top + 1):
+        conn.execute(text(f"UPDATE {table} SET id = :new_id WHERE id = :old_id"), {"new_id": new_id, "old_id": old_id})
+        top = new_id
+    # Start the AUTOINCREMENT sequence above every id either tier has used
+    conn.execute(text("DELETE FROM sqlite_sequence WHERE name = :name"), {"name": table})
+    conn.execute(text("INSERT INTO sqlite_sequence (name, seq) VALUES (:name, :seq)"), {"name": table, "seq": top})
+
+
+# Hot tables whose rows archive.py copies, ids included, into an archive table
+ARCHIVE_TABLES = {"auctions": "auctions_archive", "bids": "bids_archive"}
+
+
+def migrate_db():
+    """Add columns and indexes introduced after a database was created.
+
+    create_all() only creates missing tables, so older auctions.db files
+    would otherwise lack newer columns. Tables whose constraints changed in a
+    way SQLite can't alter in place are rebuilt.
+    """
+    inspector = inspect(engine)
+    with engine.begin() as conn:
+        for table in Base.metadata.sorted_tables:
+            if not inspector.has_table(table.name):
+                continue
+            existing = {c["name"] for c in inspector.get_columns(table.name)}
+            for column in table.columns:
+                if column.name in existing:
+                    continue
+                column_type = column.type.compile(dialect=engine.dialect)
+                conn.execute(
+                    text(f"ALTER TABLE {table.name} ADD COLUMN {column.name} {column_type}")
+                )
+                backfill = COLUMN_BACKFILLS.get((table.name, column.name))
+                if callable(backfill):
+                    backfill(conn)
+                elif backfill:
+                    conn.execute(text(backfill))
+            if _needs_rebuild(conn, table):
+                _rebuild_table(conn, table)
+                if table.name in ARCHIVE_TABLES:
+                    _separate_archived_ids(conn, table.name, ARCHIVE_TABLES[table.name])
+            for index in table.indexes:
+                index.create(conn, checkfirst=True)
+
+
 def init_db():
     Base.metadata.create_all(bind=engine)
+    migrate_db()
 
 
 def get_db():
@@ -0,0 +1,46 @@
+"""Tables derived from auctions, bids and metadata that the listener maintains incrementally."""
+from db_models import SessionLocal, init_db
+from media import ensure_media_sources, rebuild_media_sources
+from portfolio import ensure_portfolio, rebuild_portfolio
+from reputation import ensure_reputation, rebuild_reputation
+from rollups import ensure_rollups, rebuild_rollups
+from search import ensure_search_index, rebuild_search_index
+from stats import ensure_stats, rebuild_stats
+
+
+def ensure_derived_tables(db):
+    """Backfill derived tables that are empty because they are newer than the database"""
+    ensure_stats(db)
+    ensure_search_index(db)
+    ensure_rollups(db)
+    ensure_media_sources(db)
+    ensure_portfolio(db)
+    ensure_reputation(db)
+
+
+def rebuild_derived_tables(db):
+    """Recompute every derived table from the auctions, bids and metadata tables"""
+    rebuild_stats(db)
+    rebuild_search_index(db)
+    rebuild_rollups(db)
+    rebuild_media_sources(db)
+    rebuild_portfolio(db)
+    rebuild_reputation(db)
+
+
+def rebuild_bid_tables(db):
+    """Recompute the derived tables that count bids, after bids were deleted"""
+    rebuild_stats(db)
+    rebuild_rollups(db)
+    rebuild_portfolio(db)
+    rebuild_reputation(db)
+
+
+def prepare_database():
+    """Create/migrate the schema and backfill derived tables; run once at startup"""
+    init_db()
+    db = SessionLocal()
+    try:
+        ensure_derived_tables(db)
+    finally:
+        db.close()
@@ -0,0 +1,164 @@
+import io
+import json
+from sqlalchemy import select
+
+from archive import all_auctions, all_bids, includes_archive
+from db_models import Auction, Bid, NFTMetadata, TokenMetadata, SessionLocal
+
+# Rows fetched per round trip from the server-side cursor
+EXPORT_BATCH_SIZE = 1000
+# Flush NDJSON to the client once this many bytes are buffered
+NDJSON_CHUNK_BYTES = 64 * 1024
+
+# (output key, column, arrow type name) for every exported dataset
+AUCTION_EXPORT_COLUMNS = [
+    ("auctionId", Auction.auction_id, "string"),
+    ("auctionAddress", Auction.auction_address, "string"),
+    ("auctionType", Auction.auction_type, "int64"),
+    ("seller", Auction.seller, "string"),
+    ("highestBidder", Auction.highest_bidder, "string"),
+    ("highestBid", Auction.highest_bid, "string"),
+    ("endTime", Auction.end_time, "int64"),
+    ("ended", Auction.ended, "bool"),
+    ("assetAddress", Auction.asset_address, "string"),
+    ("assetId", Auction.asset_id, "int64"),
+    ("amount", Auction.amount, "string"),
+    ("paymentToken", Auction.payment_token, "string"),
+    ("blockNumber", Auction.created_at, "int64"),
+    ("status", Auction.status, "string"),
+    ("currency", Auction.token_symbol, "string"),
+    ("reservePrice", Auction.reserve_price, "string"),
+    ("currentPrice", Auction.current_price, "string"),
+    ("updatedBlock", Auction.updated_block, "int64"),
+    ("chainId", Auction.chain_id, "int64"),
+]
+
+BID_EXPORT_COLUMNS = [
+    ("id", Bid.id, "int64"),
+    ("auctionAddress", Bid.auction_address, "string"),
+    ("bidder", Bid.bidder, "string"),
+    ("amount", Bid.amount, "string"),
+    ("blockNumber", Bid.block_number, "int64"),
+    ("timestamp", Bid.timestamp, "int64"),
+    ("chainId", Bid.chain_id, "int64"),
+]
+
+TOKEN_EXPORT_COLUMNS = [
+    ("tokenAddress", TokenMetadata.token_address, "string"),
+    ("symbol", TokenMetadata.symbol, "string"),
+    ("name", TokenMetadata.name, "string"),
+    ("imageUrl", TokenMetadata.image_url, "string"),
+    ("decimals", TokenMetadata.decimals, "int64"),
+    ("chainId", TokenMetadata.chain_id, "int64"),
+]
+
+NFT_EXPORT_COLUMNS = [
+    ("assetAddress", NFTMetadata.asset_address, "string"),
+    ("assetId", NFTMetadata.asset_id, "int64"),
+    ("imageUrl", NFTMetadata.image_url, "string"),
+    ("name", NFTMetadata.name, "string"),
+    ("description", NFTMetadata.description, "string"),
+    ("chainId", NFTMetadata.chain_id, "int64"),
+]
+
+
+def auction_export_query(updated_since=None, status=None, chain=None):
+    """Auctions ordered by (updatedBlock, id) so consumers can checkpoint on updatedBlock.
+
+    Block numbers are per chain, so incremental pulls should filter on `chain`.
+    """
+    auctions = all_auctions() if includes_archive(status) else Auction
+    query = select(*[getattr(auctions, c.key) for _, c, _ in AUCTION_EXPORT_COLUMNS])
+    if updated_since is not None:
+        query = query.where(auctions.updated_block > updated_since)
+    if status:
+        query = query.where(auctions.status == status)
+    if chain is not None:
+        query = query.where(auctions.chain_id == chain)
+    return query.order_by(auctions.updated_block, auctions.id)
+
+
+def bid_export_query(updated_since=None, auction_address=None, chain=None):
+    bids = all_bids()
+    query = select(*[getattr(bids, c.key) for _, c, _ in BID_EXPORT_COLUMNS])
+    if updated_since is not None:
+        query = query.where(bids.block_number > updated_since)
+    if auction_address:
+        query = query.where(bids.auction_address == auction_address)
+    if chain is not None:
+        query = query.where(bids.chain_id == chain)
+    return query.order_by(bids.block_number, bids.id)
+
+
+def token_export_query():
+    return select(*[c for _, c, _ in TOKEN_EXPORT_COLUMNS]).order_by(TokenMetadata.id)
+
+
+def nft_export_query():
+    return select(*[c for _, c, _ in NFT_EXPORT_COLUMNS]).order_by(NFTMetadata.id)
+
+
+def _stream_rows(query):
+    """Yield row batches from a server-side cursor using a session owned by the stream.
+
+    The request's get_db session is closed before a streaming body is sent,
+    so the generator opens and closes its own.
+    """
+    db = SessionLocal()
+    try:
+        result = db.execute(query.execution_options(yield_per=EXPORT_BATCH_SIZE))
+        for partition in result.partitions():
+            yield partition
+    finally:
+        db.close()
+
+
+def stream_ndjson(query, columns):
+    """Stream query results as newline-delimited JSON in constant memory"""
+    keys = [key for key, _, _ in columns]
+    buffer = []
+    size = 0
+    for rows in _stream_rows(query):
+        for row in rows:
+            line = json.dumps(dict(zip(keys, row)), separators=(",", ":")) + "\n"
+            buffer.append(line)
+            size += len(line)
+            if size >= NDJSON_CHUNK_BYTES:
+                yield "".join(buffer)
+                buffer = []
+                size = 0
+    if buffer:
+        yield "".join(buffer)
+
+
+def arrow_available():
+    try:
+        import pyarrow  # noqa: F401
+    except ImportError:
+        return False
+    return True
+
+
+def stream_arrow(query, columns):
+    """Stream query results as an Arrow IPC stream, one record batch per cursor batch"""
+    import pyarrow as pa
+
+    schema = pa.schema([(key, pa.type_for_alias(type_name)) for key, _, type_name in columns])
+    sink = io.BytesIO()
+    writer = pa.ipc.new_stream(sink, schema)
+
+    def drain():
+        data = sink.getvalue()
+        sink.seek(0)
+        sink.truncate()
+        return data
+
+    for rows in _stream_rows(query):
+        arrays = [
+            pa.array([row[i] for row in rows], type=schema.field(i).type)
+            for i in range(len(columns))
+        ]
+        writer.write_batch(pa.RecordBatch.from_arrays(arrays, schema=schema))
+        yield drain()
+    writer.close()
+    yield drain()
@@ -0,0 +1,34 @@
+import re
+from decimal import Decimal, localcontext
+
+from eth_hash.auto import keccak
+
+WEI_PER_ETHER = Decimal(10**18)
+
+
+def from_wei_ether(number):
+    """Same result as Web3.from_wei(number, "ether"), without importing web3 into API workers"""
+    if number == 0:
+        return 0
+    with localcontext() as ctx:
+        ctx.prec = 999
+        return Decimal(number, context=ctx) / WEI_PER_ETHER
+
+
+def format_ether(amount):
+    """Display string for a wei amount stored as text, e.g. "1500000000000000000" -> "1.5" """
+    return str(from_wei_ether(int(amount)))
+
+
+ADDRESS_PATTERN = re.compile(r"^0x[0-9a-fA-F]{40}$")
+
+
+def checksum_address(address):
+    """EIP-55 form of an address, as stored in the database; ValueError if it isn't one"""
+    if not ADDRESS_PATTERN.match(address):
+        raise ValueError(f"Not an address: {address}")
+    hex_address = address[2:].lower()
+    digest = keccak(hex_address.encode()).hex()
+    return "0x" + "".join(
+        char.upper() if int(nibble, 16) >= 8 else char for char, nibble in zip(hex_address, digest)
+    )
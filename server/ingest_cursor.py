@@ -0,0 +1,21 @@
+import time
+
+from db_models import IngestCursor
+
+LISTENER_CURSOR = "listener"
+
+
+def load_cursor(db, name=LISTENER_CURSOR):
+    return db.query(IngestCursor).filter_by(name=name).first()
+
+
+def save_cursor(db, block_number, block_hash, name=LISTENER_CURSOR):
+    """Record progress inside the caller's transaction"""
+    cursor = load_cursor(db, name)
+    if cursor is None:
+        cursor = IngestCursor(name=name)
+        db.add(cursor)
+    cursor.block_number = block_number
+    cursor.block_hash = block_hash
+    cursor.updated_at = int(time.time())
+    return cursor
@@ -0,0 +1,114 @@
+"""Append-only journal of what the listener read from the chain.
+
+Everything ingest depends on is recorded in processing order: every log it
+applied (factory AuctionCreated logs and known auctions' BidPlaced logs;
+other contracts' logs are never recorded), the timestamp of each block a bid came from, the getAuctionDetails
+results an auction was stored or re-checked with, the ingest cursor after
+each processed range, and the block the listener rewound to after a reorg,
+dropping the bids it had stored from later blocks. `replay.py` rebuilds the
+auction and bid tables from the journal alone, so changes to how events are processed can be
+applied to history without going back to the RPC node.
+
+Records are JSON arrays, one per line, in gzip segments named
+segment-000001.jsonl.gz and so on under LOG_ARCHIVE_DIR. Each flush appends
+one gzip member to the current segment; a new segment starts once it
+exceeds LOG_ARCHIVE_SEGMENT_BYTES.
+
+    ["log", block, block_hash, tx_hash, log_index, address, [topics], data]
+    ["block", block, timestamp]
+    ["details", auction_address, block, details or null]
+    ["synced", auction_id, auction_address, block, details]
+    ["checkpoint", block, block_hash]
+    ["rewind", block]
+"""
+import gzip
+import json
+import os
+import re
+
+from web3 import Web3
+
+from config import LOG_ARCHIVE_DIR, LOG_ARCHIVE_SEGMENT_BYTES
+
+SEGMENT_NAME = re.compile(r"^segment-(\d+)\.jsonl\.gz$")
+
+
+def segment_paths(directory=LOG_ARCHIVE_DIR):
+    """Segments in the order they were written"""
+    if not directory or not os.path.isdir(directory):
+        return []
+    names = sorted((int(m.group(1)), name) for name in os.listdir(directory) if (m := SEGMENT_NAME.match(name)))
+    return [os.path.join(directory, name) for _, name in names]
+
+
+def read_journal(directory=LOG_ARCHIVE_DIR):
+    """Yield every record in the order it was appended"""
+    for path in segment_paths(directory):
+        with gzip.open(path, "rt", encoding="utf-8") as f:
+            for line in f:
+                yield json.loads(line)
+
+
+class LogJournal:
+    """Buffers records and appends them on flush(); a journal without a directory drops them"""
+
+    def __init__(self, directory=LOG_ARCHIVE_DIR, segment_bytes=LOG_ARCHIVE_SEGMENT_BYTES):
+        self.directory = directory
+        self.segment_bytes = segment_bytes
+        self.pending = []
+        self.recorded_blocks = set()
+        paths = segment_paths(directory)
+        self.segment = int(SEGMENT_NAME.match(os.path.basename(paths[-1])).group(1)) if paths else 1
+
+    def _append(self, record):
+        if self.directory:
+            self.pending.append(json.dumps(record, separators=(",", ":")))
+
+    def log(self, log):
+        self._append(
+            [
+                "log",
+                log["blockNumber"],
+                Web3.to_hex(log["blockHash"]) if log.get("blockHash") else None,
+                Web3.to_hex(log["transactionHash"]),
+                log["logIndex"],
+                log["address"],
+                [Web3.to_hex(topic) for topic in log["topics"]],
+                Web3.to_hex(log["data"]),
+            ]
+        )
+
+    def block(self, number, timestamp):
+        if number not in self.recorded_blocks:
+            self.recorded_blocks.add(number)
+            self._append(["block", number, timestamp])
+
+    def details(self, auction_address, block, details):
+        self._append(["details", auction_address, block, details])
+
+    def synced(self, auction_id, auction_address, block, details):
+        self._append(["synced", auction_id, auction_address, block, details])
+
+    def checkpoint(self, block, block_hash):
+        self._append(["checkpoint", block, block_hash])
+
+    def rewind(self, block):
+        # Replacement blocks may have other timestamps
+        self.recorded_blocks = {number for number in self.recorded_blocks if number <= block}
+        self._append(["rewind", block])
+
+    def flush(self):
+        if not self.pending:
+            return
+        os.makedirs(self.directory, exist_ok=True)
+        path = os.path.join(self.directory, f"segment-{self.segment:06d}.jsonl.gz")
+        if os.path.exists(path) and os.path.getsize(path) >= self.segment_bytes:
+            self.segment += 1
+            path = os.path.join(self.directory, f"segment-{self.segment:06d}.jsonl.gz")
+        # Each flush is one gzip member; concatenated members read back as one stream
+        with gzip.open(path, "at", encoding="utf-8") as f:
+            f.write("\n".join(self.pending) + "\n")
+        self.pending = []
+        # Timestamps are needed once per block; only the recent ones can recur
+        if len(self.recorded_blocks) > 10_000:
+            self.recorded_blocks.clear()
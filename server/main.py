@@ -3,8 +3,12 @@ import signal
 import sys
 import uvicorn
 from server import app
-from blockchain_listener import BlockchainListener
-from config import HOST, PORT, SYNC_INTERVAL
+from blockchain_listener import listen_in_thread
+from derived import prepare_database
+from config import HOST, PORT, SYNC_INTERVAL, PROFILING_ENABLED, MEMPOOL_WATCH_ENABLED
+from mempool import watch_in_thread
+from profiling import handle_profile_signal
+from sources import ingest_sources
 
 # Store tasks so we can cancel them
 server_task = None
@@ -19,10 +23,13 @@ async def run_server():
     await server.serve()
 
 
-# Define the blockchain listener
+# Define the blockchain listeners, one thread per chain so a slow RPC doesn't stall the others
 async def run_listener():
-    listener = BlockchainListener()
-    await listener.start_listening(SYNC_INTERVAL)
+    for source in ingest_sources():
+        listen_in_thread(source, SYNC_INTERVAL)
+        if MEMPOOL_WATCH_ENABLED:
+            watch_in_thread(source)
+    await asyncio.Event().wait()
 
 
 # Signal handler for Windows and Unix
@@ -63,12 +70,18 @@ async def main():
     # Register signal handlers - works on both Windows and Unix
     signal.signal(signal.SIGINT, signal_handler)
     signal.signal(signal.SIGTERM, signal_handler)
+    if PROFILING_ENABLED and hasattr(signal, "SIGUSR2"):
+        # kill -USR2 <pid> writes a folded-stack profile to the working directory
+        signal.signal(signal.SIGUSR2, handle_profile_signal)
 
     try:
         print(f"Starting auction caching server on {HOST}:{PORT}")
         print(f"Blockchain listener will sync every {SYNC_INTERVAL} seconds")
         print("Press CTRL+C to exit")
 
+        # The listener starts querying immediately, so create the schema first
+        prepare_database()
+
         # Create tasks
         server_task = asyncio.create_task(run_server())
         listener_task = asyncio.create_task(run_listener())
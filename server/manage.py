@@ -0,0 +1,146 @@
+"""Maintenance commands for the caching server's database.
+
+    python manage.py init-db
+    python manage.py rebuild                 # every derived table
+    python manage.py rebuild rollups search  # just these
+    python manage.py snapshot export auctions.snapshot.gz
+    python manage.py snapshot import auctions.snapshot.gz [--replace]
+    python manage.py archive                 # move long-ended auctions to the archive now
+    python manage.py replay [--workers 8]    # rebuild auctions and bids from LOG_ARCHIVE_DIR
+    python manage.py verify-reputation       # recompute reputation, repairing drifted rows (nightly cron)
+
+Run from the server directory with the same environment as the server.
+"""
+import argparse
+import time
+
+from archive import archive_ended_auctions
+from config import LOG_ARCHIVE_DIR
+from db_models import SessionLocal
+from derived import prepare_database
+from media import rebuild_media_sources
+from portfolio import rebuild_portfolio
+from replay import replay
+from reputation import rebuild_reputation, verify_reputation
+from rollups import rebuild_rollups
+from search import rebuild_search_index
+from snapshot import SnapshotError, export_snapshot, import_snapshot
+from stats import rebuild_stats
+
+REBUILDERS = {
+    "stats": rebuild_stats,
+    "search": rebuild_search_index,
+    "rollups": rebuild_rollups,
+    "media": rebuild_media_sources,
+    "portfolio": rebuild_portfolio,
+    "reputation": rebuild_reputation,
+}
+
+
+def init_db_command(args):
+    prepare_database()
+    print("Database schema is up to date")
+
+
+def rebuild_command(args):
+    prepare_database()
+    db = SessionLocal()
+    try:
+        for name in args.tables or list(REBUILDERS):
+            started = time.perf_counter()
+            REBUILDERS[name](db)
+            print(f"Rebuilt {name} in {time.perf_counter() - started:.1f}s")
+    finally:
+        db.close()
+
+
+def archive_command(args):
+    prepare_database()
+    db = SessionLocal()
+    try:
+        started = time.perf_counter()
+        archived = archive_ended_auctions(db)
+        print(f"Archived {archived} auctions in {time.perf_counter() - started:.1f}s")
+    finally:
+        db.close()
+
+
+def replay_command(args):
+    started = time.perf_counter()
+    summary = replay(args.dir, workers=args.workers)
+    cursors = ", ".join(f"chain {chain} at block {block}" for chain, block in summary["cursors"].items())
+    print(
+        f"Replayed {summary['auctions']} auctions and {summary['bids']} bids "
+        f"in {time.perf_counter() - started:.1f}s, cursors: {cursors or 'none'}"
+    )
+
+
+def verify_reputation_command(args):
+    prepare_database()
+    db = SessionLocal()
+    try:
+        started = time.perf_counter()
+        drifted = verify_reputation(db)
+        print(f"Verified reputation in {time.perf_counter() - started:.1f}s, repaired {drifted} addresses")
+    finally:
+        db.close()
+
+
+def snapshot_command(args):
+    started = time.perf_counter()
+    try:
+        if args.action == "export":
+            prepare_database()
+            cursor = export_snapshot(args.path)
+        else:
+            cursor = import_snapshot(args.path, replace=args.replace)
+    except SnapshotError as e:
+        raise SystemExit(f"Snapshot {args.action} failed: {e}")
+    block = cursor["blockNumber"] if cursor else "none"
+    print(f"Snapshot {args.action} finished in {time.perf_counter() - started:.1f}s at block {block}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Auction caching server maintenance")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    commands.add_parser("init-db", help="Create or migrate the schema and backfill derived tables")
+
+    rebuild = commands.add_parser("rebuild", help="Recompute derived tables from auctions and bids")
+    rebuild.add_argument("tables", nargs="*", help=f"Any of {', '.join(REBUILDERS)}; default all")
+
+    snapshot = commands.add_parser("snapshot", help="Export or import a point-in-time snapshot")
+    snapshot.add_argument("action", choices=["export", "import"])
+    snapshot.add_argument("path", help="Snapshot file (gzip-compressed JSON lines)")
+    snapshot.add_argument(
+        "--replace", action="store_true", help="On import, overwrite a database that has auctions"
+    )
+
+    commands.add_parser("archive", help="Move auctions that ended over ARCHIVE_AFTER_DAYS ago to the archive")
+
+    replay_parser = commands.add_parser("replay", help="Rebuild auctions and bids from the chain data journal")
+    replay_parser.add_argument("--dir", default=LOG_ARCHIVE_DIR, help="Journal directory; default LOG_ARCHIVE_DIR")
+    replay_parser.add_argument("--workers", type=int, help="Worker processes; default one per CPU")
+
+    commands.add_parser(
+        "verify-reputation", help="Recompute reputation in full and repair rows the listener got wrong"
+    )
+
+    args = parser.parse_args()
+    if args.command == "rebuild":
+        unknown = set(args.tables) - set(REBUILDERS)
+        if unknown:
+            parser.error(f"unknown tables: {', '.join(sorted(unknown))}")
+    commands = {
+        "init-db": init_db_command,
+        "rebuild": rebuild_command,
+        "snapshot": snapshot_command,
+        "archive": archive_command,
+        "replay": replay_command,
+        "verify-reputation": verify_reputation_command,
+    }
+    commands[args.command](args)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,368 @@
+"""Local cache for NFT metadata JSON and images, served by `GET /media/{key}`.
+
+A key is the SHA-256 of the content address: `ipfs://<cid>/<path>` for
+anything on IPFS, whichever gateway the URL names, otherwise the URL itself.
+The URLs come from NFT metadata that anyone can mint, so downloads never go
+to private, loopback or link-local addresses, including where a redirect
+points, and MEDIA_ALLOWED_HOSTS can limit them to a few hosts. A download
+connects to the address its host was checked at, so a DNS answer that
+changes between the check and the request can't redirect it.
+Objects live on disk under MEDIA_CACHE_DIR, one file per key, and the least
+recently used ones are evicted once the cache outgrows MEDIA_CACHE_MAX_BYTES.
+The `media_sources` table maps keys back to URLs so a miss can be fetched;
+concurrent misses for the same key share one gateway request.
+"""
+import hashlib
+import io
+import ipaddress
+import logging
+import os
+import re
+import socket
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+from urllib.parse import urljoin, urlsplit
+
+import urllib3
+from requests.certs import where as ca_bundle
+
+from config import (
+    IPFS_GATEWAY,
+    MEDIA_ALLOWED_HOSTS,
+    MEDIA_CACHE_DIR,
+    MEDIA_CACHE_MAX_BYTES,
+    MEDIA_FETCH_TIMEOUT,
+    MEDIA_MAX_OBJECT_BYTES,
+    MEDIA_PUBLIC_URL,
+)
+from db_models import MediaSource, NFTMetadata, TokenMetadata
+from singleflight import SingleFlight
+
+logger = logging.getLogger(__name__)
+
+KEY_PATTERN = re.compile(r"^[0-9a-f]{64}$")
+IPFS_URL = re.compile(r"^(?:ipfs://(?:ipfs/)?|https?://[^/]+/ipfs/)(.+)$")
+THUMBNAIL_WIDTHS = (64, 128, 256, 512)
+MAX_REDIRECTS = 5
+RESOLVE_TTL = 300  # Seconds a host's checked addresses are reused, by media_url as well as downloads
+
+
+class MediaFetchError(Exception):
+    pass
+
+
+def content_address(url):
+    """`ipfs://<cid>/<path>` for IPFS URLs on any gateway, otherwise the URL unchanged"""
+    match = IPFS_URL.match(url)
+    return f"ipfs://{match.group(1)}" if match else url
+
+
+def media_key(url):
+    return hashlib.sha256(content_address(url).encode()).hexdigest()
+
+
+def is_cacheable(url):
+    return bool(url) and url.startswith(("http://", "https://", "ipfs://"))
+
+
+def is_immutable(url):
+    """IPFS content never changes under its address; plain URLs might"""
+    return content_address(url).startswith("ipfs://")
+
+
+def gateway_url(url):
+    """The URL to download `url` from, routing IPFS content through IPFS_GATEWAY"""
+    address = content_address(url)
+    if address.startswith("ipfs://"):
+        return IPFS_GATEWAY + address[len("ipfs://"):]
+    return url
+
+
+def _default_port(parts):
+    return parts.port or (443 if parts.scheme == "https" else 80)
+
+
+_resolved = {}  # (host, port, public only) -> (expiry, addresses or the MediaFetchError raised)
+
+
+def _resolve(host, port, public):
+    """`host`'s addresses, all of them global when `public`; raises MediaFetchError otherwise"""
+    key = (host, port, public)
+    cached = _resolved.get(key)
+    if cached is None or cached[0] < time.monotonic():
+        try:
+            try:
+                infos = socket.getaddrinfo(host, port, proto=socket.IPPROTO_TCP)
+            except OSError as e:
+                raise MediaFetchError(f"Couldn't resolve {host}: {e}")
+            # Drop an IPv6 zone id such as %eth0
+            addresses = list(dict.fromkeys(info[4][0].split("%")[0] for info in infos))
+            for address in addresses if public else ():
+                if not ipaddress.ip_address(address).is_global:
+                    raise MediaFetchError(f"{host} resolves to non-public address {address}")
+            cached = (time.monotonic() + RESOLVE_TTL, addresses)
+        except MediaFetchError as e:
+            cached = (time.monotonic() + RESOLVE_TTL, e)
+        _resolved[key] = cached
+    if isinstance(cached[1], MediaFetchError):
+        raise cached[1]
+    return cached[1]
+
+
+def check_fetchable(url):
+    """The addresses to download `url` from; raises MediaFetchError unless its host is allowed and public"""
+    parts = urlsplit(url)
+    host = (parts.hostname or "").lower()
+    if parts.scheme not in ("http", "https") or not host:
+        raise MediaFetchError(f"{url} is not an http(s) URL")
+    if url.startswith(IPFS_GATEWAY):
+        # Configured by the operator, and often a local IPFS node
+        return _resolve(host, _default_port(parts), public=False)
+    if MEDIA_ALLOWED_HOSTS and "*" not in MEDIA_ALLOWED_HOSTS and host not in MEDIA_ALLOWED_HOSTS:
+        raise MediaFetchError(f"{host} is not an allowed media host")
+    return _resolve(host, _default_port(parts), public=True)
+
+
+def is_fetchable(url):
+    try:
+        check_fetchable(gateway_url(url))
+    except MediaFetchError:
+        return False
+    return True
+
+
+def media_url(url):
+    """What clients are given for an image: its /media URL when MEDIA_PUBLIC_URL is set and the cache may fetch it"""
+    if not MEDIA_PUBLIC_URL or not is_cacheable(url) or not is_fetchable(url):
+        return url
+    return f"{MEDIA_PUBLIC_URL}/{media_key(url)}"
+
+
+def _pinned_get(url, address):
+    """GET `url` over a connection to `address`, keeping its host for the Host header, SNI and certificate"""
+    parts = urlsplit(url)
+    host = parts.hostname
+    if parts.scheme == "https":
+        pool = urllib3.HTTPSConnectionPool(
+            address,
+            _default_port(parts),
+            server_hostname=host,
+            assert_hostname=host,
+            cert_reqs="CERT_REQUIRED",
+            ca_certs=ca_bundle(),
+        )
+    else:
+        pool = urllib3.HTTPConnectionPool(address, _default_port(parts))
+    path = (parts.path or "/") + (f"?{parts.query}" if parts.query else "")
+    return pool.urlopen(
+        "GET",
+        path,
+        headers={"Host": parts.netloc.rpartition("@")[2], "Accept": "*/*"},
+        redirect=False,
+        retries=False,
+        preload_content=False,
+        timeout=MEDIA_FETCH_TIMEOUT,
+    )
+
+
+def register_media(db, url):
+    """Record where a key's content comes from, inside the caller's transaction"""
+    if not is_cacheable(url):
+        return
+    key = media_key(url)
+    if db.query(MediaSource.id).filter_by(key=key).first() is None:
+        db.add(MediaSource(key=key, url=url))
+        # Sessions don't autoflush; make the row visible to the next lookup
+        db.flush()
+
+
+def media_source(db, key):
+    row = db.query(MediaSource.url).filter_by(key=key).first()
+    return row[0] if row else None
+
+
+def rebuild_media_sources(db):
+    """Register every stored image URL"""
+    db.query(MediaSource).delete()
+    urls = {url for (url,) in db.query(NFTMetadata.image_url)}
+    urls |= {url for (url,) in db.query(TokenMetadata.image_url)}
+    sources = {media_key(url): url for url in urls if is_cacheable(url)}
+    db.bulk_insert_mappings(MediaSource, [{"key": key, "url": url} for key, url in sources.items()])
+    db.commit()
+
+
+def ensure_media_sources(db):
+    """Fill the table for databases that predate it"""
+    has_images = db.query(NFTMetadata.id).first() or db.query(TokenMetadata.id).first()
+    if db.query(MediaSource.id).first() is None and has_images:
+        rebuild_media_sources(db)
+
+
+def thumbnails_available():
+    try:
+        import PIL  # noqa: F401
+    except ImportError:
+        return False
+    return True
+
+
+def thumbnail_key(key, width):
+    return f"{key}-w{width}"
+
+
+def make_thumbnail(body, width):
+    """Scale an image down to `width` pixels wide; returns (body, content_type)"""
+    from PIL import Image
+
+    try:
+        image = Image.open(io.BytesIO(body))
+        image.load()
+    except OSError as e:
+        raise ValueError(f"Not an image: {e}")
+    if image.width > width:
+        image = image.resize((width, max(1, round(image.height * width / image.width))))
+    output = io.BytesIO()
+    if image.mode in ("RGBA", "LA", "P"):
+        image.save(output, "PNG")
+        return output.getvalue(), "image/png"
+    image.convert("RGB").save(output, "JPEG", quality=85)
+    return output.getvalue(), "image/jpeg"
+
+
+class MediaCache:
+    """Size-bounded LRU of objects on disk; each file is its content type, a newline, then the body"""
+
+    def __init__(self, directory=MEDIA_CACHE_DIR, max_bytes=MEDIA_CACHE_MAX_BYTES):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.lock = threading.Lock()
+        self.entries = None  # key -> size, least recently used first
+        self.total_bytes = 0
+        self.flights = SingleFlight("media")
+
+    def _path(self, key):
+        return os.path.join(self.directory, key[:2], key)
+
+    def _load_index(self):
+        # Access times survive restarts as file mtimes
+        files = []
+        if os.path.isdir(self.directory):
+            for prefix in os.listdir(self.directory):
+                subdirectory = os.path.join(self.directory, prefix)
+                for name in os.listdir(subdirectory) if os.path.isdir(subdirectory) else []:
+                    if not name.startswith("."):
+                        stat = os.stat(os.path.join(subdirectory, name))
+                        files.append((stat.st_mtime, name, stat.st_size))
+        self.entries = OrderedDict((name, size) for _, name, size in sorted(files))
+        self.total_bytes = sum(self.entries.values())
+
+    def get(self, key):
+        """Cached (body, content_type) for a key, or None"""
+        with self.lock:
+            if self.entries is None:
+                self._load_index()
+            if key not in self.entries:
+                return None
+            self.entries.move_to_end(key)
+        try:
+            with open(self._path(key), "rb") as f:
+                content_type, _, body = f.read().partition(b"\n")
+            os.utime(self._path(key))
+        except FileNotFoundError:
+            with self.lock:
+                self.total_bytes -= self.entries.pop(key, 0)
+            return None
+        return body, content_type.decode()
+
+    def put(self, key, body, content_type):
+        os.makedirs(os.path.dirname(self._path(key)), exist_ok=True)
+        data = content_type.encode() + b"\n" + body
+        # Write then rename so readers never see a partial file
+        fd, temporary = tempfile.mkstemp(dir=os.path.dirname(self._path(key)), prefix=".")
+        with os.fdopen(fd, "wb") as f:
+            f.write(data)
+        os.replace(temporary, self._path(key))
+
+        with self.lock:
+            if self.entries is None:
+                self._load_index()
+            self.total_bytes += len(data) - self.entries.pop(key, 0)
+            self.entries[key] = len(data)
+            while self.total_bytes > self.max_bytes and len(self.entries) > 1:
+                evicted, size = self.entries.popitem(last=False)
+                self.total_bytes -= size
+                try:
+                    os.remove(self._path(evicted))
+                except FileNotFoundError:
+                    pass
+
+    def _get(self, url):
+        """The final response for `url`, checking the target of every redirect before following it"""
+        location = gateway_url(url)
+        for _ in range(MAX_REDIRECTS + 1):
+            addresses = check_fetchable(location)
+            for address in addresses:
+                try:
+                    response = _pinned_get(location, address)
+                    break
+                except urllib3.exceptions.HTTPError as e:
+                    error = e
+            else:
+                raise MediaFetchError(f"Couldn't fetch {url}: {error}")
+            redirect = response.get_redirect_location()
+            if not redirect:
+                return response
+            response.close()
+            location = urljoin(location, redirect)
+        raise MediaFetchError(f"Fetching {url} redirected more than {MAX_REDIRECTS} times")
+
+    def _download(self, url):
+        response = self._get(url)
+        with response:
+            if response.status != 200:
+                raise MediaFetchError(f"Fetching {url} returned {response.status}")
+            chunks, size = [], 0
+            try:
+                for chunk in response.stream(64 * 1024):
+                    size += len(chunk)
+                    if size > MEDIA_MAX_OBJECT_BYTES:
+                        raise MediaFetchError(f"{url} is larger than {MEDIA_MAX_OBJECT_BYTES} bytes")
+                    chunks.append(chunk)
+            except urllib3.exceptions.HTTPError as e:
+                raise MediaFetchError(f"Couldn't fetch {url}: {e}")
+        content_type = response.headers.get("Content-Type", "application/octet-stream")
+        return b"".join(chunks), content_type
+
+    def fetch(self, url, cache=True):
+        """(body, content_type) for a URL from the cache, or downloaded once and stored"""
+        key = media_key(url)
+        cached = self.get(key) if cache else None
+        if cached is not None:
+            return cached
+
+        def download():
+            body, content_type = self._download(url)
+            if cache:
+                self.put(key, body, content_type)
+            return body, content_type
+
+        return self.flights.do(key, download)
+
+    def thumbnail(self, url, width):
+        """A cached copy of the image at `url` scaled to `width` pixels wide"""
+        key = thumbnail_key(media_key(url), width)
+        cached = self.get(key)
+        if cached is not None:
+            return cached
+
+        def resize():
+            body, content_type = make_thumbnail(self.fetch(url)[0], width)
+            self.put(key, body, content_type)
+            return body, content_type
+
+        return self.flights.do(key, resize)
+
+
+media_cache = MediaCache()
@@ -0,0 +1,176 @@
+"""Optimistic pending bids from the mempool.
+
+A watcher per ingest source polls the node's pending-transaction filter,
+decodes placeBid(uint256) calls to active auctions and holds them in
+memory. The listener confirms a pending bid once its BidPlaced log is
+stored and drops the pending bids that the new highest bid outbids; bids
+that never land expire after PENDING_BID_TTL. Only the process running
+the watchers holds pending bids, like the read model.
+
+Every pending transaction costs one eth_getTransactionByHash, so this is
+meant for nodes whose mempool the auction traffic dominates, such as a
+rollup sequencer or a local dev node.
+"""
+import logging
+import threading
+import time
+from collections import namedtuple
+
+from eth_abi import decode
+from web3 import Web3
+from web3.exceptions import TransactionNotFound
+
+from config import MEMPOOL_POLL_INTERVAL, PENDING_BID_TTL
+from db_models import Auction, SessionLocal
+from metrics import PENDING_BID_OUTCOMES, PENDING_BIDS, rpc_metrics_middleware
+
+logger = logging.getLogger(__name__)
+
+PLACE_BID_SELECTOR = Web3.keccak(text="placeBid(uint256)")[:4]
+ADDRESS_REFRESH_SECONDS = 15  # How stale the watcher's set of active auctions may get
+
+PendingBid = namedtuple("PendingBid", ["tx_hash", "chain_id", "auction_address", "bidder", "amount", "seen_at"])
+
+
+def pending_bid_dict(bid):
+    return {"txHash": bid.tx_hash, "bidder": bid.bidder, "amount": bid.amount, "seenAt": int(bid.seen_at)}
+
+
+class PendingBids:
+    """Pending bids per auction, shared by the watchers, the listeners and the API"""
+
+    def __init__(self, ttl=PENDING_BID_TTL):
+        self.ttl = ttl
+        self._bids = {}  # (chain id, auction address) -> {tx hash: PendingBid}
+        self._lock = threading.Lock()
+
+    def _publish(self):
+        PENDING_BIDS.set(sum(len(bids) for bids in self._bids.values()))
+
+    def add(self, bid):
+        with self._lock:
+            bids = self._bids.setdefault((bid.chain_id, bid.auction_address), {})
+            if bid.tx_hash in bids:
+                return
+            bids[bid.tx_hash] = bid
+            PENDING_BID_OUTCOMES.labels("seen").inc()
+            self._publish()
+
+    def confirm(self, chain_id, auction_address, tx_hash, highest_bid):
+        """Settle an auction's pending bids against a stored BidPlaced log"""
+        with self._lock:
+            bids = self._bids.get((chain_id, auction_address))
+            if not bids:
+                return
+            if bids.pop(tx_hash, None):
+                PENDING_BID_OUTCOMES.labels("confirmed").inc()
+            # These would revert now
+            for pending_hash, bid in list(bids.items()):
+                if int(bid.amount) <= int(highest_bid):
+                    del bids[pending_hash]
+                    PENDING_BID_OUTCOMES.labels("outbid").inc()
+            if not bids:
+                del self._bids[(chain_id, auction_address)]
+            self._publish()
+
+    def expire(self, now=None):
+        """Drop bids pending for longer than the TTL, e.g. replaced or evicted transactions"""
+        cutoff = (now or time.time()) - self.ttl
+        with self._lock:
+            for key, bids in list(self._bids.items()):
+                for tx_hash, bid in list(bids.items()):
+                    if bid.seen_at < cutoff:
+                        del bids[tx_hash]
+                        PENDING_BID_OUTCOMES.labels("expired").inc()
+                if not bids:
+                    del self._bids[key]
+            self._publish()
+
+    def for_auction(self, chain_id, auction_address):
+        """An auction's live pending bids, highest first"""
+        cutoff = time.time() - self.ttl
+        with self._lock:
+            bids = [
+                bid for bid in self._bids.get((chain_id, auction_address), {}).values() if bid.seen_at >= cutoff
+            ]
+        return sorted(bids, key=lambda bid: int(bid.amount), reverse=True)
+
+
+pending_bids = PendingBids()
+
+
+def decode_place_bid(tx, chain_id, auction_addresses):
+    """A PendingBid for a placeBid transaction to one of `auction_addresses` on `chain_id`, else None"""
+    to = tx.get("to")
+    data = bytes(tx.get("input") or b"")
+    if to not in auction_addresses or data[:4] != PLACE_BID_SELECTOR:
+        return None
+    try:
+        (amount,) = decode(["uint256"], data[4:])
+    except Exception:
+        return None
+    return PendingBid(Web3.to_hex(tx["hash"]), chain_id, to, tx["from"], str(amount), time.time())
+
+
+class MempoolWatcher:
+    def __init__(self, source, store=pending_bids):
+        self.source = source
+        self.store = store
+        self.w3 = Web3(Web3.HTTPProvider(source.rpc_url))
+        self.w3.middleware_onion.add(rpc_metrics_middleware, "metrics")
+        self.auction_addresses = set()
+        self.addresses_loaded = 0
+
+    def refresh_addresses(self):
+        if time.monotonic() - self.addresses_loaded < ADDRESS_REFRESH_SECONDS:
+            return
+        db = SessionLocal()
+        try:
+            self.auction_addresses = {
+                address
+                for (address,) in db.query(Auction.auction_address).filter(
+                    Auction.chain_id == self.source.chain_id, Auction.status == "active"
+                )
+            }
+        finally:
+            db.close()
+        self.addresses_loaded = time.monotonic()
+
+    def inspect(self, tx_hash):
+        try:
+            tx = self.w3.eth.get_transaction(tx_hash)
+        except TransactionNotFound:
+            # Already dropped or replaced
+            return
+        if tx.get("blockNumber") is not None:
+            return
+        bid = decode_place_bid(tx, self.source.chain_id, self.auction_addresses)
+        if bid:
+            self.store.add(bid)
+            logger.info(f"Pending bid of {bid.amount} from {bid.bidder} on auction {bid.auction_address}")
+
+    def poll(self, pending_filter):
+        self.refresh_addresses()
+        for tx_hash in pending_filter.get_new_entries():
+            self.inspect(tx_hash)
+        self.store.expire()
+
+    def run(self):
+        logger.info(f"Watching pending transactions on chain {self.source.chain_id}")
+        pending_filter = None
+        while True:
+            try:
+                if pending_filter is None:
+                    pending_filter = self.w3.eth.filter("pending")
+                self.poll(pending_filter)
+            except Exception as e:
+                logger.error(f"Error watching pending transactions on chain {self.source.chain_id}: {e}")
+                # Nodes forget idle filters; install a new one next time
+                pending_filter = None
+            time.sleep(MEMPOOL_POLL_INTERVAL)
+
+
+def watch_in_thread(source):
+    thread = threading.Thread(target=MempoolWatcher(source).run, name=f"mempool-{source.chain_id}", daemon=True)
+    thread.start()
+    return thread
@@ -0,0 +1,133 @@
+import time
+from contextvars import ContextVar
+from prometheus_client import (
+    CONTENT_TYPE_LATEST,
+    Counter,
+    Gauge,
+    Histogram,
+    generate_latest,
+)
+from sqlalchemy import event
+
+# Route template of the request being served; DB metrics are labelled with it.
+# Anything running outside an API request (the listener) keeps the default.
+current_endpoint = ContextVar("current_endpoint", default="listener")
+
+# Ingest progress
+# Listener metrics are labelled with the chain id of the source they follow
+HEAD_BLOCK = Gauge("auction_chain_head_block", "Latest block number reported by the RPC node", ["chain"])
+LAST_PROCESSED_BLOCK = Gauge(
+    "auction_listener_last_processed_block", "Last block fully processed by the listener", ["chain"]
+)
+INGEST_LAG_BLOCKS = Gauge(
+    "auction_listener_lag_blocks", "Head block minus last processed block at the start of a cycle", ["chain"]
+)
+RECONCILE_CHECKED = Counter(
+    "auction_reconcile_checked_total", "Stored auctions compared with their contract", ["chain", "tier"]
+)
+RECONCILE_DRIFT = Counter(
+    "auction_reconcile_drift_total", "Stored auction fields found to differ from the contract", ["chain", "field"]
+)
+EVENTS_INGESTED = Counter(
+    "auction_listener_events_ingested_total", "Chain events written to the database", ["event"]
+)
+LISTENER_CYCLE_SECONDS = Histogram(
+    "auction_listener_cycle_duration_seconds", "Duration of one listener polling cycle", ["chain"]
+)
+METADATA_QUEUE_DEPTH = Gauge(
+    "auction_metadata_queue_depth", "Token/NFT metadata lookups waiting to be resolved"
+)
+WS_CONNECTED = Gauge(
+    "auction_listener_ws_connected", "1 while events are pushed over eth_subscribe, 0 while polling", ["chain"]
+)
+POLL_INTERVAL_SECONDS = Gauge(
+    "auction_listener_poll_interval_seconds", "Current wait between polling cycles", ["chain"]
+)
+READ_MODEL_ENTRIES = Gauge(
+    "auction_read_model_entries", "Active auctions held in the in-memory read model"
+)
+REPUTATION_DRIFT = Gauge(
+    "auction_reputation_drift", "Addresses whose incremental reputation differed at the last full recompute"
+)
+PENDING_BIDS = Gauge("auction_pending_bids", "Unconfirmed placeBid transactions held from the mempool")
+PENDING_BID_OUTCOMES = Counter(
+    "auction_pending_bid_outcomes_total", "Pending bids seen, confirmed, outbid or expired", ["outcome"]
+)
+
+# Request coalescing; coalesced / calls is the share of work saved
+COALESCE_CALLS = Counter(
+    "auction_coalesce_calls_total", "Calls entering a single-flight group", ["group"]
+)
+COALESCED_CALLS = Counter(
+    "auction_coalesced_calls_total", "Calls answered by another call's in-flight result", ["group"]
+)
+
+# RPC
+RPC_LATENCY = Histogram(
+    "auction_rpc_request_duration_seconds", "JSON-RPC request latency", ["method"]
+)
+RPC_ERRORS = Counter("auction_rpc_errors_total", "Failed JSON-RPC requests", ["method"])
+
+# Database
+DB_QUERIES = Counter("auction_db_queries_total", "SQL statements executed", ["endpoint"])
+DB_QUERY_SECONDS = Histogram(
+    "auction_db_query_duration_seconds",
+    "SQL statement execution time",
+    ["endpoint"],
+    buckets=(0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5),
+)
+
+# API
+HTTP_REQUEST_SECONDS = Histogram(
+    "auction_http_request_duration_seconds",
+    "API request latency",
+    ["method", "endpoint", "status"],
+)
+
+
+def rpc_metrics_middleware(make_request, w3):
+    """web3 middleware recording latency and errors per JSON-RPC method"""
+
+    def middleware(method, params):
+        start = time.perf_counter()
+        try:
+            response = make_request(method, params)
+        except Exception:
+            RPC_ERRORS.labels(method).inc()
+            raise
+        finally:
+            RPC_LATENCY.labels(method).observe(time.perf_counter() - start)
+        if "error" in response:
+            RPC_ERRORS.labels(method).inc()
+        return response
+
+    return middleware
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault("query_start_time", []).append(time.perf_counter())
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    elapsed = time.perf_counter() - conn.info["query_start_time"].pop()
+    endpoint = current_endpoint.get()
+    DB_QUERIES.labels(endpoint).inc()
+    DB_QUERY_SECONDS.labels(endpoint).observe(elapsed)
+
+
+def _handle_error(exception_context):
+    conn = exception_context.connection
+    if conn is not None and conn.info.get("query_start_time"):
+        conn.info["query_start_time"].pop()
+
+
+def instrument_engine(engine):
+    """Attach query count/duration hooks to a SQLAlchemy engine"""
+    event.listen(engine, "before_cursor_execute", _before_cursor_execute)
+    event.listen(engine, "after_cursor_execute", _after_cursor_execute)
+    event.listen(engine, "handle_error", _handle_error)
+
+
+def render_latest():
+    """Return the Prometheus exposition payload and its content type"""
+    return generate_latest(), CONTENT_TYPE_LATEST
@@ -0,0 +1,94 @@
+"""Batch read-only contract calls through Multicall3's aggregate3.
+
+Multicall3 is deployed at the same address on most EVM chains, so hundreds
+of view calls cost one eth_call. Each call may fail on its own and comes
+back as None. On chains without it (or with MULTICALL_ADDRESS empty)
+`aggregate` raises MulticallUnavailable and callers make plain calls instead.
+"""
+import logging
+import time
+
+from eth_abi import decode
+from web3 import Web3
+from web3.exceptions import BadFunctionCallOutput, ContractLogicError
+
+from config import MULTICALL_ADDRESS, MULTICALL_BATCH_SIZE
+
+logger = logging.getLogger(__name__)
+
+AGGREGATE3_ABI = [
+    {
+        "inputs": [
+            {
+                "components": [
+                    {"internalType": "address", "name": "target", "type": "address"},
+                    {"internalType": "bool", "name": "allowFailure", "type": "bool"},
+                    {"internalType": "bytes", "name": "callData", "type": "bytes"},
+                ],
+                "internalType": "struct Multicall3.Call3[]",
+                "name": "calls",
+                "type": "tuple[]",
+            }
+        ],
+        "name": "aggregate3",
+        "outputs": [
+            {
+                "components": [
+                    {"internalType": "bool", "name": "success", "type": "bool"},
+                    {"internalType": "bytes", "name": "returnData", "type": "bytes"},
+                ],
+                "internalType": "struct Multicall3.Result[]",
+                "name": "returnData",
+                "type": "tuple[]",
+            }
+        ],
+        "stateMutability": "payable",
+        "type": "function",
+    }
+]
+
+
+class MulticallUnavailable(Exception):
+    pass
+
+
+def _decode(call, data):
+    types = [output["type"] for output in call.abi["outputs"]]
+    try:
+        values = decode(types, data)
+    except Exception:
+        # e.g. tokens that return bytes32 from symbol()
+        return None
+    # Checksummed, as .call() returns them
+    values = tuple(
+        Web3.to_checksum_address(value) if type_ == "address" else value for type_, value in zip(types, values)
+    )
+    return values[0] if len(values) == 1 else values
+
+
+def aggregate(w3, calls, address=MULTICALL_ADDRESS, batch_size=MULTICALL_BATCH_SIZE, block_identifier="latest"):
+    """Results of bound contract calls (token.functions.symbol(), ...) in order, None where a call failed"""
+    if not address:
+        raise MulticallUnavailable("MULTICALL_ADDRESS is not set")
+    multicall = w3.eth.contract(address=Web3.to_checksum_address(address), abi=AGGREGATE3_ABI)
+
+    results = []
+    for start in range(0, len(calls), batch_size):
+        batch = calls[start : start + batch_size]
+        request = [(call.address, True, call._encode_transaction_data()) for call in batch]
+        # Повторная попытка для aggregate3
+        for attempt in range(5):
+            try:
+                returned = multicall.functions.aggregate3(request).call(block_identifier=block_identifier)
+                break
+            except (BadFunctionCallOutput, ContractLogicError) as e:
+                # No contract at the address, or not a Multicall3
+                raise MulticallUnavailable(str(e)) from e
+            except Exception as e:
+                logger.error(f"Error calling aggregate3, attempt {attempt + 1}: {e}")
+                if attempt == 0:
+                    time.sleep(0.5)
+                else:
+                    raise
+        results.extend(_decode(call, data) if success else None for call, (success, data) in zip(batch, returned))
+    return results
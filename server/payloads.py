@@ -0,0 +1,313 @@
+"""Auction response payloads built from plain row tuples.
+
+Dicts are assembled in AuctionResponse field order so they can be encoded
+directly, without response_model validation; the API and the active
+auction read model share them.
+"""
+from sqlalchemy import func, null, tuple_
+
+from db_models import ArchivedBid, Auction, Bid, NFTMetadata, Reputation, TokenMetadata
+from formatting import format_ether
+from media import media_url
+
+# Columns the auction endpoints read, selected as plain rows instead of ORM entities
+AUCTION_COLUMNS = (
+    Auction.auction_id,
+    Auction.auction_address,
+    Auction.auction_type,
+    Auction.seller,
+    Auction.highest_bidder,
+    Auction.highest_bid,
+    Auction.end_time,
+    Auction.ended,
+    Auction.asset_address,
+    Auction.asset_id,
+    Auction.amount,
+    Auction.amount_ether,
+    Auction.payment_token,
+    Auction.status,
+    Auction.token_symbol,
+    Auction.reserve_price,
+    Auction.current_price,
+    Auction.chain_id,
+)
+
+
+# The columns each AuctionResponse field is built from, in response order
+_DESCRIPTION_COLUMNS = ("amount", "amount_ether", "asset_address", "asset_id")
+FIELD_COLUMNS = {
+    "id": ("auction_id",),
+    "auctionId": ("auction_id",),
+    "auctionAddress": ("auction_address",),
+    "auctionType": ("auction_type",),
+    "seller": ("seller",),
+    "highestBidder": ("highest_bidder",),
+    "highestBid": ("highest_bid",),
+    "endTime": ("end_time",),
+    "ended": ("ended",),
+    "assetAddress": ("asset_address",),
+    "assetId": ("asset_id",),
+    "amount": ("amount",),
+    "paymentToken": ("payment_token",),
+    "status": ("status",),
+    "bidCount": (),
+    "currency": ("token_symbol",),
+    "imageUrl": _DESCRIPTION_COLUMNS,
+    "title": _DESCRIPTION_COLUMNS,
+    "description": _DESCRIPTION_COLUMNS,
+    "currencySymbol": ("payment_token",),
+    "currencyName": ("payment_token",),
+    "currencyImageUrl": ("payment_token",),
+    "currencyDecimals": ("payment_token",),
+    "reservePrice": ("auction_type", "reserve_price"),
+    "currentPrice": ("auction_type", "current_price"),
+    "chainId": ("chain_id",),
+    "sellerScore": ("seller",),
+}
+DESCRIPTION_FIELDS = {"imageUrl", "title", "description"}
+CURRENCY_FIELDS = {"currencySymbol", "currencyName", "currencyImageUrl", "currencyDecimals"}
+
+BID_FIELD_COLUMNS = {
+    "bidder": "bidder",
+    "amount": "amount",
+    "blockNumber": "block_number",
+    "timestamp": "timestamp",
+}
+
+
+def parse_fields(fields, known):
+    """Requested field names from a `fields=a,b` parameter in `known`'s order, or None for all"""
+    if not fields:
+        return None
+    requested = {name.strip() for name in fields.split(",") if name.strip()}
+    unknown = requested - set(known)
+    if unknown:
+        raise ValueError(f"Unknown fields: {', '.join(sorted(unknown))}")
+    return tuple(name for name in known if name in requested) or None
+
+
+def auction_columns(entity, fields=None):
+    """AUCTION_COLUMNS read from `entity`, which may be the archive.
+
+    With `fields`, columns none of them needs are selected as NULL, so the
+    rows keep their shape but the database doesn't read those columns.
+    """
+    if fields is None:
+        return tuple(getattr(entity, column.key) for column in AUCTION_COLUMNS)
+    # The chain, id and address identify rows in every caller
+    needed = {"chain_id", "auction_id", "auction_address"}
+    for name in fields:
+        needed.update(FIELD_COLUMNS[name])
+    return tuple(
+        getattr(entity, column.key) if column.key in needed else null().label(column.key)
+        for column in AUCTION_COLUMNS
+    )
+
+
+def auction_payload(auction, bid_count):
+    """AuctionResponse fields in model order, so responses can skip model validation"""
+    is_dutch = auction.auction_type == 1
+    return {
+        "id": auction.auction_id,
+        "auctionId": auction.auction_id,
+        "auctionAddress": auction.auction_address,
+        "auctionType": auction.auction_type,
+        "seller": auction.seller,
+        "highestBidder": auction.highest_bidder,
+        "highestBid": auction.highest_bid,
+        "endTime": auction.end_time,
+        "ended": auction.ended,
+        "assetAddress": auction.asset_address,
+        "assetId": auction.asset_id,
+        "amount": auction.amount,
+        "paymentToken": auction.payment_token,
+        "status": auction.status,
+        "bidCount": bid_count,
+        "currency": auction.token_symbol,
+        "imageUrl": None,
+        "title": None,
+        "description": None,
+        "currencySymbol": None,
+        "currencyName": None,
+        "currencyImageUrl": None,
+        "currencyDecimals": None,
+        # Dutch auction specific fields
+        "reservePrice": (auction.reserve_price or None) if is_dutch else None,
+        "currentPrice": (auction.current_price or None) if is_dutch else None,
+        "chainId": auction.chain_id,
+        "sellerScore": None,
+    }
+
+
+def amount_ether(auction):
+    # Formatted by the listener at ingest; rows it hasn't rewritten yet are formatted here
+    if auction.amount_ether is not None:
+        return auction.amount_ether
+    return format_ether(auction.amount)
+
+
+def apply_nft_metadata(auction_dict, auction, nft_metadata):
+    if nft_metadata:
+        auction_dict["imageUrl"] = media_url(nft_metadata.image_url)
+        auction_dict["title"] = nft_metadata.name
+        auction_dict["description"] = nft_metadata.description
+    else:
+        auction_dict["imageUrl"] = (
+            f"https://via.placeholder.com/300x200?text=NFT+{auction.asset_id}"
+        )
+        auction_dict["title"] = f"NFT #{auction.asset_id}"
+        auction_dict["description"] = "Metadata not available"
+
+
+def apply_payment_token(auction_dict, payment_token):
+    if payment_token:
+        auction_dict["currencySymbol"] = payment_token.symbol
+        auction_dict["currencyName"] = payment_token.name
+        auction_dict["currencyImageUrl"] = media_url(payment_token.image_url)
+        auction_dict["currencyDecimals"] = payment_token.decimals
+
+
+def auction_detail_dict(auction, bid_count, nft_metadata, token_metadata, payment_token):
+    """Build the /auctions/{auction_id} payload from preloaded metadata rows"""
+    auction_dict = auction_payload(auction, bid_count)
+
+    # Add title, description and image URL based on asset type
+    if auction.amount == "0":  # ERC721
+        apply_nft_metadata(auction_dict, auction, nft_metadata)
+    else:  # ERC20
+        amount = amount_ether(auction)
+        if token_metadata:
+            auction_dict["imageUrl"] = media_url(token_metadata.image_url)
+            auction_dict["title"] = f"{amount} {token_metadata.name} ({token_metadata.symbol})"
+            auction_dict["description"] = f"{amount} {token_metadata.symbol} tokens"
+        else:
+            auction_dict["imageUrl"] = f"https://via.placeholder.com/128x128?text=Token"
+            auction_dict["title"] = "Unknown Token"
+            auction_dict["description"] = f"{amount} tokens"
+
+    apply_payment_token(auction_dict, payment_token)
+    return auction_dict
+
+
+def auction_list_dict(auction, bid_count, nft_metadata, token_metadata, payment_token):
+    """Build a /auctions list item; ERC20 titles here show the raw amount"""
+    auction_dict = auction_payload(auction, bid_count)
+
+    if auction.amount == "0":  # ERC721
+        apply_nft_metadata(auction_dict, auction, nft_metadata)
+    else:  # ERC20
+        if token_metadata:
+            auction_dict["imageUrl"] = "http://placehold.it/350x50"
+            auction_dict["title"] = f"{token_metadata.name} ({token_metadata.symbol})"
+            auction_dict["description"] = f"{auction.amount} {token_metadata.symbol} tokens"
+        else:
+            auction_dict["imageUrl"] = f"https://via.placeholder.com/128x128?text=Token"
+            auction_dict["title"] = "Unknown Token"
+            auction_dict["description"] = f"{auction.amount} tokens"
+
+    apply_payment_token(auction_dict, payment_token)
+    return auction_dict
+
+
+def load_auction_details(db, auctions, build=auction_detail_dict, archived=False, fields=None):
+    """Enrich many auctions with a fixed number of queries instead of several per auction.
+
+    Set `archived` when some auctions may come from the archive, to count their bids there.
+    With `fields` (from parse_fields) only those keys are returned, and lookups
+    that none of them needs are skipped.
+    """
+    if not auctions:
+        return []
+
+    wanted = set(fields or FIELD_COLUMNS)
+    describe = bool(wanted & DESCRIPTION_FIELDS)
+    bid_counts = {}
+    if "bidCount" in wanted:
+        keys = {(a.chain_id, a.auction_address) for a in auctions}
+        for bid in (Bid, ArchivedBid) if archived else (Bid,):
+            # An auction's bids are all in the same tier as the auction
+            bid_counts.update(
+                ((chain_id, auction_address), count)
+                for chain_id, auction_address, count in db.query(
+                    bid.chain_id, bid.auction_address, func.count(bid.id)
+                )
+                .filter(tuple_(bid.chain_id, bid.auction_address).in_(keys - set(bid_counts)))
+                .group_by(bid.chain_id, bid.auction_address)
+            )
+
+    nft_keys = {(a.chain_id, a.asset_address, a.asset_id) for a in auctions if a.amount == "0"} if describe else set()
+    nfts = {}
+    if nft_keys:
+        rows = (
+            db.query(
+                NFTMetadata.chain_id,
+                NFTMetadata.asset_address,
+                NFTMetadata.asset_id,
+                NFTMetadata.image_url,
+                NFTMetadata.name,
+                NFTMetadata.description,
+            )
+            .filter(tuple_(NFTMetadata.chain_id, NFTMetadata.asset_address, NFTMetadata.asset_id).in_(nft_keys))
+            .order_by(NFTMetadata.id)
+            .all()
+        )
+        for row in rows:
+            # Keep the first row per asset, matching .first() on a single lookup
+            nfts.setdefault((row.chain_id, row.asset_address, row.asset_id), row)
+
+    token_keys = {(a.chain_id, a.payment_token) for a in auctions} if wanted & CURRENCY_FIELDS else set()
+    if describe:
+        token_keys.update((a.chain_id, a.asset_address) for a in auctions if a.amount != "0")
+    tokens = {} if not token_keys else {
+        (row.chain_id, row.token_address): row
+        for row in db.query(
+            TokenMetadata.chain_id,
+            TokenMetadata.token_address,
+            TokenMetadata.symbol,
+            TokenMetadata.name,
+            TokenMetadata.image_url,
+            TokenMetadata.decimals,
+        )
+        .filter(tuple_(TokenMetadata.chain_id, TokenMetadata.token_address).in_(token_keys))
+        .all()
+    }
+
+    # Precomputed by the listener (see reputation.py)
+    seller_scores = {}
+    if "sellerScore" in wanted:
+        seller_scores = dict(
+            db.query(Reputation.address, Reputation.seller_score).filter(
+                Reputation.address.in_({a.seller for a in auctions})
+            )
+        )
+
+    if fields is None:
+        items = [
+            build(
+                auction,
+                bid_counts.get((auction.chain_id, auction.auction_address), 0),
+                nfts.get((auction.chain_id, auction.asset_address, auction.asset_id)),
+                tokens.get((auction.chain_id, auction.asset_address)),
+                tokens.get((auction.chain_id, auction.payment_token)),
+            )
+            for auction in auctions
+        ]
+        for auction, item in zip(auctions, items):
+            item["sellerScore"] = seller_scores.get(auction.seller)
+        return items
+
+    items = []
+    for auction in auctions:
+        bid_count = bid_counts.get((auction.chain_id, auction.auction_address), 0)
+        payment_token = tokens.get((auction.chain_id, auction.payment_token))
+        if describe:
+            nft_metadata = nfts.get((auction.chain_id, auction.asset_address, auction.asset_id))
+            asset_token = tokens.get((auction.chain_id, auction.asset_address))
+            item = build(auction, bid_count, nft_metadata, asset_token, payment_token)
+        else:
+            # The description columns weren't selected, so skip the builder that reads them
+            item = auction_payload(auction, bid_count)
+            apply_payment_token(item, payment_token)
+        item["sellerScore"] = seller_scores.get(auction.seller)
+        items.append({name: item[name] for name in fields})
+    return items
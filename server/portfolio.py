@@ -0,0 +1,200 @@
+"""Per-wallet portfolio: the auctions an address sells and the ones it bid on.
+
+There is one participation row per (address, chain, auction, role). A seller's row
+carries the auction's status; a bidder's row is 'leading' or 'outbid' while
+the auction runs and 'won' or 'lost' once it ends, plus the bidder's bid
+count and latest bid. The listener updates the rows in the transaction that
+stores an auction, a bid or a status change, so a profile page is one
+indexed range read. Rows stay in place when auctions move to the archive.
+"""
+from sqlalchemy import func, tuple_
+
+from archive import all_auctions, all_bids
+from db_models import ArchivedAuction, Auction, Participation
+from payloads import auction_columns, auction_list_dict, load_auction_details
+
+STATES = {
+    "seller": ("active", "ended"),
+    "bidder": ("leading", "outbid", "won", "lost"),
+}
+
+
+def bidder_state(status, highest_bidder, address):
+    if status == "ended":
+        return "won" if address == highest_bidder else "lost"
+    return "leading" if address == highest_bidder else "outbid"
+
+
+def record_seller(db, auction):
+    """Add the seller's row for a new auction inside the caller's transaction"""
+    db.add(
+        Participation(
+            address=auction.seller,
+            auction_address=auction.auction_address,
+            chain_id=auction.chain_id,
+            role="seller",
+            state=auction.status,
+            bid_count=0,
+        )
+    )
+
+
+def record_bidder(db, auction, bid):
+    """Count a stored bid towards its bidder and re-rank the auction's bidders, inside the caller's transaction.
+
+    Returns the bidder's row.
+    """
+    key = {
+        "address": bid.bidder,
+        "auction_address": auction.auction_address,
+        "chain_id": auction.chain_id,
+        "role": "bidder",
+    }
+    row = db.query(Participation).filter_by(**key).first()
+    if row is None:
+        row = Participation(**key, bid_count=0)
+        db.add(row)
+        # Sessions don't autoflush; make the row visible to the next lookup
+        db.flush()
+    row.bid_count = (row.bid_count or 0) + 1
+    row.last_bid = bid.amount
+    row.last_bid_block = bid.block_number
+    refresh_participants(db, auction)
+    return row
+
+
+def refresh_participants(db, auction):
+    """Bring an auction's rows in line with its status and highest bidder"""
+    for row in db.query(Participation).filter_by(
+        chain_id=auction.chain_id, auction_address=auction.auction_address
+    ):
+        if row.role == "seller":
+            row.state = auction.status
+        else:
+            row.state = bidder_state(auction.status, auction.highest_bidder, row.address)
+
+
+def rebuild_portfolio(db):
+    """Recompute every participation row from the auctions and bids tables"""
+    db.query(Participation).delete()
+    # Portfolios cover archived auctions too
+    auctions, bids = all_auctions(), all_bids()
+
+    status = {}
+    rows = []  # (block first seen, order within the block, mapping)
+    for chain_id, auction_address, seller, auction_status, highest_bidder, created_at in db.query(
+        auctions.chain_id,
+        auctions.auction_address,
+        auctions.seller,
+        auctions.status,
+        auctions.highest_bidder,
+        auctions.created_at,
+    ).yield_per(10_000):
+        status[(chain_id, auction_address)] = (auction_status, highest_bidder)
+        rows.append(
+            (
+                created_at or 0,
+                -1,
+                {
+                    "address": seller,
+                    "auction_address": auction_address,
+                    "chain_id": chain_id,
+                    "role": "seller",
+                    "state": auction_status,
+                    "bid_count": 0,
+                },
+            )
+        )
+
+    bidders = {}
+    for chain_id, auction_address, bidder, amount, block_number, log_index in (
+        db.query(bids.chain_id, bids.auction_address, bids.bidder, bids.amount, bids.block_number, bids.log_index)
+        .order_by(bids.block_number, bids.log_index)
+        .yield_per(10_000)
+    ):
+        row = bidders.get((bidder, chain_id, auction_address))
+        if row is None:
+            auction_status, highest_bidder = status[(chain_id, auction_address)]
+            row = bidders[(bidder, chain_id, auction_address)] = {
+                "address": bidder,
+                "auction_address": auction_address,
+                "chain_id": chain_id,
+                "role": "bidder",
+                "state": bidder_state(auction_status, highest_bidder, bidder),
+                "bid_count": 0,
+            }
+            # Bids stored before log indexes were recorded have none
+            rows.append((block_number or 0, log_index if log_index is not None else 0, row))
+        row["bid_count"] += 1
+        row["last_bid"] = amount
+        row["last_bid_block"] = block_number
+
+    # Insert in roughly the order the listener would have, since ids order the pages
+    rows.sort(key=lambda row: row[:2])
+    db.bulk_insert_mappings(Participation, [mapping for _, _, mapping in rows])
+    db.commit()
+
+
+def ensure_portfolio(db):
+    """Populate participations for databases created before the table existed"""
+    if db.query(Participation.id).first() is None and (
+        db.query(Auction.id).first() is not None or db.query(ArchivedAuction.id).first() is not None
+    ):
+        rebuild_portfolio(db)
+
+
+def portfolio_counts(db, address):
+    """Row counts per role and state for one address"""
+    counts = {role: {state: 0 for state in states} for role, states in STATES.items()}
+    for role, state, count in (
+        db.query(Participation.role, Participation.state, func.count(Participation.id))
+        .filter(Participation.address == address)
+        .group_by(Participation.role, Participation.state)
+    ):
+        counts[role][state] = count
+    return counts
+
+
+def portfolio_page(db, address, role=None, state=None, cursor=None, limit=20):
+    """One page of an address's participations, newest first; returns (items, next cursor)"""
+    query = db.query(Participation).filter(Participation.address == address)
+    if role:
+        query = query.filter(Participation.role == role)
+    if state:
+        query = query.filter(Participation.state == state)
+    if cursor is not None:
+        query = query.filter(Participation.id < cursor)
+    rows = query.order_by(Participation.id.desc()).limit(limit + 1).all()
+    next_cursor = rows[limit - 1].id if len(rows) > limit else None
+    rows = rows[:limit]
+
+    # Auctions come from whichever tier holds them
+    by_key = {}
+    for auctions, archived in ((Auction, False), (ArchivedAuction, True)):
+        wanted = {(row.chain_id, row.auction_address) for row in rows} - set(by_key)
+        found = (
+            db.query(*auction_columns(auctions))
+            .filter(tuple_(auctions.chain_id, auctions.auction_address).in_(wanted))
+            .all()
+            if wanted
+            else []
+        )
+        by_key.update(
+            ((auction.chain_id, auction.auction_address), auction_dict)
+            for auction, auction_dict in zip(
+                found, load_auction_details(db, found, auction_list_dict, archived)
+            )
+        )
+
+    items = [
+        {
+            "role": row.role,
+            "state": row.state,
+            "bidCount": row.bid_count,
+            "lastBid": row.last_bid,
+            "lastBidBlock": row.last_bid_block,
+            "auction": by_key.get((row.chain_id, row.auction_address)),
+        }
+        for row in rows
+    ]
+    return items, next_cursor
@@ -0,0 +1,155 @@
+import logging
+import os
+import sys
+import threading
+import time
+from collections import Counter
+from contextvars import ContextVar
+from sqlalchemy import event
+
+from config import (
+    SLOW_QUERY_MS,
+    SLOW_REQUEST_MS,
+    QUERY_COUNT_WARN,
+    PROFILE_SIGNAL_SECONDS,
+)
+from metrics import current_endpoint
+
+logger = logging.getLogger(__name__)
+
+# Per-request query statistics, only populated when request tracking is enabled
+request_stats = ContextVar("request_stats", default=None)
+
+MAX_PROFILE_SECONDS = 120
+
+
+class RequestStats:
+    __slots__ = ("queries", "query_seconds")
+
+    def __init__(self):
+        self.queries = 0
+        self.query_seconds = 0.0
+
+
+def request_tracking_enabled():
+    return QUERY_COUNT_WARN > 0 or SLOW_REQUEST_MS > 0
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault("trace_start_time", []).append(time.perf_counter())
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    elapsed = time.perf_counter() - conn.info["trace_start_time"].pop()
+
+    stats = request_stats.get()
+    if stats is not None:
+        stats.queries += 1
+        stats.query_seconds += elapsed
+
+    if SLOW_QUERY_MS > 0 and elapsed * 1000 >= SLOW_QUERY_MS:
+        logger.warning(
+            f"Slow query ({elapsed * 1000:.1f} ms) from {current_endpoint.get()}: "
+            f"{' '.join(statement.split())[:500]}"
+        )
+
+
+def _handle_error(exception_context):
+    conn = exception_context.connection
+    if conn is not None and conn.info.get("trace_start_time"):
+        conn.info["trace_start_time"].pop()
+
+
+def install_query_tracing(engine):
+    """Attach slow-query/query-count hooks to the engine when tracing is enabled.
+
+    Nothing is registered when all thresholds are off, so the disabled path
+    costs nothing per statement.
+    """
+    if SLOW_QUERY_MS <= 0 and not request_tracking_enabled():
+        return
+    event.listen(engine, "before_cursor_execute", _before_cursor_execute)
+    event.listen(engine, "after_cursor_execute", _after_cursor_execute)
+    event.listen(engine, "handle_error", _handle_error)
+
+
+def begin_request():
+    """Start collecting query statistics for the current request"""
+    if not request_tracking_enabled():
+        return None
+    stats = RequestStats()
+    return stats, request_stats.set(stats)
+
+
+def finish_request(tracking, method, endpoint, elapsed, response=None):
+    """Report slow requests and query-count (N+1) regressions for a finished request"""
+    if tracking is None:
+        return
+    stats, token = tracking
+    request_stats.reset(token)
+
+    if response is not None:
+        response.headers["X-Query-Count"] = str(stats.queries)
+
+    if QUERY_COUNT_WARN > 0 and stats.queries > QUERY_COUNT_WARN:
+        logger.warning(
+            f"{method} {endpoint} issued {stats.queries} queries "
+            f"(threshold {QUERY_COUNT_WARN}); possible N+1"
+        )
+    if SLOW_REQUEST_MS > 0 and elapsed * 1000 >= SLOW_REQUEST_MS:
+        logger.warning(
+            f"Slow request {method} {endpoint}: {elapsed * 1000:.1f} ms, "
+            f"{stats.queries} queries taking {stats.query_seconds * 1000:.1f} ms"
+        )
+
+
+def _frame_stack(frame):
+    stack = []
+    while frame is not None:
+        code = frame.f_code
+        module = os.path.splitext(os.path.basename(code.co_filename))[0]
+        stack.append(f"{module}:{code.co_name}:{frame.f_lineno}")
+        frame = frame.f_back
+    stack.reverse()
+    return stack
+
+
+def sample_stacks(seconds, interval=0.005):
+    """Sample every thread's stack for `seconds` and return folded stacks.
+
+    The output is the collapsed format understood by flamegraph.pl and
+    speedscope: one `thread;frame;frame... count` line per distinct stack.
+    """
+    seconds = min(max(seconds, 0.1), MAX_PROFILE_SECONDS)
+    own_ident = threading.get_ident()
+    names = {t.ident: t.name for t in threading.enumerate()}
+    samples = Counter()
+
+    deadline = time.monotonic() + seconds
+    while time.monotonic() < deadline:
+        for ident, frame in sys._current_frames().items():
+            if ident == own_ident:
+                continue
+            thread_name = names.get(ident)
+            if thread_name is None:
+                names = {t.ident: t.name for t in threading.enumerate()}
+                thread_name = names.get(ident, str(ident))
+            stack = [thread_name.replace(" ", "_")] + _frame_stack(frame)
+            samples[";".join(stack)] += 1
+        time.sleep(interval)
+
+    return "".join(f"{stack} {count}\n" for stack, count in samples.most_common())
+
+
+def _profile_to_file(seconds):
+    path = f"profile-{os.getpid()}-{int(time.time())}.folded"
+    with open(path, "w") as f:
+        f.write(sample_stacks(seconds))
+    logger.info(f"Wrote {seconds}s sampling profile to {path}")
+
+
+def handle_profile_signal(sig, frame):
+    """Signal handler that dumps a folded-stack profile in a background thread"""
+    threading.Thread(
+        target=_profile_to_file, args=(PROFILE_SIGNAL_SECONDS,), daemon=True
+    ).start()
@@ -0,0 +1,208 @@
+"""In-memory read model of active auctions.
+
+The listener's session reports every commit that touches auctions, bids or
+metadata; the affected auctions are re-read and their /auctions list items
+re-encoded, so `GET /auctions?status=active` is answered from presorted
+arrays without a database round trip. Only a process running the listener
+loads the model; everywhere else `ready` stays False and the API queries
+the database as before.
+"""
+import itertools
+import logging
+import threading
+
+import orjson
+from sqlalchemy import event, tuple_
+
+from db_models import Auction, Bid, NFTMetadata, Reputation, SessionLocal, TokenMetadata
+from metrics import READ_MODEL_ENTRIES
+from payloads import AUCTION_COLUMNS, auction_list_dict, load_auction_details
+
+logger = logging.getLogger(__name__)
+
+# sort_by values GET /auctions understands; anything else leaves table order
+SORT_KEYS = {
+    "endTime": lambda entry: entry.end_time,
+    "highestBid": lambda entry: entry.highest_bid,
+    "created": lambda entry: entry.created_at,
+}
+
+_PENDING = "read_model_pending"
+
+
+def _nulls_first(key):
+    # SQL puts NULL before any value in ascending order and after it in descending
+    return lambda entry: (key(entry) is not None, key(entry))
+
+
+class ActiveAuction:
+    """One active auction with its /auctions list item already encoded"""
+
+    __slots__ = (
+        "id",
+        "auction_address",
+        "auction_type",
+        "seller",
+        "end_time",
+        "highest_bid",
+        "created_at",
+        "asset_address",
+        "asset_id",
+        "payment_token",
+        "chain_id",
+        "payload",
+        "body",
+    )
+
+    def __init__(self, row, payload):
+        self.id = row.id
+        self.auction_address = row.auction_address
+        self.auction_type = row.auction_type
+        self.seller = row.seller
+        self.end_time = row.end_time
+        self.highest_bid = row.highest_bid
+        self.created_at = row.created_at
+        self.asset_address = row.asset_address
+        self.asset_id = row.asset_id
+        self.payment_token = row.payment_token
+        self.chain_id = row.chain_id
+        self.payload = payload  # For sparse fieldsets
+        self.body = orjson.dumps(payload)
+
+
+class _Snapshot:
+    """Immutable set of entries plus one ascending and one descending order per sort key.
+
+    Ties keep primary key order in both directions, as SQLite's sorter does.
+    """
+
+    __slots__ = ("entries", "orders")
+
+    def __init__(self, entries):
+        self.entries = entries
+        by_id = sorted(entries.values(), key=lambda entry: entry.id)
+        self.orders = {None: (by_id, by_id)}
+        for name, key in SORT_KEYS.items():
+            key = _nulls_first(key)
+            self.orders[name] = (sorted(by_id, key=key), sorted(by_id, key=key, reverse=True))
+
+
+class ActiveAuctionView:
+    def __init__(self):
+        self._snapshot = None
+        self._lock = threading.Lock()
+
+    @property
+    def ready(self):
+        return self._snapshot is not None
+
+    def _publish(self, entries):
+        # Readers pick up whole snapshots, so a swap is all the synchronisation they need
+        self._snapshot = _Snapshot(entries) if entries is not None else None
+        READ_MODEL_ENTRIES.set(len(entries) if entries is not None else 0)
+
+    def _read(self, db, condition):
+        rows = db.query(Auction.id, Auction.created_at, *AUCTION_COLUMNS).filter(condition).all()
+        active = [row for row in rows if row.status == "active"]
+        payloads = load_auction_details(db, active, auction_list_dict)
+        return {(row.chain_id, row.auction_address): ActiveAuction(row, p) for row, p in zip(active, payloads)}
+
+    def load(self):
+        """Read every active auction from the database"""
+        with self._lock:
+            db = SessionLocal()
+            try:
+                self._publish(self._read(db, Auction.status == "active"))
+            finally:
+                db.close()
+        logger.info(f"Read model loaded {len(self._snapshot.entries)} active auctions")
+
+    def refresh(self, keys):
+        """Re-read the given (chain id, auction address) auctions, dropping any that are no longer active"""
+        if not keys:
+            return
+        with self._lock:
+            if self._snapshot is None:
+                return
+            db = SessionLocal()
+            try:
+                updated = self._read(db, tuple_(Auction.chain_id, Auction.auction_address).in_(keys))
+            finally:
+                db.close()
+            entries = dict(self._snapshot.entries)
+            for key in keys:
+                entries.pop(key, None)
+            entries.update(updated)
+            self._publish(entries)
+
+    def selling(self, sellers):
+        """Keys of active auctions whose payload embeds any of these sellers' scores"""
+        return {key for key, entry in self._snapshot.entries.items() if entry.seller in sellers}
+
+    def showing_metadata(self, asset_keys, token_keys):
+        """Keys of active auctions whose payload embeds any of this metadata"""
+        return {
+            key
+            for key, entry in self._snapshot.entries.items()
+            if (entry.chain_id, entry.asset_address, entry.asset_id) in asset_keys
+            or (entry.chain_id, entry.asset_address) in token_keys
+            or (entry.chain_id, entry.payment_token) in token_keys
+        }
+
+    def page_json(self, sort_by, sort_desc, auction_type, seller, offset, limit, fields=None, chain=None):
+        """Encoded /auctions?status=active response, same order and window as the SQL query"""
+        snapshot = self._snapshot
+        ascending, descending = snapshot.orders.get(sort_by, snapshot.orders[None])
+        entries = descending if sort_desc else ascending
+        if auction_type is not None:
+            entries = (e for e in entries if e.auction_type == auction_type)
+        if chain is not None:
+            entries = (e for e in entries if e.chain_id == chain)
+        if seller:
+            needle = seller.lower()
+            entries = (e for e in entries if e.seller and needle in e.seller.lower())
+        window = itertools.islice(entries, offset, offset + limit)
+        if fields:
+            return orjson.dumps([{name: entry.payload[name] for name in fields} for entry in window])
+        return b"[" + b",".join(entry.body for entry in window) + b"]"
+
+    def track(self, session):
+        """Refresh the model from whatever `session` commits"""
+        event.listen(session, "after_flush", self._collect)
+        event.listen(session, "after_commit", self._apply)
+        event.listen(session, "after_rollback", self._discard)
+
+    def _collect(self, session, flush_context):
+        auctions, asset_keys, tokens, sellers = session.info.setdefault(_PENDING, (set(), set(), set(), set()))
+        for obj in itertools.chain(session.new, session.dirty):
+            if isinstance(obj, (Auction, Bid)):
+                auctions.add((obj.chain_id, obj.auction_address))
+            elif isinstance(obj, NFTMetadata):
+                asset_keys.add((obj.chain_id, obj.asset_address, obj.asset_id))
+            elif isinstance(obj, TokenMetadata):
+                tokens.add((obj.chain_id, obj.token_address))
+            elif isinstance(obj, Reputation):
+                sellers.add(obj.address)
+
+    def _discard(self, session):
+        session.info.pop(_PENDING, None)
+
+    def _apply(self, session):
+        pending = session.info.pop(_PENDING, None)
+        if pending is None or not self.ready:
+            return
+        auctions, asset_keys, tokens, sellers = pending
+        try:
+            if asset_keys or tokens:
+                auctions |= self.showing_metadata(asset_keys, tokens)
+            if sellers:
+                auctions |= self.selling(sellers)
+            self.refresh(auctions)
+        except Exception as e:
+            # Serve from the database until the listener reloads the model
+            logger.error(f"Error refreshing read model, disabling it: {e}")
+            with self._lock:
+                self._publish(None)
+
+
+active_auctions = ActiveAuctionView()
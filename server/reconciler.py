@@ -0,0 +1,229 @@
+"""Background re-checks of stored auctions against the chain.
+
+The listener only re-reads an auction's contract when the auction expires,
+so a bid lost to an RPC error would stay missing. Each listener cycle the
+reconciler takes the next bucket of its chain's auctions, walking the
+active and the ended ones in id order and wrapping around, and compares
+getAuctionDetails, batched through Multicall3 and read at the block the
+listener has processed, with the stored rows. The buckets are sized by
+RECONCILE_CALLS_PER_MINUTE, with RECONCILE_ACTIVE_SHARE of it going to
+active auctions, so they are revisited far more often than ended ones.
+
+When the highest bid differs, the auction's BidPlaced logs since it was
+last updated are fetched again, which stores the missed bids the normal
+way; whatever still differs afterwards is overwritten from the contract.
+Each getLogs chunk is charged to the same budget before it is requested;
+a rescan the budget cannot finish keeps its position and the auction is
+left unrepaired until a later run completes the rescan and checks it
+again. Archived auctions are final and never checked.
+"""
+import logging
+import time
+
+from blockchain_listener import BID_PLACED_TOPIC, status_fields, write_lock
+from config import MAX_LOG_RANGE, RECONCILE_ACTIVE_SHARE, RECONCILE_CALLS_PER_MINUTE
+from db_models import Auction
+from metrics import RECONCILE_CHECKED, RECONCILE_DRIFT
+from multicall import MulticallUnavailable, aggregate
+from portfolio import refresh_participants
+from reputation import record_outcome
+from rollups import refresh_floor
+from stats import record_status_change
+
+logger = logging.getLogger(__name__)
+
+COMPARED_FIELDS = ("highest_bidder", "highest_bid", "end_time", "ended", "status")
+
+
+def contract_state(details, now=None):
+    """The compared columns from a getAuctionDetails result"""
+    ended, end_time = details[4], details[3]
+    return {
+        "highest_bidder": details[1],
+        "highest_bid": str(details[2]),
+        "end_time": end_time,
+        "ended": ended,
+        # As fetch_auction_details derives it
+        "status": "active" if not ended and end_time > (now or time.time()) else "ended",
+    }
+
+
+class DriftReconciler:
+    def __init__(self, listener, calls_per_minute=RECONCILE_CALLS_PER_MINUTE, active_share=RECONCILE_ACTIVE_SHARE):
+        self.listener = listener
+        self.calls_per_minute = calls_per_minute
+        self.active_share = active_share
+        self.allowance = 0.0
+        self.refilled = time.monotonic()
+        self.cursors = {"active": 0, "ended": 0}  # Last Auction.id checked per tier
+        self.rescans = {}  # Auction.id -> first block an unfinished rescan still has to fetch
+
+    def refill(self):
+        now = time.monotonic()
+        # Never bank more than a minute's worth, so a long pause doesn't cause a burst
+        self.allowance = min(
+            self.allowance + (now - self.refilled) * self.calls_per_minute / 60, self.calls_per_minute
+        )
+        self.refilled = now
+
+    def next_bucket(self, tier, size):
+        """The next `size` auctions of a tier after its cursor, wrapping around to the start"""
+        db, chain_id = self.listener.db, self.listener.chain_id
+        bucket = []
+        for wrapped in (False, True):
+            query = db.query(Auction).filter(Auction.chain_id == chain_id, Auction.status == tier)
+            if bucket:
+                query = query.filter(Auction.id.notin_([auction.id for auction in bucket]))
+            rows = (
+                query.filter(Auction.id > self.cursors[tier])
+                .order_by(Auction.id)
+                .limit(size - len(bucket))
+                .all()
+            )
+            bucket.extend(rows)
+            if rows:
+                self.cursors[tier] = rows[-1].id
+            if len(bucket) >= size or wrapped:
+                break
+            self.cursors[tier] = 0
+        return bucket
+
+    def fetch(self, auctions, block):
+        """getAuctionDetails for each auction at `block`, None where the call failed"""
+        w3, abis = self.listener.w3, self.listener.abis
+        calls = [
+            w3.eth.contract(address=auction.auction_address, abi=abis.combined_auction).functions.getAuctionDetails()
+            for auction in auctions
+        ]
+        try:
+            return aggregate(w3, calls, block_identifier=block)
+        except MulticallUnavailable:
+            results = []
+            for call in calls:
+                try:
+                    results.append(call.call(block_identifier=block))
+                except Exception as e:
+                    logger.error(f"Error calling getAuctionDetails on {call.address}: {e}")
+                    results.append(None)
+            return results
+
+    def rescan_bids(self, auction, to_block):
+        """Store BidPlaced logs the listener missed while the allowance lasts; returns whether it reached `to_block`"""
+        from_block = self.rescans.pop(auction.id, None) or auction.updated_block or auction.created_at
+        if not from_block:
+            return True
+        while from_block <= to_block:
+            if self.allowance < 1:
+                self.rescans[auction.id] = from_block
+                return False
+            end = min(from_block + MAX_LOG_RANGE - 1, to_block)
+            self.allowance -= 1
+            logs = self.listener.get_logs_with_retry(
+                {"address": auction.auction_address, "fromBlock": from_block, "toBlock": end, "topics": [BID_PLACED_TOPIC]}
+            )
+            self.listener.process_logs(logs)
+            from_block = end + 1
+        return True
+
+    def resume_rescans(self, block):
+        """Continue the rescans earlier runs ran out of budget for; returns the auctions they finished"""
+        finished = []
+        for auction_id in list(self.rescans):
+            if self.allowance < 1:
+                break
+            auction = self.listener.db.get(Auction, auction_id)
+            if auction is None:
+                # Archived since
+                del self.rescans[auction_id]
+            elif self.rescan_bids(auction, block):
+                finished.append(auction)
+        return finished
+
+    def repair(self, auction, expected, block):
+        """Overwrite the columns that still differ, as update_auction_statuses does"""
+        db = self.listener.db
+        previous_status = auction.status
+        self.listener.journal.details(auction.auction_address, block, expected)
+        # The outcome was counted from the stored fields; count it again from the contract's
+        record_outcome(db, auction, sign=-1)
+        for field, value in status_fields(expected).items():
+            setattr(auction, field, value)
+        record_status_change(db, previous_status, auction.status)
+        record_outcome(db, auction)
+        refresh_participants(db, auction)
+        refresh_floor(db, auction)
+        auction.updated_block = block
+
+    def check(self, tier, auctions, block, rescanned=()):
+        """Compare a bucket with the contract and repair it; returns how many auctions differed
+
+        `rescanned` holds the ids of auctions whose bids were just fetched again.
+        """
+        listener = self.listener
+        self.allowance -= len(auctions)
+        results = self.fetch(auctions, block)
+        now = time.time()
+        drifted, repairs = 0, []
+        for auction, details in zip(auctions, results):
+            if details is None:
+                continue
+            RECONCILE_CHECKED.labels(listener.chain, tier).inc()
+            expected = contract_state(details, now)
+            differing = [field for field in COMPARED_FIELDS if getattr(auction, field) != expected[field]]
+            if not differing:
+                continue
+            drifted += 1
+            for field in differing:
+                RECONCILE_DRIFT.labels(listener.chain, field).inc()
+            logger.warning(f"Auction {auction.auction_id} differs from its contract in {', '.join(differing)}")
+
+            if "highest_bid" in differing and auction.id not in rescanned:
+                if not self.rescan_bids(auction, block):
+                    # Repairing now would hide the missed bids from the rest of the rescan
+                    continue
+                listener.db.refresh(auction)
+            if any(getattr(auction, field) != expected[field] for field in COMPARED_FIELDS):
+                repairs.append((auction, expected))
+
+        # Only the writes hold the lock; the calls above were made without it
+        with write_lock:
+            for auction, expected in repairs:
+                self.repair(auction, expected, block)
+            listener.db.commit()
+        listener.journal.flush()
+        return drifted
+
+    def run(self):
+        """Check as many auctions as the budget allows; returns how many differed"""
+        self.refill()
+        block = self.listener.last_block_processed
+        if self.allowance < 1 or block is None:
+            return 0
+
+        # Finished rescans are checked again first, from what's left
+        rescanned = self.resume_rescans(block)
+        budget = int(self.allowance) - len(rescanned)
+        active_budget = max(round(budget * self.active_share), 1) if budget > 0 else 0
+        buckets = {"active": self.next_bucket("active", active_budget) if active_budget else []}
+        # Whatever one tier doesn't use goes to the other
+        buckets["ended"] = self.next_bucket("ended", budget - len(buckets["active"])) if budget > 0 else []
+        leftover = budget - len(buckets["active"]) - len(buckets["ended"])
+        if leftover > 0 and len(buckets["active"]) == active_budget:
+            checked = {auction.id for auction in buckets["active"]}
+            buckets["active"] += [
+                auction for auction in self.next_bucket("active", leftover) if auction.id not in checked
+            ]
+        rescanned_ids = {auction.id for auction in rescanned}
+        for auction in rescanned:
+            bucket = buckets.setdefault(auction.status, [])
+            if auction.id not in {queued.id for queued in bucket}:
+                bucket.insert(0, auction)
+
+        drifted = 0
+        for tier, auctions in buckets.items():
+            if not auctions:
+                continue
+            drifted += self.check(tier, auctions, block, rescanned_ids)
+        if drifted:
+            logger.info(f"Reconciled {drifted} auctions on chain {self.listener.chain_id} at block {block}")
+        return drifted
@@ -0,0 +1,225 @@
+"""Rebuild auctions and bids from the chain data journal, without the network.
+
+Journal records (see log_archive.py) are grouped by auction address and each
+group is folded into its auction row and bid rows by worker processes, using
+the same column mappings as the listener. The rows then replace the auction,
+bid and archive tables, auctions that ended long ago are archived again, and
+every derived table is rebuilt. Each ingest source's cursor is set to its
+journal's last checkpoint so the listener resumes from there. Run it with
+the listener stopped.
+"""
+import logging
+import os
+from collections import defaultdict
+from concurrent.futures import ProcessPoolExecutor
+
+from hexbytes import HexBytes
+from web3 import Web3
+
+from archive import archive_ended_auctions
+from blockchain_listener import (
+    AUCTION_CREATED_TOPIC,
+    BID_PLACED_TOPIC,
+    details_fields,
+    dutch_fields,
+    load_abis,
+    status_fields,
+)
+from config import LOG_ARCHIVE_DIR
+from db_models import ArchivedAuction, ArchivedBid, Auction, Bid, SessionLocal
+from derived import prepare_database, rebuild_derived_tables
+from ingest_cursor import save_cursor
+from log_archive import read_journal
+from sources import cursor_name, ingest_sources, journal_directory, primary_source
+
+logger = logging.getLogger(__name__)
+
+INSERT_BATCH_SIZE = 10_000
+
+
+def _event_decoders():
+    # Decoding needs only the ABIs; the contracts are never called
+    w3 = Web3()
+    abis = load_abis()
+    created = w3.eth.contract(abi=abis.factory).events.AuctionCreated()
+    bid_placed = w3.eth.contract(abi=abis.auction).events.BidPlaced()
+    return created, bid_placed
+
+
+def _log(record):
+    """A journal log record in the shape web3 returns logs in"""
+    _, block, block_hash, tx_hash, log_index, address, topics, data = record[:8]
+    return {
+        "address": address,
+        "topics": [HexBytes(topic) for topic in topics],
+        "data": HexBytes(data),
+        "blockNumber": block,
+        "blockHash": HexBytes(block_hash) if block_hash else None,
+        "transactionHash": HexBytes(tx_hash),
+        "transactionIndex": 0,
+        "logIndex": log_index,
+    }
+
+
+def _partition(records, factory):
+    """Group records by the auction they concern; returns (groups, last checkpoint)"""
+    created, _ = _event_decoders()
+    factory_address = Web3.to_checksum_address(factory)
+    groups = defaultdict(list)
+    timestamps = {}
+    checkpoint = None
+    for record in records:
+        kind = record[0]
+        if kind == "log":
+            topics, address = record[6], record[5]
+            if topics and topics[0] == AUCTION_CREATED_TOPIC and address == factory_address:
+                groups[created.process_log(_log(record))["args"]["auctionAddress"]].append(record)
+            elif topics and topics[0] == BID_PLACED_TOPIC:
+                groups[address].append(record)
+        elif kind == "block":
+            timestamps[record[1]] = record[2]
+        elif kind == "details":
+            groups[record[1]].append(record)
+        elif kind == "synced":
+            groups[record[2]].append(record)
+        elif kind == "checkpoint":
+            checkpoint = record
+        elif kind == "rewind":
+            # The listener deleted the bids it had stored from later blocks
+            for address, group in groups.items():
+                groups[address] = [
+                    r for r in group if not (r[0] == "log" and r[6][0] == BID_PLACED_TOPIC and r[1] > record[1])
+                ]
+
+    # A bid's timestamp is journaled after the bid, when the listener looked it up
+    for group in groups.values():
+        for i, record in enumerate(group):
+            if record[0] == "log" and record[6][0] == BID_PLACED_TOPIC:
+                group[i] = record + [timestamps.get(record[1])]
+    return groups, checkpoint
+
+
+def _fold(source, address, records, created, bid_placed):
+    """Apply one auction's records in journal order, as the listener did; returns (auction, bids)"""
+    auction, bids, seen, creating = None, [], set(), None
+    for record in records:
+        kind = record[0]
+        if kind == "log" and record[6][0] == AUCTION_CREATED_TOPIC:
+            if auction is None:
+                creating = created.process_log(_log(record))
+        elif kind == "log":
+            # Bids on auctions the listener didn't know yet were skipped, and so are repeats
+            key = (record[3], record[4])
+            if auction is None or key in seen:
+                continue
+            seen.add(key)
+            event = bid_placed.process_log(_log(record))
+            bid = {
+                "auction_address": address,
+                "chain_id": source.chain_id,
+                "bidder": event["args"]["bidder"],
+                "amount": str(event["args"]["amount"]),
+                "block_number": record[1],
+                "timestamp": record[8],
+                "tx_hash": record[3],
+                "log_index": record[4],
+            }
+            bids.append(bid)
+            auction.update(highest_bidder=bid["bidder"], highest_bid=bid["amount"], updated_block=bid["block_number"])
+        elif kind == "details" and creating is not None:
+            _, _, block, details = record
+            if details:
+                args = creating["args"]
+                auction = {
+                    "auction_id": str(args["auctionId"]),
+                    "auction_address": address,
+                    "chain_id": source.chain_id,
+                    "auction_type": args["auctionType"],
+                    "seller": (args["seller"] if len(args) > 3 else None) or details["seller"],
+                    "created_at": creating["blockNumber"],
+                    "updated_block": creating["blockNumber"],
+                    **details_fields(details),
+                    **dutch_fields(details),
+                }
+            creating = None
+        elif kind == "details" and auction is not None:
+            _, _, block, details = record
+            auction.update(status_fields(details))
+            if block is not None:
+                auction["updated_block"] = block
+        elif kind == "synced" and auction is None:
+            _, auction_id, _, block, details = record
+            auction = {
+                "auction_id": auction_id,
+                "auction_address": address,
+                "chain_id": source.chain_id,
+                "auction_type": details["auction_type"],
+                "seller": details["seller"],
+                "created_at": 0,
+                "updated_block": block,
+                **details_fields(details),
+            }
+    return auction, bids if auction else []
+
+
+def _replay_groups(groups):
+    created, bid_placed = _event_decoders()
+    return [_fold(source, address, records, created, bid_placed) for source, address, records in groups]
+
+
+def _auction_order(auction, primary_chain):
+    # Primary-source auctions first, then each extra chain's, in factory order
+    number = auction["auction_id"]
+    if not number.isdigit():
+        return (2, 0, 0, number)
+    chain = auction["chain_id"]
+    return (0 if chain == primary_chain else 1, chain, int(number), "")
+
+
+def replay(directory=LOG_ARCHIVE_DIR, workers=None):
+    """Replace auctions and bids with the journal's history; returns a summary"""
+    prepare_database()
+    items, checkpoints = [], []
+    for source in ingest_sources():
+        groups, checkpoint = _partition(read_journal(journal_directory(source, directory)), source.factory)
+        items.extend((source, address, records) for address, records in groups.items())
+        if checkpoint:
+            checkpoints.append((source, checkpoint))
+
+    workers = workers or os.cpu_count() or 1
+    chunks = [items[i :: workers * 4] for i in range(workers * 4)]
+    with ProcessPoolExecutor(workers) as pool:
+        results = [result for chunk in pool.map(_replay_groups, chunks) for result in chunk]
+
+    primary_chain = primary_source().chain_id
+    auctions = sorted(
+        (auction for auction, _ in results if auction), key=lambda auction: _auction_order(auction, primary_chain)
+    )
+    bids = sorted(
+        (bid for _, auction_bids in results for bid in auction_bids),
+        key=lambda bid: (bid["block_number"], bid["log_index"]),
+    )
+
+    db = SessionLocal()
+    try:
+        for model in (Bid, Auction, ArchivedBid, ArchivedAuction):
+            db.query(model).delete()
+        for rows, model in ((auctions, Auction), (bids, Bid)):
+            for start in range(0, len(rows), INSERT_BATCH_SIZE):
+                db.bulk_insert_mappings(model, rows[start : start + INSERT_BATCH_SIZE])
+        for source, checkpoint in checkpoints:
+            save_cursor(db, checkpoint[1], checkpoint[2], cursor_name(source))
+        db.commit()
+
+        archived = archive_ended_auctions(db)
+        rebuild_derived_tables(db)
+    finally:
+        db.close()
+
+    logger.info(f"Replayed {len(auctions)} auctions and {len(bids)} bids from {directory}")
+    return {
+        "auctions": len(auctions),
+        "bids": len(bids),
+        "archived": archived,
+        "cursors": {source.chain_id: checkpoint[1] for source, checkpoint in checkpoints},
+    }
@@ -0,0 +1,243 @@
+"""Seller and bidder reputation per wallet.
+
+Each address has one row counting the auctions it created, how many of
+those closed and how many sold, the bids it placed, the auctions it bid
+on, how many of those closed and how many it won. An auction counts as
+closed only once its contract reports it ended, i.e. it was settled;
+auctions past their end time that nobody settled yet are counted apart,
+as expired, and don't affect scores. Scores are Laplace-smoothed rates
+out of 100, so an address without history scores 50 and a few outcomes
+move it less than many: the seller score is the share of closed auctions
+that sold, the bidder score the share of closed auctions bid on that were
+won (the highest bidder wins). The listener updates rows in the
+transaction that stores an auction, a bid or a status change;
+`verify_reputation` recomputes every row and repairs any that drifted.
+"""
+import logging
+from collections import defaultdict
+
+from sqlalchemy import func
+
+from archive import all_auctions, all_bids
+from db_models import ArchivedAuction, Auction, Participation, Reputation
+from metrics import REPUTATION_DRIFT
+
+logger = logging.getLogger(__name__)
+
+COUNTERS = (
+    "auctions_created",
+    "auctions_closed",
+    "auctions_expired",
+    "auctions_sold",
+    "bids_placed",
+    "auctions_bid",
+    "auctions_bid_closed",
+    "auctions_won",
+)
+
+
+def _score(successes, trials):
+    return round(100 * (successes + 1) / (trials + 2))
+
+
+def _rescore(row):
+    row.seller_score = _score(row.auctions_sold or 0, row.auctions_closed or 0)
+    row.bidder_score = _score(row.auctions_won or 0, row.auctions_bid_closed or 0)
+
+
+def _bump(db, address, **counts):
+    """Adjust one address's counters inside the caller's transaction"""
+    row = db.query(Reputation).filter_by(address=address).first()
+    if row is None:
+        row = Reputation(address=address, **{name: 0 for name in COUNTERS})
+        db.add(row)
+        # Sessions don't autoflush; make the row visible to the next lookup
+        db.flush()
+    for name, count in counts.items():
+        setattr(row, name, (getattr(row, name) or 0) + count)
+    _rescore(row)
+
+
+def _sold(highest_bid):
+    return bool(highest_bid) and int(highest_bid) > 0
+
+
+def _outcome(auction):
+    """'closed' once the contract reports the auction ended, 'expired' when only its end time has passed"""
+    if auction.ended:
+        return "closed"
+    if auction.status == "ended":
+        return "expired"
+    return None
+
+
+def record_listing(db, auction):
+    """Count a newly stored auction towards its seller"""
+    _bump(db, auction.seller, auctions_created=1)
+    # Sync can store auctions that have already ended
+    record_outcome(db, auction)
+
+
+def _bid_on(db, address, auction):
+    return (
+        db.query(Participation.id)
+        .filter_by(address=address, chain_id=auction.chain_id, auction_address=auction.auction_address, role="bidder")
+        .first()
+        is not None
+    )
+
+
+def record_bid_placed(db, auction, bid, previous_bidder, previous_bid, first):
+    """Count a stored bid, after record_bidder.
+
+    `previous_bidder` and `previous_bid` are the auction's highest bid before
+    this one; `first` is set when it is the bidder's first bid on the auction.
+    """
+    counts = {"bids_placed": 1}
+    if first:
+        counts["auctions_bid"] = 1
+    # A bid backfilled after its auction was stored as closed: adjust the
+    # counts the close made as if the bid had come before it
+    if _outcome(auction) == "closed":
+        if first:
+            counts["auctions_bid_closed"] = 1
+        # Only highest bidders who bid were counted as winners
+        if previous_bidder != bid.bidder:
+            counts["auctions_won"] = 1
+            if previous_bidder and _bid_on(db, previous_bidder, auction):
+                _bump(db, previous_bidder, auctions_won=-1)
+        elif first:
+            counts["auctions_won"] = 1
+        if not _sold(previous_bid) and _sold(bid.amount):
+            _bump(db, auction.seller, auctions_sold=1)
+    _bump(db, bid.bidder, **counts)
+
+
+def record_outcome(db, auction, sign=1):
+    """Count whether an auction closed or expired; `sign=-1` takes that back before its fields change"""
+    outcome = _outcome(auction)
+    if outcome == "closed":
+        record_closed(db, auction, sign)
+    elif outcome == "expired":
+        _bump(db, auction.seller, auctions_expired=sign)
+
+
+def record_closed(db, auction, sign=1):
+    """Settle an auction the contract reports ended; `sign=-1` takes a settlement back"""
+    _bump(db, auction.seller, auctions_closed=sign, auctions_sold=sign * int(_sold(auction.highest_bid)))
+    for (bidder,) in db.query(Participation.address).filter_by(
+        chain_id=auction.chain_id, auction_address=auction.auction_address, role="bidder"
+    ):
+        _bump(db, bidder, auctions_bid_closed=sign, auctions_won=sign * int(bidder == auction.highest_bidder))
+
+
+def compute_reputation(db):
+    """Every address's counters, computed from the auctions and bids tables"""
+    counts = defaultdict(lambda: dict.fromkeys(COUNTERS, 0))
+    # Reputation covers archived auctions too
+    auctions, bids = all_auctions(), all_bids()
+
+    closed = {}  # (chain id, auction address) -> highest bidder
+    for auction in db.query(
+        auctions.chain_id,
+        auctions.auction_address,
+        auctions.seller,
+        auctions.status,
+        auctions.ended,
+        auctions.highest_bidder,
+        auctions.highest_bid,
+    ).yield_per(10_000):
+        seller = counts[auction.seller]
+        seller["auctions_created"] += 1
+        outcome = _outcome(auction)
+        if outcome == "closed":
+            closed[(auction.chain_id, auction.auction_address)] = auction.highest_bidder
+            seller["auctions_closed"] += 1
+            seller["auctions_sold"] += int(_sold(auction.highest_bid))
+        elif outcome == "expired":
+            seller["auctions_expired"] += 1
+
+    bid_on = defaultdict(set)
+    for chain_id, auction_address, bidder, count in (
+        db.query(bids.chain_id, bids.auction_address, bids.bidder, func.count(bids.id))
+        .group_by(bids.chain_id, bids.auction_address, bids.bidder)
+        .yield_per(10_000)
+    ):
+        counts[bidder]["bids_placed"] += count
+        counts[bidder]["auctions_bid"] += 1
+        bid_on[(chain_id, auction_address)].add(bidder)
+
+    for key, winner in closed.items():
+        for bidder in bid_on.get(key, ()):
+            counts[bidder]["auctions_bid_closed"] += 1
+            counts[bidder]["auctions_won"] += int(bidder == winner)
+    return counts
+
+
+def _mapping(address, row_counts):
+    row = Reputation(address=address, **row_counts)
+    _rescore(row)
+    return {"address": address, **row_counts, "seller_score": row.seller_score, "bidder_score": row.bidder_score}
+
+
+def rebuild_reputation(db):
+    """Recompute every reputation row from the auctions and bids tables"""
+    db.query(Reputation).delete()
+    db.bulk_insert_mappings(
+        Reputation, [_mapping(address, row_counts) for address, row_counts in compute_reputation(db).items()]
+    )
+    db.commit()
+
+
+def verify_reputation(db):
+    """Recompute reputation in full, repair rows the listener got wrong and return how many there were"""
+    expected = compute_reputation(db)
+    drifted = 0
+    for row in db.query(Reputation):
+        row_counts = expected.pop(row.address, None)
+        if row_counts is None:
+            db.delete(row)
+            drifted += 1
+        elif any((getattr(row, name) or 0) != count for name, count in row_counts.items()):
+            for name, count in row_counts.items():
+                setattr(row, name, count)
+            _rescore(row)
+            drifted += 1
+    # Addresses the listener never counted
+    db.bulk_insert_mappings(Reputation, [_mapping(address, row_counts) for address, row_counts in expected.items()])
+    drifted += len(expected)
+    db.commit()
+
+    REPUTATION_DRIFT.set(drifted)
+    if drifted:
+        logger.warning(f"Reputation verification repaired {drifted} addresses")
+    else:
+        logger.info("Reputation verification found no drift")
+    return drifted
+
+
+def ensure_reputation(db):
+    """Populate reputations for databases created before the table existed"""
+    if db.query(Reputation.id).first() is None and (
+        db.query(Auction.id).first() is not None or db.query(ArchivedAuction.id).first() is not None
+    ):
+        rebuild_reputation(db)
+
+
+def reputation_dict(address, row):
+    """/users/{address}/reputation payload; addresses without a row get the neutral scores"""
+    row_counts = {name: (getattr(row, name) or 0) if row else 0 for name in COUNTERS}
+    return {
+        "address": address,
+        "sellerScore": row.seller_score if row else _score(0, 0),
+        "bidderScore": row.bidder_score if row else _score(0, 0),
+        "auctionsCreated": row_counts["auctions_created"],
+        "auctionsClosed": row_counts["auctions_closed"],
+        "auctionsExpired": row_counts["auctions_expired"],
+        "auctionsSold": row_counts["auctions_sold"],
+        "bidsPlaced": row_counts["bids_placed"],
+        "auctionsBid": row_counts["auctions_bid"],
+        "auctionsBidClosed": row_counts["auctions_bid_closed"],
+        "auctionsWon": row_counts["auctions_won"],
+    }
+
@@ -0,0 +1,268 @@
+"""Per-collection market rollups.
+
+Every bid lands in an hourly and a daily bucket keyed by (chain, collection,
+payment token), so collection pages read a handful of rows instead of
+scanning bids. Buckets record the lowest and highest bid placed in them,
+reported as lowBid and highBid; they are bid statistics, not a listing floor.
+
+The floor is the lowest current price among a collection's active auctions
+per payment token. refresh_floor recomputes it whenever an auction is
+created, outbid or changes status.
+"""
+import time
+from collections import defaultdict
+
+from sqlalchemy import func
+
+from archive import all_auctions, all_bids
+from db_models import Auction, Bid, CollectionFloor, CollectionRollup
+
+INTERVALS = {"hour": 3600, "day": 86400}
+
+# Trailing windows reported by /collections/{address}/stats, read from hourly buckets
+STATS_WINDOWS = {"last24h": 86400, "last7d": 7 * 86400}
+
+
+def bucket_start(timestamp, interval):
+    return timestamp - timestamp % INTERVALS[interval]
+
+
+def _merge(row, bid_count, volume, low_bid, high_bid):
+    row.bid_count = (row.bid_count or 0) + bid_count
+    row.volume = str(int(row.volume or 0) + volume)
+    if row.low_bid is None or low_bid < int(row.low_bid):
+        row.low_bid = str(low_bid)
+    if row.high_bid is None or high_bid > int(row.high_bid):
+        row.high_bid = str(high_bid)
+
+
+def record_collection_bid(db, auction, amount, timestamp):
+    """Add a bid to its collection's hourly and daily buckets inside the caller's transaction"""
+    amount = int(amount)
+    for interval in INTERVALS:
+        key = {
+            "chain_id": auction.chain_id,
+            "asset_address": auction.asset_address,
+            "payment_token": auction.payment_token,
+            "interval": interval,
+            "bucket_start": bucket_start(timestamp, interval),
+        }
+        row = db.query(CollectionRollup).filter_by(**key).first()
+        if row is None:
+            row = CollectionRollup(**key)
+            db.add(row)
+            # Sessions don't autoflush; make the row visible to the next lookup
+            db.flush()
+        _merge(row, 1, amount, amount, amount)
+
+
+def current_price(auction):
+    """What an active auction asks now: its highest bid, a Dutch auction's current price, else its reserve"""
+    dutch_price = auction.current_price if auction.auction_type == 1 else None
+    for price in (auction.highest_bid, dutch_price, auction.reserve_price):
+        if price and int(price) > 0:
+            return int(price)
+    return None
+
+
+def _floor(db, chain_id, asset_address, payment_token):
+    prices = [
+        current_price(auction)
+        for auction in db.query(
+            Auction.auction_type, Auction.highest_bid, Auction.current_price, Auction.reserve_price
+        ).filter(
+            Auction.chain_id == chain_id,
+            Auction.asset_address == asset_address,
+            Auction.payment_token == payment_token,
+            Auction.status == "active",
+        )
+    ]
+    prices = [price for price in prices if price is not None]
+    return str(min(prices)) if prices else None
+
+
+def refresh_floor(db, auction):
+    """Recompute the floor of the auction's collection and payment token inside the caller's transaction"""
+    key = {
+        "chain_id": auction.chain_id,
+        "asset_address": auction.asset_address,
+        "payment_token": auction.payment_token,
+    }
+    # Sessions don't autoflush; the floor query has to see the caller's changes
+    db.flush()
+    floor = _floor(db, **key)
+    row = db.query(CollectionFloor).filter_by(**key).first()
+    if floor is None:
+        if row is not None:
+            db.delete(row)
+        return
+    if row is None:
+        row = CollectionFloor(**key)
+        db.add(row)
+    row.floor = floor
+
+
+def rebuild_floors(db):
+    """Recompute every floor from the active auctions"""
+    db.query(CollectionFloor).delete()
+    keys = (
+        db.query(Auction.chain_id, Auction.asset_address, Auction.payment_token)
+        .filter(Auction.status == "active")
+        .distinct()
+        .all()
+    )
+    floors = {key: _floor(db, *key) for key in keys}
+    db.bulk_insert_mappings(
+        CollectionFloor,
+        [
+            {"chain_id": chain_id, "asset_address": asset_address, "payment_token": payment_token, "floor": floor}
+            for (chain_id, asset_address, payment_token), floor in floors.items()
+            if floor is not None
+        ],
+    )
+    db.commit()
+
+
+def rebuild_rollups(db):
+    """Recompute every bucket from the bids table"""
+    db.query(CollectionRollup).delete()
+    # Buckets cover archived bids too
+    auctions, bids = all_auctions(), all_bids()
+
+    buckets = defaultdict(lambda: [0, 0, None, None])
+    rows = (
+        db.query(auctions.chain_id, auctions.asset_address, auctions.payment_token, bids.amount, bids.timestamp)
+        .join(
+            auctions,
+            (auctions.chain_id == bids.chain_id) & (auctions.auction_address == bids.auction_address),
+        )
+        .yield_per(10_000)
+    )
+    for chain_id, asset_address, payment_token, amount, timestamp in rows:
+        amount = int(amount)
+        for interval in INTERVALS:
+            bucket = buckets[
+                (chain_id, asset_address, payment_token, interval, bucket_start(timestamp, interval))
+            ]
+            bucket[0] += 1
+            bucket[1] += amount
+            bucket[2] = amount if bucket[2] is None else min(bucket[2], amount)
+            bucket[3] = amount if bucket[3] is None else max(bucket[3], amount)
+
+    db.bulk_insert_mappings(
+        CollectionRollup,
+        [
+            {
+                "chain_id": chain_id,
+                "asset_address": asset_address,
+                "payment_token": payment_token,
+                "interval": interval,
+                "bucket_start": start,
+                "bid_count": count,
+                "volume": str(volume),
+                "low_bid": str(low_bid),
+                "high_bid": str(high_bid),
+            }
+            for (chain_id, asset_address, payment_token, interval, start), (count, volume, low_bid, high_bid)
+            in buckets.items()
+        ],
+    )
+    db.commit()
+    rebuild_floors(db)
+
+
+def ensure_rollups(db):
+    """Populate rollups and floors for databases created before the tables existed"""
+    if db.query(CollectionRollup.id).first() is None and db.query(Bid.id).first() is not None:
+        rebuild_rollups(db)
+    elif db.query(CollectionFloor.id).first() is None and db.query(Auction.id).first() is not None:
+        rebuild_floors(db)
+
+
+def _summary(rows):
+    count, volume, low_bid = 0, 0, None
+    for row in rows:
+        count += row.bid_count
+        volume += int(row.volume)
+        if low_bid is None or int(row.low_bid) < low_bid:
+            low_bid = int(row.low_bid)
+    return {"bids": count, "volume": str(volume), "lowBid": str(low_bid) if low_bid is not None else None}
+
+
+def collection_stats(db, chain_id, asset_address, now=None):
+    """All-time and trailing-window bid stats per payment token, plus the floor and active auction counts"""
+    now = int(now or time.time())
+    rows = (
+        db.query(CollectionRollup)
+        .filter(
+            CollectionRollup.chain_id == chain_id,
+            CollectionRollup.asset_address == asset_address,
+            CollectionRollup.interval == "day",
+        )
+        .all()
+    )
+    recent = (
+        db.query(CollectionRollup)
+        .filter(
+            CollectionRollup.chain_id == chain_id,
+            CollectionRollup.asset_address == asset_address,
+            CollectionRollup.interval == "hour",
+            CollectionRollup.bucket_start > bucket_start(now - max(STATS_WINDOWS.values()), "hour"),
+        )
+        .all()
+    )
+    active = dict(
+        db.query(Auction.payment_token, func.count(Auction.id))
+        .filter(Auction.chain_id == chain_id, Auction.asset_address == asset_address, Auction.status == "active")
+        .group_by(Auction.payment_token)
+        .all()
+    )
+    floors = dict(
+        db.query(CollectionFloor.payment_token, CollectionFloor.floor)
+        .filter(CollectionFloor.chain_id == chain_id, CollectionFloor.asset_address == asset_address)
+        .all()
+    )
+
+    by_token = defaultdict(list)
+    for row in rows:
+        by_token[row.payment_token].append(row)
+    tokens = {}
+    for payment_token in sorted(set(by_token) | set(active)):
+        token_stats = _summary(by_token[payment_token])
+        token_stats["floor"] = floors.get(payment_token)
+        token_stats["activeAuctions"] = active.get(payment_token, 0)
+        for name, seconds in STATS_WINDOWS.items():
+            start = bucket_start(now - seconds, "hour")
+            token_stats[name] = _summary(
+                r for r in recent if r.payment_token == payment_token and r.bucket_start > start
+            )
+        tokens[payment_token] = token_stats
+
+    return {"chainId": chain_id, "assetAddress": asset_address, "paymentTokens": tokens}
+
+
+def collection_timeseries(db, chain_id, asset_address, interval, since=None, until=None, payment_token=None):
+    """Buckets for one collection in time order"""
+    query = db.query(CollectionRollup).filter(
+        CollectionRollup.chain_id == chain_id,
+        CollectionRollup.asset_address == asset_address,
+        CollectionRollup.interval == interval,
+    )
+    if since is not None:
+        query = query.filter(CollectionRollup.bucket_start >= bucket_start(since, interval))
+    if until is not None:
+        query = query.filter(CollectionRollup.bucket_start <= until)
+    if payment_token:
+        query = query.filter(CollectionRollup.payment_token == payment_token)
+
+    return [
+        {
+            "bucketStart": row.bucket_start,
+            "paymentToken": row.payment_token,
+            "bids": row.bid_count,
+            "volume": row.volume,
+            "lowBid": row.low_bid,
+            "highBid": row.high_bid,
+        }
+        for row in query.order_by(CollectionRollup.bucket_start, CollectionRollup.payment_token)
+    ]
@@ -0,0 +1,170 @@
+"""Full-text index over NFT and token metadata for `GET /auctions?q=`.
+
+SQLite uses an FTS5 virtual table ranked by bm25, PostgreSQL a table with a
+generated tsvector column under a GIN index ranked by ts_rank. Each NFT
+(chain_id, asset_address, asset_id) and each (chain_id, token address) has
+one document; the listener rewrites it whenever it stores metadata.
+"""
+import re
+
+from sqlalchemy import Float, Integer, String, and_, column, or_, table, text
+
+from db_models import Auction, NFTMetadata, TokenMetadata
+
+metadata_search = table(
+    "metadata_search",
+    column("kind"),
+    column("chain_id"),
+    column("asset_address"),
+    column("asset_id"),
+    column("name"),
+    column("description"),
+)
+
+SQLITE_DDL = [
+    "CREATE VIRTUAL TABLE IF NOT EXISTS metadata_search USING fts5("
+    "kind UNINDEXED, chain_id UNINDEXED, asset_address UNINDEXED, asset_id UNINDEXED, name, description, "
+    "prefix='2 3')",
+]
+
+POSTGRES_DDL = [
+    "CREATE TABLE IF NOT EXISTS metadata_search ("
+    "kind VARCHAR, chain_id INTEGER, asset_address VARCHAR, asset_id BIGINT, name VARCHAR, description VARCHAR, "
+    "document tsvector GENERATED ALWAYS AS "
+    "(to_tsvector('simple', coalesce(name, '') || ' ' || coalesce(description, ''))) STORED)",
+    "CREATE INDEX IF NOT EXISTS ix_metadata_search_document ON metadata_search USING GIN (document)",
+]
+
+# Lower rank is a better match in both dialects
+SQLITE_HITS = (
+    "SELECT kind, chain_id, asset_address, asset_id, bm25(metadata_search) AS rank "
+    "FROM metadata_search WHERE metadata_search MATCH :query"
+)
+POSTGRES_HITS = (
+    "SELECT kind, chain_id, asset_address, asset_id, -ts_rank(document, to_tsquery('simple', :query)) AS rank "
+    "FROM metadata_search WHERE document @@ to_tsquery('simple', :query)"
+)
+
+
+def _is_postgres(db):
+    return db.get_bind().dialect.name == "postgresql"
+
+
+def _match_query(db, q):
+    """Turn free text into an all-terms prefix query; None if it has no searchable terms"""
+    terms = re.findall(r"\w+", q)
+    if not terms:
+        return None
+    if _is_postgres(db):
+        return " & ".join(f"{term}:*" for term in terms)
+    return " ".join(f'"{term}"*' for term in terms)
+
+
+def search_hits(db, q):
+    """Subquery of matching documents with a `rank` column, or None when `q` has no terms"""
+    query = _match_query(db, q)
+    if query is None:
+        return None
+    statement = text(POSTGRES_HITS if _is_postgres(db) else SQLITE_HITS).bindparams(query=query)
+    return statement.columns(
+        column("kind", String),
+        column("chain_id", Integer),
+        column("asset_address", String),
+        column("asset_id", Integer),
+        column("rank", Float),
+    ).subquery("hits")
+
+
+def auction_matches(hits, auction=Auction):
+    """Join condition from auctions (or an entity standing in for them) to their asset's documents"""
+    return or_(
+        and_(
+            hits.c.kind == "nft",
+            auction.amount == "0",
+            auction.chain_id == hits.c.chain_id,
+            auction.asset_address == hits.c.asset_address,
+            auction.asset_id == hits.c.asset_id,
+        ),
+        and_(
+            hits.c.kind == "token",
+            auction.amount != "0",
+            auction.chain_id == hits.c.chain_id,
+            auction.asset_address == hits.c.asset_address,
+        ),
+    )
+
+
+def _nft_document(nft):
+    return {
+        "kind": "nft",
+        "chain_id": nft.chain_id,
+        "asset_address": nft.asset_address,
+        "asset_id": nft.asset_id,
+        "name": nft.name,
+        "description": nft.description,
+    }
+
+
+def _token_document(token):
+    return {
+        "kind": "token",
+        "chain_id": token.chain_id,
+        "asset_address": token.token_address,
+        "asset_id": 0,
+        "name": token.name,
+        "description": token.symbol,
+    }
+
+
+def index_nft(db, nft):
+    """Replace the document for an NFT inside the caller's transaction"""
+    db.execute(
+        metadata_search.delete().where(
+            metadata_search.c.kind == "nft",
+            metadata_search.c.chain_id == nft.chain_id,
+            metadata_search.c.asset_address == nft.asset_address,
+            metadata_search.c.asset_id == nft.asset_id,
+        )
+    )
+    db.execute(metadata_search.insert().values(**_nft_document(nft)))
+
+
+def index_token(db, token):
+    """Replace the document for a token inside the caller's transaction"""
+    db.execute(
+        metadata_search.delete().where(
+            metadata_search.c.kind == "token",
+            metadata_search.c.chain_id == token.chain_id,
+            metadata_search.c.asset_address == token.token_address,
+        )
+    )
+    db.execute(metadata_search.insert().values(**_token_document(token)))
+
+
+def create_search_index(db):
+    for statement in POSTGRES_DDL if _is_postgres(db) else SQLITE_DDL:
+        db.execute(text(statement))
+    db.commit()
+
+
+def rebuild_search_index(db):
+    """Re-index every metadata row"""
+    create_search_index(db)
+    db.execute(metadata_search.delete())
+    # The API shows the oldest row when an NFT has several, so index that one
+    documents = {}
+    for nft in db.query(NFTMetadata).order_by(NFTMetadata.id):
+        documents.setdefault((nft.chain_id, nft.asset_address, nft.asset_id), _nft_document(nft))
+    documents = list(documents.values())
+    documents.extend(_token_document(token) for token in db.query(TokenMetadata))
+    if documents:
+        db.execute(metadata_search.insert(), documents)
+    db.commit()
+
+
+def ensure_search_index(db):
+    """Create the index and fill it for databases that predate it"""
+    create_search_index(db)
+    indexed = db.execute(text("SELECT 1 FROM metadata_search LIMIT 1")).first()
+    if indexed is None and (db.query(NFTMetadata.id).first() or db.query(TokenMetadata.id).first()):
+        rebuild_search_index(db)
@@ -1,30 +1,124 @@
 import asyncio
 import logging
-from fastapi import FastAPI, Depends, Query, HTTPException
+import time
+from contextlib import asynccontextmanager
+from fastapi import APIRouter, FastAPI, Depends, Query, HTTPException, Request, Response
+from fastapi.responses import ORJSONResponse, PlainTextResponse, StreamingResponse
 from fastapi.middleware.cors import CORSMiddleware
+from starlette.routing import Match
+from sqlalchemy import text
 from sqlalchemy.orm import Session
 from typing import List, Optional
+import orjson
 import uvicorn
 from pydantic import BaseModel
-from web3 import Web3
-from db_models import Auction, Bid, NFTMetadata, TokenMetadata, get_db
-from blockchain_listener import BlockchainListener
-from config import SYNC_INTERVAL, HOST, PORT
+from db_models import ArchivedAuction, ArchivedBid, Auction, Bid, NFTMetadata, Reputation, TokenMetadata, get_db
+from derived import prepare_database
+from config import CHAIN_ID, SYNC_INTERVAL, HOST, PORT, PROFILING_ENABLED, INIT_DB_ON_STARTUP, COMPRESSION_MIN_BYTES
+from compression import CompressionMiddleware
+from export import (
+    AUCTION_EXPORT_COLUMNS,
+    BID_EXPORT_COLUMNS,
+    NFT_EXPORT_COLUMNS,
+    TOKEN_EXPORT_COLUMNS,
+    arrow_available,
+    auction_export_query,
+    bid_export_query,
+    nft_export_query,
+    stream_arrow,
+    stream_ndjson,
+    token_export_query,
+)
+from payloads import (
+    BID_FIELD_COLUMNS,
+    FIELD_COLUMNS,
+    auction_columns,
+    auction_list_dict,
+    load_auction_details,
+    parse_fields,
+)
+from portfolio import STATES as PORTFOLIO_STATES, portfolio_counts, portfolio_page
+from reputation import reputation_dict
+from archive import all_auctions, find_auction, includes_archive
+from mempool import pending_bid_dict, pending_bids
+from metrics import HTTP_REQUEST_SECONDS, current_endpoint, render_latest
+from read_model import active_auctions
+from search import auction_matches, search_hits
+from rollups import INTERVALS as ROLLUP_INTERVALS, collection_stats, collection_timeseries
+from formatting import checksum_address
+from media import (
+    KEY_PATTERN as MEDIA_KEY_PATTERN,
+    THUMBNAIL_WIDTHS,
+    MediaFetchError,
+    media_cache,
+    media_source,
+    media_url,
+    thumbnail_key,
+    thumbnails_available,
+)
+from profiling import begin_request, finish_request, sample_stacks
+from singleflight import SingleFlight
+from stats import read_stats
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
-app = FastAPI(title="Auction Caching Server")
-
-# Add CORS middleware
-app.add_middleware(
-    CORSMiddleware,
-    allow_origins=["*"],  # Adjust this in production
-    allow_credentials=True,
-    allow_methods=["*"],
-    allow_headers=["*"],
-)
+router = APIRouter()
+
+def _route_template(request):
+    """Resolve the route path template for a request, e.g. /auctions/{auction_id}"""
+    for route in request.app.router.routes:
+        match, _ = route.matches(request.scope)
+        if match == Match.FULL:
+            return route.path
+    return "unmatched"
+
+
+async def record_request_metrics(request: Request, call_next):
+    endpoint = _route_template(request)
+    token = current_endpoint.set(endpoint)
+    tracking = begin_request()
+    start = time.perf_counter()
+    status = 500
+    response = None
+    try:
+        response = await call_next(request)
+        status = response.status_code
+        return response
+    finally:
+        elapsed = time.perf_counter() - start
+        HTTP_REQUEST_SECONDS.labels(request.method, endpoint, status).observe(elapsed)
+        finish_request(tracking, request.method, endpoint, elapsed, response)
+        current_endpoint.reset(token)
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Explicit startup work; importing this module never touches the DB or RPC"""
+    app.state.ready = False
+    if INIT_DB_ON_STARTUP:
+        prepare_database()
+    app.state.ready = True
+    yield
+
+
+def create_app():
+    app = FastAPI(title="Auction Caching Server", lifespan=lifespan)
+
+    # Add CORS middleware
+    app.add_middleware(
+        CORSMiddleware,
+        allow_origins=["*"],  # Adjust this in production
+        allow_credentials=True,
+        allow_methods=["*"],
+        allow_headers=["*"],
+    )
+    if COMPRESSION_MIN_BYTES > 0:
+        app.add_middleware(CompressionMiddleware, minimum_size=COMPRESSION_MIN_BYTES)
+    app.middleware("http")(record_request_metrics)
+    app.include_router(router)
+    return app
 
 
 # Create updated response models with enhanced metadata fields
@@ -54,6 +148,18 @@ class AuctionResponse(BaseModel):
     currencyDecimals: Optional[int] = None
     reservePrice: Optional[str] = None  # Dutch auction reserve price
     currentPrice: Optional[str] = None  # Dutch auction current price
+    chainId: Optional[int] = None
+    sellerScore: Optional[int] = None  # 0-100, see /users/{address}/reputation
+
+
+class AuctionBatchRequest(BaseModel):
+    ids: List[str]
+    chain: Optional[int] = None  # Chain the ids are on; defaults to CHAIN_ID
+
+
+class AuctionBatchResponse(BaseModel):
+    auctions: List[Optional[AuctionResponse]]  # None where the id is unknown
+    missing: List[str]
 
 
 class BidResponse(BaseModel):
@@ -63,13 +169,75 @@ class BidResponse(BaseModel):
     timestamp: int
 
 
+class PendingBidResponse(BaseModel):
+    txHash: str
+    bidder: str
+    amount: str
+    seenAt: int  # Unix time the watcher first saw the transaction
+
+
+class PendingBidsResponse(BaseModel):
+    auctionId: str
+    chainId: int
+    highestBid: str  # Last mined highest bid, for comparison
+    pendingBids: List[PendingBidResponse]
+
+
 # API endpoints
-@app.get("/")
+@router.get("/")
 def read_root():
     return {"message": "Auction caching server is running"}
 
 
-@app.get("/auctions", response_model=List[AuctionResponse])
+@router.get("/health/live")
+def liveness():
+    """The process is up and serving requests"""
+    return {"status": "alive"}
+
+
+@router.get("/health/ready")
+def readiness(request: Request, db: Session = Depends(get_db)):
+    """Startup has finished and the database is reachable"""
+    if not getattr(request.app.state, "ready", False):
+        raise HTTPException(status_code=503, detail="Starting up")
+    try:
+        db.execute(text("SELECT 1"))
+    except Exception as e:
+        logger.error(f"Readiness check failed: {e}")
+        raise HTTPException(status_code=503, detail="Database unavailable")
+    return {"status": "ready"}
+
+
+@router.get("/metrics", include_in_schema=False)
+def get_metrics():
+    payload, content_type = render_latest()
+    return Response(content=payload, media_type=content_type)
+
+
+@router.get("/debug/profile", include_in_schema=False, response_class=PlainTextResponse)
+def get_profile(
+    seconds: float = Query(10, description="Sampling duration in seconds"),
+    interval_ms: float = Query(5, description="Sampling interval in milliseconds"),
+):
+    """Sample all threads (API and listener) and return folded stacks for flamegraphs"""
+    if not PROFILING_ENABLED:
+        raise HTTPException(status_code=404, detail="Profiling is disabled")
+    return sample_stacks(seconds, max(interval_ms, 1) / 1000)
+
+
+FIELDS_DESCRIPTION = "Comma-separated response fields to return, e.g. id,title,highestBid; default all"
+CHAIN_DESCRIPTION = "Chain id the auction is on; auction ids are per chain. Defaults to CHAIN_ID"
+COLLECTION_CHAIN_DESCRIPTION = "Chain id the collection is on; defaults to CHAIN_ID"
+
+
+def _fields(fields, known):
+    try:
+        return parse_fields(fields, known)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+
+@router.get("/auctions", response_model=List[AuctionResponse])
 def get_auctions(
     status: Optional[str] = Query(
         None, description="Filter by auction status (active/ended)"
@@ -78,213 +246,410 @@ def get_auctions(
         None, description="Filter by auction type (0=English, 1=Dutch)"
     ),
     seller: Optional[str] = Query(None, description="Filter by seller address"),
+    chain: Optional[int] = Query(None, description="Filter by chain id"),
+    q: Optional[str] = Query(
+        None, description="Search NFT name/description or token name/symbol; ranks results"
+    ),
     page: int = Query(0, description="Page number for pagination"),
     page_size: int = Query(10, description="Items per page"),
     sort_by: str = Query("endTime", description="Field to sort by"),
     sort_desc: bool = Query(False, description="Sort in descending order"),
+    fields: Optional[str] = Query(None, description=FIELDS_DESCRIPTION),
     db: Session = Depends(get_db),
 ):
-    # Base query
-    query = db.query(Auction)
+    fields = _fields(fields, FIELD_COLUMNS)
+
+    # The active set is kept in memory by an in-process listener; LIKE wildcards
+    # and negative windows have SQL semantics the read model doesn't mimic
+    if (
+        status == "active"
+        and not q
+        and active_auctions.ready
+        and page >= 0
+        and page_size >= 0
+        and not (seller and (not seller.isascii() or "%" in seller or "_" in seller))
+    ):
+        body = active_auctions.page_json(
+            sort_by, sort_desc, auction_type, seller, page * page_size, page_size, fields, chain
+        )
+        return Response(content=body, media_type="application/json")
+
+    # Base query; ended auctions may have moved to the archive
+    archived = includes_archive(status)
+    auctions = all_auctions() if archived else Auction
+    query = db.query(*auction_columns(auctions, fields))
 
     # Apply filters
     if status:
-        query = query.filter(Auction.status == status)
+        query = query.filter(auctions.status == status)
     if auction_type is not None:
-        query = query.filter(Auction.auction_type == auction_type)
+        query = query.filter(auctions.auction_type == auction_type)
     if seller:
-        query = query.filter(Auction.seller.ilike(f"%{seller}%"))
+        query = query.filter(auctions.seller.ilike(f"%{seller}%"))
+    if chain is not None:
+        query = query.filter(auctions.chain_id == chain)
+    if q:
+        hits = search_hits(db, q)
+        if hits is None:
+            return ORJSONResponse([])
+        # Best matches first; sort_by orders auctions that rank equally
+        query = query.join(hits, auction_matches(hits, auctions)).order_by(hits.c.rank)
 
     # Apply sorting
     if sort_by == "endTime":
         query = query.order_by(
-            Auction.end_time.desc() if sort_desc else Auction.end_time
+            auctions.end_time.desc() if sort_desc else auctions.end_time
         )
     elif sort_by == "highestBid":
         # This is a simplified sort - in reality you'd need to convert to numeric
         query = query.order_by(
-            Auction.highest_bid.desc() if sort_desc else Auction.highest_bid
+            auctions.highest_bid.desc() if sort_desc else auctions.highest_bid
         )
     elif sort_by == "created":
         query = query.order_by(
-            Auction.created_at.desc() if sort_desc else Auction.created_at
+            auctions.created_at.desc() if sort_desc else auctions.created_at
         )
 
-    # Get count before pagination
-    total_count = query.count()
-
     # Apply pagination
-    auctions = query.offset(page * page_size).limit(page_size).all()
-
-    # Load metadata for tokens and NFTs
-    result = []
-    for auction in auctions:
-        auction_dict = auction.to_dict()
-
-        # Add title, description and image URL based on asset type
-        if auction.amount == "0":  # ERC721
-            nft_metadata = (
-                db.query(NFTMetadata)
-                .filter_by(
-                    asset_address=auction.asset_address, asset_id=auction.asset_id
-                )
-                .first()
-            )
-
-            if nft_metadata:
-                auction_dict["imageUrl"] = nft_metadata.image_url
-                auction_dict["title"] = nft_metadata.name
-                auction_dict["description"] = nft_metadata.description
-            else:
-                auction_dict["imageUrl"] = (
-                    f"https://via.placeholder.com/300x200?text=NFT+{auction.asset_id}"
-                )
-                auction_dict["title"] = f"NFT #{auction.asset_id}"
-                auction_dict["description"] = "Metadata not available"
-        else:  # ERC20
-            token_metadata = (
-                db.query(TokenMetadata)
-                .filter_by(token_address=auction.asset_address)
-                .first()
-            )
-
-            if token_metadata:
-                auction_dict["imageUrl"] = "http://placehold.it/350x50"
-                auction_dict["title"] = (
-                    f"{token_metadata.name} ({token_metadata.symbol})"
-                )
-                auction_dict["description"] = (
-                    f"{auction.amount} {token_metadata.symbol} tokens"
-                )
-            else:
-                auction_dict["imageUrl"] = (
-                    f"https://via.placeholder.com/128x128?text=Token"
-                )
-                auction_dict["title"] = "Unknown Token"
-                auction_dict["description"] = f"{auction.amount} tokens"
-
-        # Add payment token info
-        payment_token = (
-            db.query(TokenMetadata)
-            .filter_by(token_address=auction.payment_token)
-            .first()
+    rows = query.offset(page * page_size).limit(page_size).all()
+
+    return ORJSONResponse(load_auction_details(db, rows, auction_list_dict, archived, fields))
+
+
+MAX_BATCH_IDS = 500
+
+@router.post("/auctions/batch", response_model=AuctionBatchResponse)
+def get_auctions_batch(request: AuctionBatchRequest, db: Session = Depends(get_db)):
+    """Resolve many auctions in one round trip; results follow the request order"""
+    if len(request.ids) > MAX_BATCH_IDS:
+        raise HTTPException(
+            status_code=400, detail=f"At most {MAX_BATCH_IDS} ids per batch request"
         )
 
-        if payment_token:
-            auction_dict["currencySymbol"] = payment_token.symbol
-            auction_dict["currencyName"] = payment_token.name
-            auction_dict["currencyImageUrl"] = payment_token.image_url
-            auction_dict["currencyDecimals"] = payment_token.decimals
+    chain = CHAIN_ID if request.chain is None else request.chain
+    by_id = {}
+    for auctions, archived in ((Auction, False), (ArchivedAuction, True)):
+        # Only ids the hot table didn't have are looked up in the archive
+        wanted = set(request.ids) - set(by_id)
+        rows = (
+            db.query(*auction_columns(auctions))
+            .filter(auctions.chain_id == chain, auctions.auction_id.in_(wanted))
+            .all()
+            if wanted
+            else []
+        )
+        by_id.update(
+            (row.auction_id, auction_dict)
+            for row, auction_dict in zip(rows, load_auction_details(db, rows, archived=archived))
+        )
 
-        result.append(auction_dict)
+    return ORJSONResponse(
+        {
+            "auctions": [by_id.get(auction_id) for auction_id in request.ids],
+            "missing": [auction_id for auction_id in request.ids if auction_id not in by_id],
+        }
+    )
 
-    return result
 
+@router.get("/auctions/count", response_model=dict)
+def get_auction_counts(db: Session = Depends(get_db)):
+    """Dashboard stats served from the counters table the listener maintains"""
+    return read_stats(db)
 
-@app.get("/auctions/{auction_id}", response_model=AuctionResponse)
-def get_auction(auction_id: str, db: Session = Depends(get_db)):
-    auction = db.query(Auction).filter(Auction.auction_id == auction_id).first()
 
-    if not auction:
-        raise HTTPException(status_code=404, detail=f"Auction {auction_id} not found")
+# Clients watching an auction close poll the same URLs at once; they share one computation
+auction_flights = SingleFlight("auction_detail")
+bid_flights = SingleFlight("auction_bids")
 
-    auction_dict = auction.to_dict()
 
-    # Add title, description and image URL based on asset type
-    if auction.amount == "0":  # ERC721
-        nft_metadata = (
-            db.query(NFTMetadata)
-            .filter_by(asset_address=auction.asset_address, asset_id=auction.asset_id)
-            .first()
-        )
+@router.get("/auctions/{auction_id}", response_model=AuctionResponse)
+def get_auction(
+    auction_id: str,
+    chain: int = Query(CHAIN_ID, description=CHAIN_DESCRIPTION),
+    fields: Optional[str] = Query(None, description=FIELDS_DESCRIPTION),
+    db: Session = Depends(get_db),
+):
+    fields = _fields(fields, FIELD_COLUMNS)
 
-        if nft_metadata:
-            auction_dict["imageUrl"] = nft_metadata.image_url
-            auction_dict["title"] = nft_metadata.name
-            auction_dict["description"] = nft_metadata.description
-        else:
-            auction_dict["imageUrl"] = (
-                f"https://via.placeholder.com/300x200?text=NFT+{auction.asset_id}"
-            )
-            auction_dict["title"] = f"NFT #{auction.asset_id}"
-            auction_dict["description"] = "Metadata not available"
-    else:  # ERC20
-        token_metadata = (
-            db.query(TokenMetadata)
-            .filter_by(token_address=auction.asset_address)
-            .first()
-        )
+    def render():
+        auction, archived = find_auction(db, chain, auction_id, lambda entity: auction_columns(entity, fields))
 
-        if token_metadata:
-            auction_dict["imageUrl"] = token_metadata.image_url
-            auction_dict["title"] = f"{Web3.from_wei(int(auction.amount), 'ether')} {token_metadata.name} ({token_metadata.symbol})"
-            auction_dict["description"] = (
-                f"{Web3.from_wei(int(auction.amount), 'ether')} {token_metadata.symbol} tokens"
-            )
-        else:
-            auction_dict["imageUrl"] = f"https://via.placeholder.com/128x128?text=Token"
-            auction_dict["title"] = "Unknown Token"
-            auction_dict["description"] = f"{Web3.from_wei(int(auction.amount), 'ether')} tokens"
-
-    # Add payment token info
-    payment_token = (
-        db.query(TokenMetadata).filter_by(token_address=auction.payment_token).first()
-    )
+        if not auction:
+            raise HTTPException(status_code=404, detail=f"Auction {auction_id} not found")
 
-    if payment_token:
-        auction_dict["currencySymbol"] = payment_token.symbol
-        auction_dict["currencyName"] = payment_token.name
-        auction_dict["currencyImageUrl"] = payment_token.image_url
-        auction_dict["currencyDecimals"] = payment_token.decimals
+        return orjson.dumps(load_auction_details(db, [auction], archived=archived, fields=fields)[0])
 
-    return auction_dict
+    return Response(
+        content=auction_flights.do((chain, auction_id, fields), render), media_type="application/json"
+    )
 
 
-@app.get("/auctions/{auction_id}/bids", response_model=List[BidResponse])
+@router.get("/auctions/{auction_id}/bids", response_model=List[BidResponse])
 def get_auction_bids(
     auction_id: str,
+    chain: int = Query(CHAIN_ID, description=CHAIN_DESCRIPTION),
     page: int = Query(0, description="Page number for pagination"),
     page_size: int = Query(10, description="Items per page"),
+    fields: Optional[str] = Query(None, description="Comma-separated bid fields to return; default all"),
     db: Session = Depends(get_db),
 ):
-    # First get the auction to check it exists and get its address
-    auction = db.query(Auction).filter(Auction.auction_id == auction_id).first()
+    fields = _fields(fields, BID_FIELD_COLUMNS) or tuple(BID_FIELD_COLUMNS)
+
+    def render():
+        # First get the auction to check it exists and get its address
+        auction, archived = find_auction(db, chain, auction_id, lambda a: (a.auction_address,))
+
+        if not auction:
+            raise HTTPException(status_code=404, detail=f"Auction {auction_id} not found")
+
+        # Now get the bids, from the same tier as the auction
+        bid = ArchivedBid if archived else Bid
+        bids = (
+            db.query(*(getattr(bid, BID_FIELD_COLUMNS[name]) for name in fields))
+            .filter(bid.chain_id == chain, bid.auction_address == auction.auction_address)
+            .order_by(bid.block_number.desc())
+            .offset(page * page_size)
+            .limit(page_size)
+            .all()
+        )
 
-    if not auction:
-        raise HTTPException(status_code=404, detail=f"Auction {auction_id} not found")
+        return orjson.dumps([dict(zip(fields, bid)) for bid in bids])
 
-    # Now get the bids
-    bids = (
-        db.query(Bid)
-        .filter(Bid.auction_address == auction.auction_address)
-        .order_by(Bid.block_number.desc())
-        .offset(page * page_size)
-        .limit(page_size)
-        .all()
+    return Response(
+        content=bid_flights.do((chain, auction_id, page, page_size, fields), render),
+        media_type="application/json",
     )
 
-    return [bid.to_dict() for bid in bids]
 
+@router.get("/auctions/{auction_id}/pending-bids", response_model=PendingBidsResponse)
+def get_pending_bids(
+    auction_id: str,
+    chain: int = Query(CHAIN_ID, description=CHAIN_DESCRIPTION),
+    db: Session = Depends(get_db),
+):
+    """Unmined placeBid transactions seen in the mempool, highest first.
 
-@app.get("/auctions/count", response_model=dict)
-def get_auction_counts(db: Session = Depends(get_db)):
-    # Get counts of active and ended auctions
-    active_count = db.query(Auction).filter(Auction.status == "active").count()
-    ended_count = db.query(Auction).filter(Auction.status == "ended").count()
-    total_count = db.query(Auction).count()
+    Empty unless MEMPOOL_WATCH_ENABLED is set in the process running the listener.
+    """
+    auction, archived = find_auction(db, chain, auction_id, lambda a: (a.auction_address, a.highest_bid, a.status))
+    if not auction:
+        raise HTTPException(status_code=404, detail=f"Auction {auction_id} not found")
 
-    return {"active": active_count, "ended": ended_count, "total": total_count}
+    pending = (
+        [] if archived or auction.status != "active" else pending_bids.for_auction(chain, auction.auction_address)
+    )
+    return ORJSONResponse(
+        {
+            "auctionId": auction_id,
+            "chainId": chain,
+            "highestBid": auction.highest_bid,
+            "pendingBids": [pending_bid_dict(bid) for bid in pending],
+        }
+    )
 
 
-@app.get("/tokens", response_model=List[dict])
-def get_tokens(db: Session = Depends(get_db)):
+@router.get("/tokens", response_model=List[dict])
+def get_tokens(
+    chain: Optional[int] = Query(None, description="Filter by chain id"),
+    db: Session = Depends(get_db),
+):
     """Get all token metadata in the database"""
-    tokens = db.query(TokenMetadata).all()
-    return [token.to_dict() for token in tokens]
+    query = db.query(TokenMetadata)
+    if chain is not None:
+        query = query.filter(TokenMetadata.chain_id == chain)
+    tokens = query.all()
+    return [{**token.to_dict(), "imageUrl": media_url(token.image_url)} for token in tokens]
 
 
-@app.get("/nfts", response_model=List[dict])
-def get_nfts(db: Session = Depends(get_db)):
+@router.get("/nfts", response_model=List[dict])
+def get_nfts(
+    chain: Optional[int] = Query(None, description="Filter by chain id"),
+    db: Session = Depends(get_db),
+):
     """Get all NFT metadata in the database"""
-    nfts = db.query(NFTMetadata).all()
-    return [nft.to_dict() for nft in nfts]
+    query = db.query(NFTMetadata)
+    if chain is not None:
+        query = query.filter(NFTMetadata.chain_id == chain)
+    nfts = query.all()
+    return [{**nft.to_dict(), "imageUrl": media_url(nft.image_url)} for nft in nfts]
+
+
+@router.get("/media/{key}")
+def get_media(
+    request: Request,
+    key: str,
+    w: Optional[int] = Query(None, description=f"Thumbnail width, one of {THUMBNAIL_WIDTHS}"),
+    db: Session = Depends(get_db),
+):
+    """Cached NFT/token image or metadata document; keys come from image URLs in other responses"""
+    if not MEDIA_KEY_PATTERN.match(key):
+        raise HTTPException(status_code=404, detail="Unknown media key")
+    if w is not None and w not in THUMBNAIL_WIDTHS:
+        raise HTTPException(status_code=400, detail=f"Thumbnail width must be one of {THUMBNAIL_WIDTHS}")
+    if w is not None and not thumbnails_available():
+        raise HTTPException(status_code=501, detail="Thumbnails require Pillow")
+
+    # Content never changes under a key, so the key is the validator
+    etag = f'"{key}-w{w}"' if w else f'"{key}"'
+    headers = {"Cache-Control": "public, max-age=31536000, immutable", "ETag": etag}
+    if request.headers.get("if-none-match") == etag:
+        return Response(status_code=304, headers=headers)
+
+    cached = media_cache.get(thumbnail_key(key, w) if w else key)
+    if cached is None:
+        url = media_source(db, key)
+        if url is None:
+            raise HTTPException(status_code=404, detail="Unknown media key")
+        try:
+            cached = media_cache.thumbnail(url, w) if w else media_cache.fetch(url)
+        except MediaFetchError as e:
+            raise HTTPException(status_code=502, detail=str(e))
+        except ValueError as e:
+            raise HTTPException(status_code=415, detail=str(e))
+    body, content_type = cached
+    return Response(content=body, media_type=content_type, headers=headers)
+
+
+def _checksum(address):
+    try:
+        return checksum_address(address)
+    except ValueError:
+        raise HTTPException(status_code=400, detail=f"Invalid address: {address}")
+
+
+@router.get("/collections/{address}/stats", response_model=dict)
+def get_collection_stats(
+    address: str,
+    chain: int = Query(CHAIN_ID, description=COLLECTION_CHAIN_DESCRIPTION),
+    db: Session = Depends(get_db),
+):
+    """Lowest bid, volume and bid counts per payment token, all-time and over trailing windows"""
+    return collection_stats(db, chain, _checksum(address))
+
+
+@router.get("/collections/{address}/timeseries", response_model=List[dict])
+def get_collection_timeseries(
+    address: str,
+    chain: int = Query(CHAIN_ID, description=COLLECTION_CHAIN_DESCRIPTION),
+    interval: str = Query("day", description="Bucket size (hour/day)"),
+    since: Optional[int] = Query(None, description="Unix timestamp of the first bucket"),
+    until: Optional[int] = Query(None, description="Unix timestamp of the last bucket"),
+    payment_token: Optional[str] = Query(None, description="Only buckets in this payment token"),
+    db: Session = Depends(get_db),
+):
+    """Bid count, volume, lowest and highest bid per bucket, oldest first"""
+    if interval not in ROLLUP_INTERVALS:
+        raise HTTPException(status_code=400, detail=f"Unsupported interval: {interval}")
+    if payment_token:
+        payment_token = _checksum(payment_token)
+    return collection_timeseries(db, chain, _checksum(address), interval, since, until, payment_token)
+
+
+MAX_PORTFOLIO_PAGE = 100
+
+
+@router.get("/users/{address}/portfolio", response_model=dict)
+def get_user_portfolio(
+    address: str,
+    role: Optional[str] = Query(None, description="Only auctions the address sells (seller) or bid on (bidder)"),
+    state: Optional[str] = Query(
+        None, description="active/ended for sellers; leading/outbid/won/lost for bidders"
+    ),
+    cursor: Optional[str] = Query(None, description="nextCursor from the previous page"),
+    limit: int = Query(20, description=f"Items per page, at most {MAX_PORTFOLIO_PAGE}"),
+    db: Session = Depends(get_db),
+):
+    """Auctions a wallet sells or bid on, most recent first, with counts per role and state"""
+    if role is not None and role not in PORTFOLIO_STATES:
+        raise HTTPException(status_code=400, detail=f"Unsupported role: {role}")
+    valid_states = PORTFOLIO_STATES[role] if role else {s for states in PORTFOLIO_STATES.values() for s in states}
+    if state is not None and state not in valid_states:
+        raise HTTPException(status_code=400, detail=f"Unsupported state: {state}")
+    if not 1 <= limit <= MAX_PORTFOLIO_PAGE:
+        raise HTTPException(status_code=400, detail=f"limit must be between 1 and {MAX_PORTFOLIO_PAGE}")
+    if cursor is not None and not cursor.isdigit():
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+    address = _checksum(address)
+    items, next_cursor = portfolio_page(
+        db, address, role, state, int(cursor) if cursor is not None else None, limit
+    )
+    return ORJSONResponse(
+        {
+            "address": address,
+            "counts": portfolio_counts(db, address),
+            "items": items,
+            "nextCursor": str(next_cursor) if next_cursor is not None else None,
+        }
+    )
+
+
+@router.get("/users/{address}/reputation", response_model=dict)
+def get_user_reputation(address: str, db: Session = Depends(get_db)):
+    """Seller and bidder scores (0-100, 50 without history) and the counts behind them"""
+    address = _checksum(address)
+    row = db.query(Reputation).filter_by(address=address).first()
+    return ORJSONResponse(reputation_dict(address, row))
+
+
+EXPORT_MEDIA_TYPES = {
+    "ndjson": "application/x-ndjson",
+    "arrow": "application/vnd.apache.arrow.stream",
+}
+
+
+def _export_response(query, columns, format):
+    if format not in EXPORT_MEDIA_TYPES:
+        raise HTTPException(status_code=400, detail=f"Unsupported export format: {format}")
+    if format == "arrow":
+        if not arrow_available():
+            raise HTTPException(status_code=501, detail="Arrow export requires pyarrow")
+        body = stream_arrow(query, columns)
+    else:
+        body = stream_ndjson(query, columns)
+    return StreamingResponse(body, media_type=EXPORT_MEDIA_TYPES[format])
+
+
+@router.get("/export/auctions")
+def export_auctions(
+    format: str = Query("ndjson", description="ndjson or arrow (Arrow IPC stream)"),
+    updated_since: Optional[int] = Query(
+        None, description="Only auctions changed after this block number"
+    ),
+    status: Optional[str] = Query(None, description="Filter by auction status (active/ended)"),
+    chain: Optional[int] = Query(None, description="Filter by chain id; block numbers are per chain"),
+):
+    """Stream every auction, ordered by updatedBlock, for bulk and incremental pulls"""
+    return _export_response(
+        auction_export_query(updated_since, status, chain), AUCTION_EXPORT_COLUMNS, format
+    )
+
+
+@router.get("/export/bids")
+def export_bids(
+    format: str = Query("ndjson", description="ndjson or arrow (Arrow IPC stream)"),
+    updated_since: Optional[int] = Query(
+        None, description="Only bids placed after this block number"
+    ),
+    auction_address: Optional[str] = Query(None, description="Only bids on this auction"),
+    chain: Optional[int] = Query(None, description="Filter by chain id; block numbers are per chain"),
+):
+    """Stream bids ordered by block number"""
+    return _export_response(
+        bid_export_query(updated_since, auction_address, chain), BID_EXPORT_COLUMNS, format
+    )
+
+
+@router.get("/export/tokens")
+def export_tokens(format: str = Query("ndjson", description="ndjson or arrow (Arrow IPC stream)")):
+    """Stream all token metadata"""
+    return _export_response(token_export_query(), TOKEN_EXPORT_COLUMNS, format)
+
+
+@router.get("/export/nfts")
+def export_nfts(format: str = Query("ndjson", description="ndjson or arrow (Arrow IPC stream)")):
+    """Stream all NFT metadata"""
+    return _export_response(nft_export_query(), NFT_EXPORT_COLUMNS, format)
+
+
+app = create_app()
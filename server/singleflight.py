@@ -0,0 +1,38 @@
+"""Merge concurrent identical computations into one.
+
+The first caller for a key runs the computation; callers arriving while it
+is in flight wait for it and get the same result, or the same exception.
+Nothing is cached once it finishes.
+"""
+import threading
+from concurrent.futures import Future
+
+from metrics import COALESCE_CALLS, COALESCED_CALLS
+
+
+class SingleFlight:
+    def __init__(self, group):
+        self.group = group
+        self.lock = threading.Lock()
+        self.inflight = {}  # key -> Future
+
+    def do(self, key, compute):
+        COALESCE_CALLS.labels(self.group).inc()
+        with self.lock:
+            future = self.inflight.get(key)
+            leader = future is None
+            if leader:
+                future = self.inflight[key] = Future()
+        if not leader:
+            COALESCED_CALLS.labels(self.group).inc()
+            return future.result()
+        try:
+            result = compute()
+            future.set_result(result)
+            return result
+        except BaseException as e:
+            future.set_exception(e)
+            raise
+        finally:
+            with self.lock:
+                del self.inflight[key]
@@ -0,0 +1,155 @@
+"""Point-in-time snapshots of the database for bootstrapping new replicas.
+
+A snapshot is gzip-compressed JSON lines: a header, then for every table a
+`{"table": ..., "columns": [...]}` line followed by one JSON array per row,
+then a trailer with the row count so truncated files are rejected. All
+tables are read in one transaction, so the ingest cursor in the snapshot
+matches the rows next to it and a node that imports it resumes the
+listener from that block.
+"""
+import gzip
+import json
+import logging
+import time
+
+from sqlalchemy import func, select, text
+
+from db_models import Base, SessionLocal, engine
+from derived import prepare_database
+from ingest_cursor import LISTENER_CURSOR
+from search import rebuild_search_index
+
+logger = logging.getLogger(__name__)
+
+SNAPSHOT_FORMAT = "auction-snapshot"
+SNAPSHOT_VERSION = 1
+IMPORT_BATCH_SIZE = 10_000
+
+
+class SnapshotError(Exception):
+    pass
+
+
+def _read_cursor(conn):
+    table = Base.metadata.tables["ingest_cursors"]
+    row = conn.execute(select(table).where(table.c.name == LISTENER_CURSOR)).first()
+    if row is None:
+        return None
+    return {"blockNumber": row.block_number, "blockHash": row.block_hash}
+
+
+def export_snapshot(path):
+    """Write every table to `path`; returns the ingest cursor it was taken at"""
+    rows_written = 0
+    with engine.connect() as conn:
+        if engine.dialect.name == "sqlite":
+            # pysqlite only opens transactions for writes; hold a read transaction
+            # so every table is read from the same state
+            conn.exec_driver_sql("BEGIN")
+        elif engine.dialect.name == "postgresql":
+            conn = conn.execution_options(isolation_level="REPEATABLE READ")
+
+        cursor = _read_cursor(conn)
+        with gzip.open(path, "wt", encoding="utf-8") as f:
+            header = {
+                "format": SNAPSHOT_FORMAT,
+                "version": SNAPSHOT_VERSION,
+                "createdAt": int(time.time()),
+                "cursor": cursor,
+            }
+            f.write(json.dumps(header) + "\n")
+            for table in Base.metadata.sorted_tables:
+                columns = [column.name for column in table.columns]
+                f.write(json.dumps({"table": table.name, "columns": columns}) + "\n")
+                result = conn.execution_options(yield_per=IMPORT_BATCH_SIZE).execute(
+                    select(table).order_by(*table.primary_key.columns)
+                )
+                for row in result:
+                    f.write(json.dumps(list(row), separators=(",", ":")) + "\n")
+                    rows_written += 1
+            f.write(json.dumps({"end": True, "rows": rows_written}) + "\n")
+        conn.rollback()
+
+    logger.info(f"Exported {rows_written} rows to {path} at cursor {cursor}")
+    return cursor
+
+
+def _reset_sequences(conn):
+    # Rows keep their ids, so PostgreSQL sequences must continue after them
+    if engine.dialect.name != "postgresql":
+        return
+    for table in Base.metadata.sorted_tables:
+        if "id" in table.c:
+            conn.execute(
+                text(
+                    f"SELECT setval(pg_get_serial_sequence('{table.name}', 'id'), "
+                    f"COALESCE((SELECT MAX(id) FROM {table.name}), 0) + 1, false)"
+                )
+            )
+
+
+def _records(f, path):
+    try:
+        for line in f:
+            yield json.loads(line)
+    except (OSError, EOFError, ValueError) as e:
+        raise SnapshotError(f"{path} is corrupt: {e}")
+
+
+def import_snapshot(path, replace=False):
+    """Load a snapshot into the configured database; returns its ingest cursor.
+
+    Refuses to touch a database that already has auctions unless `replace` is set.
+    """
+    prepare_database()
+    tables = Base.metadata.tables
+    rows_read = 0
+
+    with gzip.open(path, "rt", encoding="utf-8") as f, engine.begin() as conn:
+        header = json.loads(f.readline() or "{}")
+        if header.get("format") != SNAPSHOT_FORMAT:
+            raise SnapshotError(f"{path} is not an auction snapshot")
+        if header.get("version") != SNAPSHOT_VERSION:
+            raise SnapshotError(f"Unsupported snapshot version {header.get('version')}")
+
+        has_auctions = conn.execute(select(func.count()).select_from(tables["auctions"])).scalar()
+        if has_auctions and not replace:
+            raise SnapshotError("The database already has auctions; use --replace to overwrite")
+        # Derived tables are seeded even on an empty database, so clear everything
+        for table in reversed(Base.metadata.sorted_tables):
+            conn.execute(table.delete())
+
+        table, columns, batch, finished = None, None, [], False
+        for record in _records(f, path):
+            if isinstance(record, list):
+                rows_read += 1
+                if table is not None:
+                    batch.append({k: v for k, v in zip(columns, record) if k in table.c})
+                    if len(batch) >= IMPORT_BATCH_SIZE:
+                        conn.execute(table.insert(), batch)
+                        batch = []
+                continue
+            if batch:
+                conn.execute(table.insert(), batch)
+                batch = []
+            if record.get("end"):
+                if record.get("rows") != rows_read:
+                    raise SnapshotError(f"Expected {record.get('rows')} rows, read {rows_read}")
+                finished = True
+                break
+            # Tables this version no longer has are skipped
+            table = tables.get(record["table"])
+            columns = record["columns"]
+
+        if not finished:
+            raise SnapshotError(f"{path} is truncated")
+        _reset_sequences(conn)
+
+    # The search index is not a model table, so it isn't in the snapshot
+    db = SessionLocal()
+    try:
+        rebuild_search_index(db)
+    finally:
+        db.close()
+    logger.info(f"Imported {rows_read} rows from {path} at cursor {header['cursor']}")
+    return header["cursor"]
@@ -0,0 +1,82 @@
+"""The (chain, RPC, factory) sources the listener ingests from.
+
+The primary source is RPC_URL/FACTORY_CONTRACT_ADDRESS on CHAIN_ID, the only
+one before multi-chain ingest: its cursor and journal keep their names, so
+existing databases carry on unchanged. Every factory numbers its auctions
+from 1 and auction addresses can repeat across chains, so auctions and the
+rows hanging off them are keyed by (chain_id, auction_id) and (chain_id,
+auction_address); the API takes the chain as a `chain` parameter that
+defaults to CHAIN_ID. Each extra source has its own cursor and journal
+directory.
+
+Token logos come from Trust Wallet's assets repository, which names its
+chain directories by slug. Known chains map to their slug; an extra source
+can name one with "trustwallet_chain". Chains without one get placeholders.
+"""
+import os
+from collections import namedtuple
+
+from config import (
+    CHAIN_ID,
+    EXTRA_INGEST_SOURCES,
+    FACTORY_CONTRACT_ADDRESS,
+    LOG_ARCHIVE_DIR,
+    RPC_URL,
+    WS_RPC_URL,
+)
+from ingest_cursor import LISTENER_CURSOR
+
+IngestSource = namedtuple(
+    "IngestSource", ["chain_id", "rpc_url", "factory", "ws_rpc_url", "primary", "trustwallet_chain"]
+)
+
+# Chain id -> directory under https://github.com/trustwallet/assets/tree/master/blockchains
+TRUSTWALLET_CHAINS = {
+    1: "ethereum",
+    10: "optimism",
+    56: "smartchain",
+    137: "polygon",
+    8453: "base",
+    42161: "arbitrum",
+    43114: "avalanchec",
+}
+
+
+def ingest_sources():
+    """The primary source followed by EXTRA_INGEST_SOURCES"""
+    sources = [
+        IngestSource(
+            CHAIN_ID, RPC_URL, FACTORY_CONTRACT_ADDRESS, WS_RPC_URL, True, TRUSTWALLET_CHAINS.get(CHAIN_ID)
+        )
+    ]
+    for extra in EXTRA_INGEST_SOURCES:
+        chain_id = int(extra["chain_id"])
+        sources.append(
+            IngestSource(
+                chain_id,
+                extra["rpc_url"],
+                extra["factory"],
+                extra.get("ws_rpc_url", ""),
+                False,
+                extra.get("trustwallet_chain", TRUSTWALLET_CHAINS.get(chain_id)),
+            )
+        )
+    chain_ids = [source.chain_id for source in sources]
+    if len(set(chain_ids)) != len(chain_ids):
+        raise ValueError(f"Each ingest source needs its own chain id, got {chain_ids}")
+    return sources
+
+
+def primary_source():
+    return ingest_sources()[0]
+
+
+def cursor_name(source):
+    return LISTENER_CURSOR if source.primary else f"{LISTENER_CURSOR}:{source.chain_id}"
+
+
+def journal_directory(source, root=LOG_ARCHIVE_DIR):
+    """Where a source's chain data journal goes; '' when journaling is off"""
+    if not root or source.primary:
+        return root
+    return os.path.join(root, f"chain-{source.chain_id}")
@@ -0,0 +1,108 @@
+from collections import defaultdict
+from sqlalchemy import func
+
+from archive import all_auctions, all_bids
+from db_models import AuctionStat
+
+
+def _bump(db, dimension, key, count=0, volume=0):
+    """Adjust one counter row inside the caller's transaction"""
+    row = db.query(AuctionStat).filter_by(dimension=dimension, key=key).first()
+    if row is None:
+        row = AuctionStat(dimension=dimension, key=key, count=0, volume="0")
+        db.add(row)
+        # Sessions don't autoflush; make the row visible to the next lookup
+        db.flush()
+    row.count = (row.count or 0) + count
+    if volume:
+        row.volume = str(int(row.volume or 0) + volume)
+
+
+def record_auction_created(db, auction):
+    _bump(db, "auctions", "total", 1)
+    _bump(db, "status", auction.status, 1)
+    _bump(db, "type", str(auction.auction_type), 1)
+    _bump(db, "payment_token", auction.payment_token, 1)
+
+
+def record_status_change(db, old_status, new_status):
+    if old_status == new_status:
+        return
+    _bump(db, "status", old_status, -1)
+    _bump(db, "status", new_status, 1)
+
+
+def record_bid(db, auction, amount):
+    _bump(db, "bids", "total", 1, int(amount))
+    _bump(db, "bids", auction.payment_token, 1, int(amount))
+
+
+def rebuild_stats(db):
+    """Recompute every counter from the auctions and bids tables"""
+    db.query(AuctionStat).delete()
+    # Counts cover archived auctions too
+    auctions, bids = all_auctions(), all_bids()
+
+    total = db.query(func.count(auctions.id)).scalar()
+    _bump(db, "auctions", "total", total)
+    for status, count in db.query(auctions.status, func.count(auctions.id)).group_by(auctions.status):
+        _bump(db, "status", status, count)
+    for auction_type, count in db.query(auctions.auction_type, func.count(auctions.id)).group_by(
+        auctions.auction_type
+    ):
+        _bump(db, "type", str(auction_type), count)
+    for token, count in db.query(auctions.payment_token, func.count(auctions.id)).group_by(
+        auctions.payment_token
+    ):
+        _bump(db, "payment_token", token, count)
+
+    # Amounts are wei strings that overflow SQL integers, so sum them here
+    bid_totals = defaultdict(lambda: [0, 0])
+    rows = (
+        db.query(auctions.payment_token, bids.amount)
+        .join(
+            auctions,
+            (auctions.chain_id == bids.chain_id) & (auctions.auction_address == bids.auction_address),
+        )
+        .yield_per(10_000)
+    )
+    for token, amount in rows:
+        for key in ("total", token):
+            bid_totals[key][0] += 1
+            bid_totals[key][1] += int(amount)
+    _bump(db, "bids", "total")
+    for key, (count, volume) in bid_totals.items():
+        _bump(db, "bids", key, count, volume)
+
+    db.commit()
+
+
+def ensure_stats(db):
+    """Populate counters for databases created before the stats table existed"""
+    if db.query(AuctionStat).filter_by(dimension="auctions", key="total").first() is None:
+        rebuild_stats(db)
+
+
+def read_stats(db):
+    """Dashboard counts from the counters table; cost is independent of table size"""
+    rows = db.query(AuctionStat).all()
+    counts = defaultdict(dict)
+    bids = {"total": 0, "volume": "0", "byPaymentToken": {}}
+    for row in rows:
+        if row.dimension == "bids":
+            if row.key == "total":
+                bids["total"] = row.count
+                bids["volume"] = row.volume
+            else:
+                bids["byPaymentToken"][row.key] = {"count": row.count, "volume": row.volume}
+        else:
+            counts[row.dimension][row.key] = row.count
+
+    return {
+        "active": counts["status"].get("active", 0),
+        "ended": counts["status"].get("ended", 0),
+        "total": counts["auctions"].get("total", 0),
+        "byType": counts["type"],
+        "byPaymentToken": counts["payment_token"],
+        "bids": bids,
+    }
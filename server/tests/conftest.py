@@ -0,0 +1,129 @@
+"""Fixtures that run the listener against the benchmark's fake chain.
+
+The server modules read their configuration at import, so the fake node is
+started and the environment pointed at it before any of them is imported.
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+from collections import Counter
+
+import pytest
+
+SERVER_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, SERVER_DIR)
+
+from bench.run import configure, start_fake_chain  # noqa: E402
+
+WORKDIR = tempfile.mkdtemp(prefix="creators-tests-")
+DATABASE_PATH = os.path.join(WORKDIR, "test.db")
+CHAIN, RPC_URL = start_fake_chain(
+    argparse.Namespace(auctions=60, bids_per_auction=3, seed=7, reorg_interval=0, reorg_depth=3)
+)
+configure(f"sqlite:///{DATABASE_PATH}", RPC_URL)
+for name, file in (
+    ("FACTORY_ABI_PATH", "factory_abi.json"),
+    ("AUCTION_ABI_PATH", "auction_abi.json"),
+    ("DUTCH_AUCTION_ABI_PATH", "dutch_auction_abi.json"),
+):
+    os.environ[name] = os.path.join(SERVER_DIR, "abis", file)
+os.environ["ARCHIVE_AFTER_DAYS"] = "0"
+os.environ["REPUTATION_VERIFY_INTERVAL"] = "0"
+os.environ["RECONCILE_CALLS_PER_MINUTE"] = "0"
+
+
+@pytest.fixture(scope="session")
+def chain():
+    return CHAIN
+
+
+@pytest.fixture(scope="session")
+def database():
+    """A migrated database in the session's temporary directory"""
+    from derived import prepare_database
+
+    prepare_database()
+    return DATABASE_PATH
+
+
+@pytest.fixture(scope="session")
+def listener(database):
+    """A listener that has synced every auction on the fake chain"""
+    from blockchain_listener import BlockchainListener
+
+    listener = BlockchainListener()
+    listener.sync_auctions_from_contract()
+    yield listener
+    listener.db.close()
+
+
+@pytest.fixture(scope="session")
+def ingested(chain, listener):
+    """A session on the tables after sync, several listener cycles, auctions expiring and settling, and a reorg"""
+    from blockchain_listener import BlockchainListener
+    from db_models import Auction, Bid, SessionLocal
+    from reconciler import DriftReconciler
+
+    for _ in range(3):
+        chain.mine(4, 6, 1)
+        listener.listen_for_events()
+
+    active = [
+        chain.address_index[auction.auction_address.lower()]
+        for auction in listener.db.query(Auction).filter(Auction.status == "active").order_by(Auction.id).limit(6)
+    ]
+    changes = {i: {"end_time": 1, "ended": i in active[3:]} for i in active}
+    original = chain.auction
+    with pytest.MonkeyPatch.context() as patch:
+        patch.setattr(chain, "auction", lambda i: {**original(i), **changes.get(i, {})})
+        # The contract changes reach the tables through the reconciler's repairs
+        reconciler = DriftReconciler(listener, calls_per_minute=10_000)
+        reconciler.allowance = 10_000
+        reconciler.run()
+
+        chain.mine(3, 6, 1)
+        listener.listen_for_events()
+        chain.reorg()
+        chain.mine(2, 6, 0)
+        # A new listener notices the changed cursor block and rescans
+        rescanning = BlockchainListener()
+        rescanning.listen_for_events()
+        rescanning.db.close()
+
+    db = SessionLocal()
+    assert db.query(Auction).filter(Auction.status == "ended", ~Auction.ended).count() >= 3
+    assert db.query(Bid).filter(Bid.block_number > chain.head - 3).count() > 0
+    db.info["contract_changes"] = changes
+    yield db
+    db.close()
+
+
+def table_rows(db, model):
+    """Every row of a table without its id, as a multiset"""
+    columns = [column for column in model.__table__.columns if column.name != "id"]
+    return Counter(tuple(row) for row in db.query(*columns))
+
+
+@pytest.fixture(scope="session")
+def client(ingested):
+    """An API client over the ingested tables"""
+    from fastapi.testclient import TestClient
+
+    from server import create_app
+
+    return TestClient(create_app())
+
+
+def chain_auctions(chain, db):
+    """Every auction as the fake chain reports it, with the contract changes `ingested` made, its status and bids"""
+    changes = db.info.get("contract_changes", {})
+    now = time.time()
+    auctions = {}
+    for i in range(1, chain.auction_count + 1):
+        auction = {**chain.auction(i), **changes.get(i, {})}
+        auction["status"] = "active" if not auction["ended"] and auction["end_time"] > now else "ended"
+        auction["bids"] = chain.bids(i)
+        auctions[i] = auction
+    return auctions
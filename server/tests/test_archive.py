@@ -0,0 +1,25 @@
+"""Archiving moves settled auctions only."""
+import shutil
+
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+import archive
+from db_models import ArchivedAuction, Auction
+
+
+def test_unsettled_auctions_stay_hot(ingested, database, tmp_path, monkeypatch):
+    # Archive a copy, so the other tests keep the listener's tables
+    path = tmp_path / "archive.db"
+    shutil.copy(database, path)
+    db = sessionmaker(bind=create_engine(f"sqlite:///{path}"))()
+    monkeypatch.setattr(archive, "ARCHIVE_AFTER_DAYS", 1)
+    unsettled = db.query(Auction).filter(Auction.status == "ended", ~Auction.ended).count()
+    assert unsettled > 0
+
+    archived = archive.archive_ended_auctions(db, now=2**40)
+
+    assert archived > 0
+    assert db.query(ArchivedAuction).filter(~ArchivedAuction.ended).count() == 0
+    assert db.query(Auction).filter(Auction.status == "ended").count() == unsettled
+    db.close()
@@ -0,0 +1,29 @@
+"""/auctions/batch resolves ids in request order, like the single-auction endpoint."""
+from server import MAX_BATCH_IDS
+
+
+def test_batch_follows_request_order(chain, ingested, client):
+    ids = ["3", "999999", "1", "3", "not-an-id", str(chain.auction_count)]
+    response = client.post("/auctions/batch", json={"ids": ids})
+    assert response.status_code == 200
+    batch = response.json()
+
+    found = [auction and auction["auctionId"] for auction in batch["auctions"]]
+    assert found == ["3", None, "1", "3", None, str(chain.auction_count)]
+    assert batch["missing"] == ["999999", "not-an-id"]
+    for auction_id, auction in zip(ids, batch["auctions"]):
+        if auction is not None:
+            assert auction == client.get(f"/auctions/{auction_id}").json()
+
+
+def test_batch_on_another_chain_finds_nothing(ingested, client):
+    batch = client.post("/auctions/batch", json={"ids": ["1", "2"], "chain": 1}).json()
+    assert batch == {"auctions": [None, None], "missing": ["1", "2"]}
+
+
+def test_batch_size_is_limited(ingested, client):
+    ids = [str(i) for i in range(1, MAX_BATCH_IDS + 2)]
+    assert client.post("/auctions/batch", json={"ids": ids[:MAX_BATCH_IDS]}).status_code == 200
+    response = client.post("/auctions/batch", json={"ids": ids})
+    assert response.status_code == 400
+    assert str(MAX_BATCH_IDS) in response.json()["detail"]
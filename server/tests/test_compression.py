@@ -0,0 +1,62 @@
+"""Responses are compressed only when the client accepts it and the body is worth it."""
+import pytest
+
+from compression import preferred_encoding
+from config import COMPRESSION_MIN_BYTES
+
+
+@pytest.mark.parametrize(
+    "accept_encoding, expected",
+    [
+        ("gzip", "gzip"),
+        ("deflate, gzip;q=0.5", "gzip"),
+        ("gzip;q=0", None),
+        ("*;q=0", None),
+        ("*", "gzip"),
+        ("*, gzip;q=0", None),
+        ("identity", None),
+        ("br, gzip;q=0.1", "gzip"),
+        ("", None),
+    ],
+)
+def test_negotiation(accept_encoding, expected, monkeypatch):
+    monkeypatch.setattr("compression.brotli", None)
+    assert preferred_encoding(accept_encoding) == expected
+
+
+def _vary(response):
+    return {value.strip().lower() for value in response.headers.get("vary", "").split(",")}
+
+
+def test_large_bodies_are_gzipped(ingested, client):
+    params = {"page_size": 50}
+    plain = client.get("/auctions", params=params, headers={"Accept-Encoding": "identity"})
+    assert len(plain.content) >= COMPRESSION_MIN_BYTES
+    assert "content-encoding" not in plain.headers
+
+    gzipped = client.get("/auctions", params=params, headers={"Accept-Encoding": "gzip"})
+    assert gzipped.headers["content-encoding"] == "gzip"
+    assert int(gzipped.headers["content-length"]) < len(plain.content)
+    assert "accept-encoding" in _vary(gzipped)
+    assert gzipped.json() == plain.json()
+
+    refused = client.get("/auctions", params=params, headers={"Accept-Encoding": "gzip;q=0"})
+    assert "content-encoding" not in refused.headers
+    assert refused.content == plain.content
+
+
+def test_streamed_exports_are_gzipped(ingested, client):
+    plain = client.get("/export/bids", headers={"Accept-Encoding": "identity"})
+    gzipped = client.get("/export/bids", headers={"Accept-Encoding": "gzip"})
+    assert gzipped.headers["content-encoding"] == "gzip"
+    assert "content-length" not in gzipped.headers
+    assert gzipped.content == plain.content
+
+
+def test_small_bodies_pass_through_with_vary(ingested, client):
+    response = client.get("/auctions/count", headers={"Accept-Encoding": "gzip"})
+    assert len(response.content) < COMPRESSION_MIN_BYTES
+    assert "content-encoding" not in response.headers
+    assert int(response.headers["content-length"]) == len(response.content)
+    # Caches must not hand this identity body to clients that asked for another encoding
+    assert "accept-encoding" in _vary(response)
@@ -0,0 +1,93 @@
+"""Which media URLs the cache fetches, and where it connects to fetch them."""
+import ipaddress
+import socket
+import threading
+from http.server import BaseHTTPRequestHandler, HTTPServer
+
+import pytest
+
+import media
+from media import MediaCache, MediaFetchError, check_fetchable, media_key, media_url
+
+
+@pytest.fixture
+def resolver(monkeypatch):
+    """Resolve hosts from a dict instead of DNS, and IP literals to themselves; returns the dict"""
+    addresses = {}
+
+    def getaddrinfo(host, port, *args, **kwargs):
+        address = addresses.get(host, host)
+        try:
+            ipaddress.ip_address(address)
+        except ValueError:
+            raise socket.gaierror(f"Unknown host {host}")
+        return [(socket.AF_INET, socket.SOCK_STREAM, 6, "", (address, port))]
+
+    monkeypatch.setattr(media.socket, "getaddrinfo", getaddrinfo)
+    monkeypatch.setattr(media, "_resolved", {})
+    return addresses
+
+
+def test_any_public_host_is_fetchable_by_default(resolver):
+    resolver["metadata.example"] = "93.184.216.34"
+    resolver["internal.example"] = "10.0.0.7"
+
+    assert check_fetchable("https://metadata.example/token/1") == ["93.184.216.34"]
+    with pytest.raises(MediaFetchError, match="non-public"):
+        check_fetchable("https://internal.example/token/1")
+    with pytest.raises(MediaFetchError):
+        check_fetchable("http://127.0.0.1/token/1")
+
+
+def test_allowed_hosts_restrict_fetching(resolver, monkeypatch):
+    resolver["metadata.example"] = "93.184.216.34"
+    resolver["images.example"] = "93.184.216.35"
+    monkeypatch.setattr(media, "MEDIA_ALLOWED_HOSTS", ["images.example"])
+
+    assert check_fetchable("https://images.example/a.png") == ["93.184.216.35"]
+    with pytest.raises(MediaFetchError, match="not an allowed media host"):
+        check_fetchable("https://metadata.example/token/1")
+
+
+def test_media_url_rewrites_only_fetchable_urls(resolver, monkeypatch):
+    resolver["images.example"] = "93.184.216.35"
+    resolver["internal.example"] = "192.168.1.20"
+    monkeypatch.setattr(media, "MEDIA_PUBLIC_URL", "https://api.example/media")
+
+    public = "https://images.example/a.png"
+    assert media_url(public) == f"https://api.example/media/{media_key(public)}"
+    assert media_url("https://internal.example/a.png") == "https://internal.example/a.png"
+
+
+def test_download_connects_to_the_checked_address(resolver, tmp_path):
+    requests_seen = []
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            requests_seen.append((self.path, self.headers["Host"]))
+            body = b'{"name": "Pinned"}'
+            self.send_response(200)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args):
+            pass
+
+    server = HTTPServer(("127.0.0.1", 0), Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    try:
+        port = server.server_address[1]
+        # As if metadata.example had been checked at this address; a second lookup would fail
+        media._resolved[("metadata.example", port, True)] = (float("inf"), ["127.0.0.1"])
+
+        cache = MediaCache(directory=str(tmp_path))
+        body, content_type = cache.fetch(f"http://metadata.example:{port}/token/1?v=2", cache=False)
+    finally:
+        server.shutdown()
+        server.server_close()
+
+    assert body == b'{"name": "Pinned"}'
+    assert content_type == "application/json"
+    assert requests_seen == [("/token/1?v=2", f"metadata.example:{port}")]
@@ -0,0 +1,50 @@
+"""Participations kept by the listener must equal a rebuild and the chain."""
+from collections import Counter, defaultdict
+
+from conftest import chain_auctions, table_rows
+from db_models import Bid, Participation
+from portfolio import bidder_state, rebuild_portfolio
+
+
+def test_portfolio_matches_rebuild(ingested):
+    incremental = table_rows(ingested, Participation)
+    rebuild_portfolio(ingested)
+    assert table_rows(ingested, Participation) == incremental
+
+
+def test_rebuild_without_log_indexes(ingested):
+    """Bids stored before log indexes were recorded rebuild to the same rows"""
+    incremental = table_rows(ingested, Participation)
+    log_indexes = dict(ingested.query(Bid.id, Bid.log_index))
+    ingested.query(Bid).update({Bid.log_index: None})
+    try:
+        rebuild_portfolio(ingested)
+        assert table_rows(ingested, Participation) == incremental
+    finally:
+        ingested.bulk_update_mappings(Bid, [{"id": id, "log_index": index} for id, index in log_indexes.items()])
+        ingested.commit()
+
+
+def test_portfolio_endpoint_matches_the_chain(chain, ingested, client):
+    auctions = chain_auctions(chain, ingested).values()
+    expected = defaultdict(Counter)
+    for auction in auctions:
+        expected[auction["seller"]]["seller", auction["status"]] += 1
+        for bidder in {bid["bidder"] for bid in auction["bids"]}:
+            expected[bidder]["bidder", bidder_state(auction["status"], auction["highest_bidder"], bidder)] += 1
+
+    for address, counts in expected.items():
+        served = client.get(f"/users/{address}/portfolio").json()["counts"]
+        assert +Counter({(role, state): n for role, states in served.items() for state, n in states.items()}) == counts
+    assert sum(counts["bidder", "outbid"] for counts in expected.values()) > 0
+
+    # A settled auction's winner finds it among the auctions they won, with their bids on it
+    auction = next(a for a in auctions if a["ended"] and len({bid["bidder"] for bid in a["bids"]}) > 1)
+    winner = auction["highest_bidder"]
+    won = client.get(f"/users/{winner}/portfolio", params={"state": "won", "limit": 100}).json()["items"]
+    item = next(item for item in won if item["auction"]["auctionAddress"] == auction["auction_address"])
+    assert item["bidCount"] == sum(bid["bidder"] == winner for bid in auction["bids"])
+    assert item["lastBid"] == str(auction["highest_bid"])
+    loser = next(bid["bidder"] for bid in auction["bids"] if bid["bidder"] != winner)
+    lost = client.get(f"/users/{loser}/portfolio", params={"state": "lost", "limit": 100}).json()["items"]
+    assert auction["auction_address"] in {item["auction"]["auctionAddress"] for item in lost}
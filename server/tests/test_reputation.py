@@ -0,0 +1,40 @@
+"""Reputation counters kept by the listener must equal a full recompute and the chain."""
+from collections import Counter, defaultdict
+
+from conftest import chain_auctions
+from db_models import Reputation
+from reputation import COUNTERS, compute_reputation
+
+
+def test_reputation_matches_full_recompute(ingested):
+    stored = {row.address: {name: getattr(row, name) for name in COUNTERS} for row in ingested.query(Reputation)}
+    expected = {address: dict(counts) for address, counts in compute_reputation(ingested).items()}
+    assert stored == expected
+    assert sum(counts["auctions_closed"] for counts in expected.values()) > 0
+    assert sum(counts["auctions_expired"] for counts in expected.values()) > 0
+
+
+def test_reputation_endpoint_matches_the_chain(chain, ingested, client):
+    expected = defaultdict(Counter)
+    for auction in chain_auctions(chain, ingested).values():
+        seller = expected[auction["seller"]]
+        seller["auctionsCreated"] += 1
+        seller["auctionsClosed"] += auction["ended"]
+        seller["auctionsExpired"] += auction["status"] == "ended" and not auction["ended"]
+        seller["auctionsSold"] += auction["ended"] and auction["highest_bid"] > 0
+        for bid in auction["bids"]:
+            expected[bid["bidder"]]["bidsPlaced"] += 1
+        for bidder in {bid["bidder"] for bid in auction["bids"]}:
+            expected[bidder]["auctionsBid"] += 1
+            expected[bidder]["auctionsBidClosed"] += auction["ended"]
+            expected[bidder]["auctionsWon"] += auction["ended"] and bidder == auction["highest_bidder"]
+
+    for address, counts in expected.items():
+        reputation = client.get(f"/users/{address}/reputation").json()
+        assert {name: reputation[name] for name in counts} == counts
+        # Laplace-smoothed shares out of 100
+        closed, sold = counts["auctionsClosed"], counts["auctionsSold"]
+        assert reputation["sellerScore"] == round(100 * (sold + 1) / (closed + 2))
+        bid_closed, won = counts["auctionsBidClosed"], counts["auctionsWon"]
+        assert reputation["bidderScore"] == round(100 * (won + 1) / (bid_closed + 2))
+    assert any(counts["auctionsWon"] for counts in expected.values())
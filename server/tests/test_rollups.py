@@ -0,0 +1,74 @@
+"""Collection rollups and floors kept by the listener must equal a rebuild and the chain."""
+from collections import defaultdict
+
+from conftest import chain_auctions, table_rows
+from db_models import Auction, CollectionFloor, CollectionRollup
+from rollups import collection_stats, current_price, rebuild_floors, rebuild_rollups
+
+
+def test_rollups_match_rebuild(ingested):
+    incremental = table_rows(ingested, CollectionRollup)
+    rebuild_rollups(ingested)
+    assert table_rows(ingested, CollectionRollup) == incremental
+
+
+def test_floors_match_rebuild(ingested):
+    incremental = table_rows(ingested, CollectionFloor)
+    rebuild_floors(ingested)
+    assert table_rows(ingested, CollectionFloor) == incremental
+
+
+def test_outbidding_the_floor_auction_raises_the_floor(chain, listener, ingested):
+    prices = defaultdict(list)
+    for auction in ingested.query(Auction).filter(Auction.status == "active"):
+        if current_price(auction) is not None:
+            key = (auction.chain_id, auction.asset_address, auction.payment_token)
+            prices[key].append((current_price(auction), auction.auction_address))
+    (chain_id, asset_address, payment_token), priced = max(prices.items(), key=lambda item: len(item[1]))
+    (lowest, floor_address), (second, _) = sorted(priced)[:2]
+    assert collection_stats(ingested, chain_id, asset_address)["paymentTokens"][payment_token]["floor"] == str(lowest)
+
+    chain.submit_bid(chain.address_index[floor_address.lower()], amount=second + 10**15)
+    chain.mine(1)
+    listener.listen_for_events()
+
+    ingested.expire_all()
+    assert collection_stats(ingested, chain_id, asset_address)["paymentTokens"][payment_token]["floor"] == str(second)
+    incremental = table_rows(ingested, CollectionFloor)
+    rebuild_floors(ingested)
+    assert table_rows(ingested, CollectionFloor) == incremental
+
+
+def _chain_price(auction):
+    """current_price for an auction as the fake chain reports it"""
+    if auction["highest_bid"]:
+        return auction["highest_bid"]
+    if auction["auction_type"] == 1:
+        # The fake Dutch auction's currentPrice
+        return max(auction["reserve_price"], auction["starting_price"] // 2)
+    return None
+
+
+def test_collection_stats_endpoint_matches_the_chain(chain, ingested, client):
+    listings = defaultdict(list)
+    for auction in chain_auctions(chain, ingested).values():
+        listings[auction["asset_address"], auction["payment_token"]].append(auction)
+    expected = defaultdict(dict)
+    for (collection, payment_token), listed in listings.items():
+        amounts = [bid["amount"] for auction in listed for bid in auction["bids"]]
+        active = [auction for auction in listed if auction["status"] == "active"]
+        prices = [price for price in map(_chain_price, active) if price is not None]
+        if amounts or active:
+            expected[collection][payment_token] = {
+                "bids": len(amounts),
+                "volume": str(sum(amounts)),
+                "lowBid": str(min(amounts)) if amounts else None,
+                "activeAuctions": len(active),
+                "floor": str(min(prices)) if prices else None,
+            }
+
+    for collection, by_token in expected.items():
+        stats = client.get(f"/collections/{collection}/stats").json()["paymentTokens"]
+        assert set(stats) == set(by_token)
+        assert {token: {name: stats[token][name] for name in fields} for token, fields in by_token.items()} == by_token
+    assert sum(fields["floor"] is not None for by_token in expected.values() for fields in by_token.values()) > 1
@@ -0,0 +1,55 @@
+"""`GET /auctions?q=` matches term prefixes and ranks the better match first."""
+import shutil
+
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from db_models import Auction, NFTMetadata, get_db
+from search import index_nft
+
+
+@pytest.fixture
+def searchable(ingested, database, tmp_path, client):
+    """Three NFT auctions with known metadata, in a copy the API reads from; returns their ids"""
+    path = tmp_path / "search.db"
+    shutil.copy(database, path)
+    db = sessionmaker(bind=create_engine(f"sqlite:///{path}"))()
+    documents = [
+        ("Sunset Dragon", "A dragon over dragon mountain, dragon fire"),
+        ("Dragonfly", "An insect by the pond"),
+        ("Harbour", "Boats at dawn"),
+    ]
+    auctions = db.query(Auction).filter(Auction.amount == "0").order_by(Auction.id).limit(len(documents)).all()
+    for auction, (name, description) in zip(auctions, documents):
+        nft = NFTMetadata(
+            chain_id=auction.chain_id,
+            asset_address=auction.asset_address,
+            asset_id=auction.asset_id,
+            name=name,
+            description=description,
+        )
+        db.add(nft)
+        index_nft(db, nft)
+    db.commit()
+
+    def copy_db():
+        yield db
+
+    client.app.dependency_overrides[get_db] = copy_db
+    yield [auction.auction_id for auction in auctions]
+    client.app.dependency_overrides.clear()
+    db.close()
+
+
+def test_prefix_ranks_the_better_match_first(searchable, client):
+    dragon, dragonfly, harbour = searchable
+
+    found = [auction["auctionId"] for auction in client.get("/auctions", params={"q": "drag"}).json()]
+    assert found == [dragon, dragonfly]
+    found = [auction["auctionId"] for auction in client.get("/auctions", params={"q": "dragonf"}).json()]
+    assert found == [dragonfly]
+    found = [auction["auctionId"] for auction in client.get("/auctions", params={"q": "boat daw"}).json()]
+    assert found == [harbour]
+    assert client.get("/auctions", params={"q": "dragon harbour"}).json() == []
+    assert client.get("/auctions", params={"q": "*"}).json() == []
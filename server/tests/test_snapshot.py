@@ -0,0 +1,63 @@
+"""A snapshot imported into an empty database reproduces every table; damaged ones are rejected."""
+import gzip
+import os
+import subprocess
+import sys
+from collections import Counter
+
+from sqlalchemy import create_engine, select
+
+from conftest import SERVER_DIR
+from db_models import Base, engine
+from ingest_cursor import LISTENER_CURSOR, load_cursor
+from snapshot import export_snapshot
+
+IMPORT = "import sys; from snapshot import import_snapshot; import_snapshot(sys.argv[1], replace=True)"
+
+
+def _import(snapshot, database):
+    return subprocess.run(
+        [sys.executable, "-c", IMPORT, str(snapshot)],
+        cwd=SERVER_DIR,
+        env={**os.environ, "DATABASE_URL": f"sqlite:///{database}"},
+        capture_output=True,
+        text=True,
+    )
+
+
+def _tables(bind):
+    with bind.connect() as conn:
+        return {table.name: Counter(conn.execute(select(table))) for table in Base.metadata.sorted_tables}
+
+
+def test_snapshot_round_trip(ingested, tmp_path):
+    snapshot = tmp_path / "auctions.snapshot.gz"
+    cursor = export_snapshot(snapshot)
+    assert cursor["blockNumber"] == load_cursor(ingested, LISTENER_CURSOR).block_number
+
+    imported = tmp_path / "imported.db"
+    result = _import(snapshot, imported)
+    assert result.returncode == 0, result.stderr
+    assert _tables(create_engine(f"sqlite:///{imported}")) == _tables(engine)
+
+    with gzip.open(snapshot, "rt", encoding="utf-8") as f:
+        lines = f.readlines()
+    damaged = {
+        "truncated": lines[: len(lines) // 2],
+        "Expected": lines[:-2] + lines[-1:],
+    }
+    for error, content in damaged.items():
+        path = tmp_path / f"{error}.snapshot.gz"
+        with gzip.open(path, "wt", encoding="utf-8") as f:
+            f.writelines(content)
+        result = _import(path, imported)
+        assert result.returncode != 0
+        assert "SnapshotError" in result.stderr and error in result.stderr
+    # A gzip stream cut short
+    cut = tmp_path / "cut.snapshot.gz"
+    cut.write_bytes(snapshot.read_bytes()[: snapshot.stat().st_size // 2])
+    result = _import(cut, imported)
+    assert "SnapshotError" in result.stderr and "corrupt" in result.stderr
+
+    # Failed imports roll back, leaving the earlier import in place
+    assert _tables(create_engine(f"sqlite:///{imported}")) == _tables(engine)
@@ -0,0 +1,25 @@
+"""Auction stats kept by the listener must equal a rebuild and the chain."""
+from collections import Counter
+
+from conftest import chain_auctions, table_rows
+from db_models import AuctionStat
+from stats import rebuild_stats
+
+
+def test_stats_match_rebuild(ingested):
+    incremental = table_rows(ingested, AuctionStat)
+    rebuild_stats(ingested)
+    assert table_rows(ingested, AuctionStat) == incremental
+
+
+def test_count_endpoint_matches_the_chain(chain, ingested, client):
+    auctions = chain_auctions(chain, ingested).values()
+    bids = [bid for auction in auctions for bid in auction["bids"]]
+
+    stats = client.get("/auctions/count").json()
+    assert stats["total"] == len(auctions)
+    assert stats["active"] == sum(auction["status"] == "active" for auction in auctions)
+    assert stats["ended"] == sum(auction["status"] == "ended" for auction in auctions)
+    assert stats["byType"] == {str(t): n for t, n in Counter(a["auction_type"] for a in auctions).items()}
+    assert stats["bids"]["total"] == len(bids)
+    assert stats["bids"]["volume"] == str(sum(bid["amount"] for bid in bids))
@@ -0,0 +1,109 @@
+"""Push ingest against the fake node's WebSocket endpoint."""
+import asyncio
+import time
+
+import pytest
+
+import ws_ingest
+from bench.fake_chain import serve_ws
+from blockchain_listener import BlockchainListener
+from db_models import Auction, Bid, SessionLocal
+from ws_ingest import PushIngest
+
+
+@pytest.fixture(scope="module")
+def node(chain):
+    node, url = serve_ws(chain)
+    node.url = url
+    return node
+
+
+@pytest.fixture
+def push(node, listener, monkeypatch):
+    monkeypatch.setattr(ws_ingest, "WS_RETRY_SECONDS", 0.5)
+    push_listener = BlockchainListener()
+    push = PushIngest(push_listener, node.url, poll_interval=0.2)
+    cycles = []
+    run_cycle = push_listener.run_cycle
+
+    def slow_cycle():
+        # Long enough for several heads to arrive meanwhile
+        cycles.append(time.monotonic())
+        time.sleep(0.3)
+        return run_cycle()
+
+    monkeypatch.setattr(push_listener, "run_cycle", slow_cycle)
+    push.cycles = cycles
+    yield push
+    push_listener.db.close()
+
+
+async def until(condition, timeout=10):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline, "timed out"
+        await asyncio.sleep(0.05)
+
+
+def stored_bids(block):
+    db = SessionLocal()
+    try:
+        return db.query(Bid).filter(Bid.block_number == block).count()
+    finally:
+        db.close()
+
+
+def test_heads_are_coalesced_and_ingest_survives_reconnects(chain, node, push):
+    async def scenario():
+        task = asyncio.create_task(push.run())
+        await until(lambda: len(node.subscriptions) >= 2)
+        await until(lambda: push.worker is not None and push.worker.done())
+
+        started = len(push.cycles)
+        for _ in range(5):
+            block = await asyncio.to_thread(chain.mine, 1, 3)
+        await until(lambda: stored_bids(block) == 3 and push.worker.done())
+        # Five heads, but the ones that arrived during a pass share the next one
+        assert len(push.cycles) - started < 5
+
+        await asyncio.to_thread(node.disconnect_all)
+        block = await asyncio.to_thread(chain.mine, 1, 3)
+        # Polling stores the block while the socket is down, then the listener subscribes again
+        await until(lambda: stored_bids(block) == 3)
+        await until(lambda: len(node.subscriptions) >= 2)
+        block = await asyncio.to_thread(chain.mine, 1, 3)
+        await until(lambda: stored_bids(block) == 3)
+        task.cancel()
+
+    asyncio.run(scenario())
+
+
+def test_pushed_bid_confirms_pending_bid(chain, node, push):
+    from mempool import MempoolWatcher, pending_bids
+    from sources import primary_source
+
+    db = SessionLocal()
+    auction = db.query(Auction).filter(Auction.status == "active").order_by(Auction.id).first()
+    db.close()
+    watcher = MempoolWatcher(primary_source())
+    pending_filter = watcher.w3.eth.filter("pending")
+    tx_hash = chain.submit_bid(chain.address_index[auction.auction_address.lower()])
+    watcher.poll(pending_filter)
+    assert [bid.tx_hash for bid in pending_bids.for_auction(auction.chain_id, auction.auction_address)] == [tx_hash]
+
+    def confirmed():
+        db = SessionLocal()
+        try:
+            return db.query(Bid).filter(Bid.tx_hash == tx_hash).count() == 1
+        finally:
+            db.close()
+
+    async def scenario():
+        task = asyncio.create_task(push.run())
+        await until(lambda: len(node.subscriptions) >= 2)
+        await asyncio.to_thread(chain.mine, 1)
+        await until(confirmed)
+        await until(lambda: not pending_bids.for_auction(auction.chain_id, auction.auction_address))
+        task.cancel()
+
+    asyncio.run(scenario())
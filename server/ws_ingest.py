@@ -0,0 +1,141 @@
+"""Push-driven ingestion over a WebSocket JSON-RPC endpoint.
+
+The listener subscribes to `newHeads` and to AuctionCreated/BidPlaced logs
+from the factory and the auctions it knows, with the same address filters
+as its getLogs requests. Pushed logs are stored as soon as they arrive.
+Each new head runs the normal range pass from the ingest cursor up to that
+head, so anything the socket missed gets backfilled, including blocks that
+passed while it was reconnecting and bids on auctions created since the
+subscription was made. Both paths skip events that are already stored.
+The database work runs on a worker thread, one batch at a time, so the
+socket keeps being read during a long pass; heads that arrive meanwhile
+are coalesced into a single pass after it. If the socket
+can't be opened, errors, or goes quiet for WS_IDLE_TIMEOUT, the listener
+falls back to adaptive polling and tries the socket again after
+WS_RETRY_SECONDS.
+"""
+import asyncio
+import json
+import logging
+import time
+
+import websockets
+from hexbytes import HexBytes
+from web3 import Web3
+
+from config import WS_IDLE_TIMEOUT, WS_RETRY_SECONDS
+from metrics import WS_CONNECTED
+
+logger = logging.getLogger(__name__)
+
+INT_FIELDS = ("blockNumber", "logIndex", "transactionIndex")
+BYTES_FIELDS = ("blockHash", "transactionHash", "data")
+
+
+class SubscriptionError(Exception):
+    pass
+
+
+def normalize_log(log):
+    """Decode a log from a subscription the way web3 formats eth_getLogs results"""
+    log = dict(log)
+    for field in INT_FIELDS:
+        if isinstance(log.get(field), str):
+            log[field] = int(log[field], 16)
+    for field in BYTES_FIELDS:
+        if log.get(field) is not None:
+            log[field] = HexBytes(log[field])
+    log["topics"] = [HexBytes(topic) for topic in log.get("topics", [])]
+    log["address"] = Web3.to_checksum_address(log["address"])
+    return log
+
+
+class PushIngest:
+    def __init__(self, listener, url, poll_interval):
+        self.listener = listener
+        self.url = url
+        self.poll_interval = poll_interval
+        self.request_id = 0
+        self.queued_logs = []  # Pushed logs waiting for the worker
+        self.head_queued = False  # A range pass is due once the worker is free
+        self.worker = None
+
+    async def subscribe(self, connection, *params):
+        self.request_id += 1
+        await connection.send(
+            json.dumps({"jsonrpc": "2.0", "id": self.request_id, "method": "eth_subscribe", "params": params})
+        )
+        while True:
+            message = json.loads(await asyncio.wait_for(connection.recv(), WS_IDLE_TIMEOUT))
+            if message.get("id") != self.request_id:
+                continue
+            if "error" in message:
+                raise SubscriptionError(f"eth_subscribe {params[0]} failed: {message['error']}")
+            return message["result"]
+
+    def ingest(self, logs, head):
+        """Store pushed logs, then run a range pass if a head arrived; runs on the worker thread"""
+        if logs:
+            try:
+                self.listener.process_logs(logs)
+            except Exception as e:
+                # The next range pass fetches them again
+                logger.error(f"Error storing pushed logs: {e}")
+        if head:
+            self.listener.run_cycle()
+
+    async def drain(self):
+        """Hand queued work to the worker thread until none is left"""
+        while self.queued_logs or self.head_queued:
+            logs, self.queued_logs = self.queued_logs, []
+            head, self.head_queued = self.head_queued, False
+            await asyncio.to_thread(self.ingest, logs, head)
+
+    def wake(self):
+        if self.worker is None or self.worker.done():
+            self.worker = asyncio.create_task(self.drain())
+
+    async def stream(self):
+        """Ingest pushed heads and logs until the connection fails"""
+        try:
+            async with websockets.connect(self.url, max_size=None) as connection:
+                heads = await self.subscribe(connection, "newHeads")
+                logs = {
+                    await self.subscribe(connection, "logs", log_filter) for log_filter in self.listener.log_filters()
+                }
+                logger.info(f"Subscribed to new heads and auction logs on {self.url}")
+                WS_CONNECTED.labels(self.listener.chain).set(1)
+
+                # Catch up on everything since the cursor before relying on pushes
+                self.head_queued = True
+                self.wake()
+
+                while True:
+                    message = json.loads(await asyncio.wait_for(connection.recv(), WS_IDLE_TIMEOUT))
+                    if message.get("method") != "eth_subscription":
+                        continue
+                    params = message["params"]
+                    if params["subscription"] in logs:
+                        self.queued_logs.append(normalize_log(params["result"]))
+                    elif params["subscription"] == heads:
+                        number = int(params["result"]["number"], 16)
+                        last = self.listener.last_block_processed
+                        if last is not None and number > last + 1 and not self.head_queued:
+                            logger.info(f"Head {number} skips {number - last - 1} blocks, backfilling from {last + 1}")
+                        self.head_queued = True
+                    else:
+                        continue
+                    self.wake()
+        finally:
+            # The listener's session must be free before polling takes over
+            if self.worker is not None:
+                await self.worker
+
+    async def run(self):
+        while True:
+            try:
+                await self.stream()
+            except (OSError, asyncio.TimeoutError, websockets.exceptions.WebSocketException, SubscriptionError) as e:
+                logger.warning(f"WebSocket ingest unavailable ({e!r}), polling for {WS_RETRY_SECONDS}s")
+            WS_CONNECTED.labels(self.listener.chain).set(0)
+            await self.listener.poll(self.poll_interval, until=time.monotonic() + WS_RETRY_SECONDS)